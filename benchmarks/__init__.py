@@ -0,0 +1,3 @@
+"""
+Benchmarks for the H4X0R-OMEGA-H1ST0RY rendering pipeline
+"""
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Save pipeline benchmark baselines and check new runs against them
+
+Every run is also appended to a JSON Lines history, so latency and memory
+can be charted across versions.
+
+Usage:
+    python -m benchmarks.baseline save [--report PATH] [suite options]
+    python -m benchmarks.baseline compare [--report PATH] [--tolerance 0.15]
+                                          [--stage-tolerance draw=0.3] [suite options]
+    python -m benchmarks.baseline history [--case mixed-1000] [--stage total] [--csv]
+
+Without --report the suite is run first (see benchmarks.pipeline). compare
+exits with status 1 when any stage is slower than its tolerance allows or
+a baseline case is missing from the new run.
+"""
+
+import argparse
+import csv
+import json
+import os
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.corpus import MIXES
+from benchmarks.pipeline import QUICK_MIXES, QUICK_SIZES, STAGES, run_suite
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+DEFAULT_BASELINE = os.path.join(BASELINE_DIR, 'pipeline.json')
+DEFAULT_HISTORY = os.path.join(BASELINE_DIR, 'history.jsonl')
+
+# Defaults keep the comparison fast enough for every change
+DEFAULT_SIZES = (1, 100, 1000)
+DEFAULT_TOLERANCE = 0.15
+DEFAULT_MEMORY_TOLERANCE = 0.20
+DEFAULT_MIN_DELTA_MS = 1.0
+
+# Stage names of create_hacker_manuscript() as people call them
+STAGE_ALIASES = {'markdown': 'parse', 'paint': 'draw'}
+
+EXIT_REGRESSION = 1
+
+
+def stage_name(name):
+    """Return the benchmark stage for a stage name or alias"""
+    stage = STAGE_ALIASES.get(name, name)
+    if stage not in STAGES:
+        raise argparse.ArgumentTypeError(f"Unknown stage: {name}")
+    return stage
+
+
+def stage_tolerance(value):
+    """Turn 'draw=0.3' into ('draw', 0.3)"""
+    name, _, number = value.partition('=')
+    try:
+        return stage_name(name), float(number)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected STAGE=TOLERANCE, got: {value}") from None
+
+
+def parse_stage_tolerances(values):
+    """Turn ['draw=0.3', ...] into {'draw': 0.3, ...}"""
+    return dict(stage_tolerance(value) for value in values or ())
+
+
+def git_revision():
+    """Return the current commit of the working tree, None outside git"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_report(path):
+    """Load a report written by benchmarks.pipeline or this tool"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    """Write JSON, creating the parent directory"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def append_history(path, report, label=None):
+    """
+    Append a condensed run to the history file
+
+    Args:
+        path (str): JSON Lines history file
+        report (dict): Suite report
+        label (str, optional): Free-form tag, e.g. a version number
+    """
+    entry = {
+        'created': report.get('created'),
+        'revision': report.get('revision'),
+        'label': label,
+        'environment': report.get('environment'),
+        'cases': {
+            result['name']: {
+                'stages': {stage: {'p50_ms': numbers['p50_ms'], 'p95_ms': numbers['p95_ms']}
+                           for stage, numbers in result['stages'].items()},
+                'throughput_docs_per_s': result['throughput_docs_per_s'],
+                'peak_heap_mb': result['peak_heap_mb'],
+            }
+            for result in report['results']
+        },
+        'max_rss_mb': report.get('max_rss_mb'),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(entry, sort_keys=True) + "\n")
+
+
+def compare_reports(baseline, report, tolerance=DEFAULT_TOLERANCE, stage_tolerances=None,
+                    metric='p50_ms', min_delta_ms=DEFAULT_MIN_DELTA_MS,
+                    memory_tolerance=DEFAULT_MEMORY_TOLERANCE):
+    """
+    Compare a report against a baseline, case by case and stage by stage
+
+    A stage regresses when it is slower than baseline * (1 + tolerance)
+    and also more than min_delta_ms slower, so sub-millisecond noise in
+    tiny stages does not fail the check. Peak heap regresses past
+    memory_tolerance. A baseline case missing from the new report is a
+    regression too, it gets one row with stage "missing".
+
+    Args:
+        baseline (dict): Baseline report
+        report (dict): New report
+        tolerance (float): Allowed relative slowdown of every stage
+        stage_tolerances (dict, optional): Stage -> tolerance overrides
+        metric (str): Latency statistic compared, e.g. "p50_ms" or "p95_ms"
+        min_delta_ms (float): Slowdowns below this many ms never regress
+        memory_tolerance (float): Allowed relative growth of the peak heap
+
+    Returns:
+        list: Rows (case, stage, baseline, new, change, regressed), stage
+            "heap" holds the peak heap in MB, new and change are None for
+            missing cases
+    """
+    stage_tolerances = stage_tolerances or {}
+    previous = {result['name']: result for result in baseline['results']}
+    current = {result['name'] for result in report['results']}
+    rows = [(name, 'missing', base['stages']['total'][metric], None, None, True)
+            for name, base in previous.items() if name not in current]
+    for result in report['results']:
+        base = previous.get(result['name'])
+        if base is None:
+            continue
+        for stage in STAGES:
+            old = base['stages'][stage][metric]
+            new = result['stages'][stage][metric]
+            limit = stage_tolerances.get(stage, tolerance)
+            regressed = new > old * (1 + limit) and new - old > min_delta_ms
+            rows.append((result['name'], stage, old, new, new / old - 1 if old else 0.0, regressed))
+        old, new = base['peak_heap_mb'], result['peak_heap_mb']
+        regressed = new > old * (1 + memory_tolerance)
+        rows.append((result['name'], 'heap', old, new, new / old - 1 if old else 0.0, regressed))
+    return rows
+
+
+def format_comparison(rows, metric):
+    """Render comparison rows as a table"""
+    out = [f"{'case':<16} {'stage':<11} {'base ' + metric:>14} {'new ' + metric:>14} {'change':>8}"]
+    for case, stage, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        if new is None:
+            out.append(f"{case:<16} {stage:<11} {old:>14.2f} {'-':>14} {'-':>8}{flag}")
+            continue
+        out.append(f"{case:<16} {stage:<11} {old:>14.2f} {new:>14.2f} {change:>+7.1%}{flag}")
+    return "\n".join(out)
+
+
+def history_rows(path, case=None, stage='total', metric='p50_ms'):
+    """
+    Read the history as one row per run
+
+    Args:
+        path (str): JSON Lines history file
+        case (str, optional): Only this case, every case if None
+        stage (str): Stage whose latency is reported
+        metric (str): "p50_ms" or "p95_ms"
+
+    Returns:
+        list: (created, revision, label, case, latency_ms, peak_heap_mb) rows
+    """
+    rows = []
+    if not os.path.exists(path):
+        return rows
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            for name, numbers in sorted(entry['cases'].items()):
+                if case is not None and name != case:
+                    continue
+                rows.append((entry['created'], entry.get('revision'), entry.get('label'), name,
+                             numbers['stages'][stage][metric], numbers['peak_heap_mb']))
+    return rows
+
+
+def add_baseline_argument(parser, default=argparse.SUPPRESS):
+    """--baseline, accepted before and after the subcommand"""
+    # Suppressed on the subcommands so they do not reset a value given before them
+    parser.add_argument("--baseline", default=default, help="Baseline JSON file")
+
+
+def add_suite_arguments(parser):
+    """Options that control a fresh suite run"""
+    parser.add_argument("--report", metavar="PATH", help="Use this JSON report instead of running the suite")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated document sizes in source lines")
+    parser.add_argument("--mixes", default=",".join(MIXES), help="Comma-separated corpus mixes")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"Only sizes {QUICK_SIZES} and mixes {QUICK_MIXES}")
+    parser.add_argument("--repeat", type=int, default=20, help="Most timed runs per document")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds of timed runs per document")
+    parser.add_argument("--history", default=DEFAULT_HISTORY, help="JSON Lines history file")
+    parser.add_argument("--no-history", action="store_true", help="Do not append this run to the history")
+    parser.add_argument("--label", help="Tag stored with the run in the history, e.g. a version")
+
+
+def obtain_report(args):
+    """Load --report or run the suite, then record it in the history"""
+    if args.report:
+        report = load_report(args.report)
+    else:
+        sizes = QUICK_SIZES if args.quick else tuple(int(value) for value in args.sizes.split(','))
+        mixes = QUICK_MIXES if args.quick else tuple(args.mixes.split(','))
+        report = run_suite(sizes, mixes, repeat=args.repeat, budget=args.budget)
+        report['revision'] = git_revision()
+    if not args.no_history:
+        append_history(args.history, report, args.label)
+    return report
+
+
+def command_save(args):
+    report = obtain_report(args)
+    write_json(args.baseline, report)
+    print(f"[+] Saved baseline with {len(report['results'])} cases to {args.baseline}")
+    return 0
+
+
+def command_compare(args):
+    if not os.path.exists(args.baseline):
+        print(f"[-] No baseline at {args.baseline}, run 'save' first", file=sys.stderr)
+        return 2
+    baseline = load_report(args.baseline)
+    report = obtain_report(args)
+    if baseline.get('schema') != report.get('schema'):
+        print(f"[-] Baseline has report schema {baseline.get('schema')}, this run {report.get('schema')}; "
+              f"run 'save' again", file=sys.stderr)
+        return 2
+    if baseline.get('environment') != report.get('environment'):
+        print("[!] Baseline was recorded on a different environment, timings may not be comparable",
+              file=sys.stderr)
+
+    rows = compare_reports(baseline, report, args.tolerance, dict(args.stage_tolerance or ()),
+                           args.metric, args.min_delta_ms, args.memory_tolerance)
+    print(format_comparison(rows, args.metric))
+    regressions = [row for row in rows if row[-1]]
+    if regressions:
+        print(f"\n[-] {len(regressions)} regression(s) beyond tolerance")
+        return EXIT_REGRESSION
+    print("\n[+] No regressions")
+    return 0
+
+
+def command_history(args):
+    rows = history_rows(args.history, args.case, args.stage, args.metric)
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(['created', 'revision', 'label', 'case', f"{args.stage}_{args.metric}", 'peak_heap_mb'])
+        writer.writerows(rows)
+        return 0
+    print(f"{'created':<25} {'revision':<10} {'label':<12} {'case':<16} {args.metric:>10} {'heap MB':>8}")
+    for created, revision, label, case, latency, heap in rows:
+        print(f"{created or '':<25} {revision or '':<10} {label or '':<12} {case:<16} {latency:>10.2f} {heap:>8.1f}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline benchmark baselines and regression checks")
+    add_baseline_argument(parser, DEFAULT_BASELINE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    save = commands.add_parser("save", help="Run the suite (or load --report) and store it as the baseline")
+    add_baseline_argument(save)
+    add_suite_arguments(save)
+    save.set_defaults(func=command_save)
+
+    compare = commands.add_parser("compare", help="Compare a run against the baseline")
+    add_baseline_argument(compare)
+    add_suite_arguments(compare)
+    compare.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                         help="Allowed relative slowdown per stage, e.g. 0.15 for 15%%")
+    compare.add_argument("--stage-tolerance", action="append", type=stage_tolerance, metavar="STAGE=TOL",
+                         help="Per-stage tolerance, stages: markdown/parse, hackerize, paginate, "
+                              "layout, background, draw/paint, encode, total")
+    compare.add_argument("--memory-tolerance", type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                         help="Allowed relative growth of the peak heap")
+    compare.add_argument("--metric", default="p50_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"),
+                         help="Latency statistic to compare")
+    compare.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                         help="Slowdowns smaller than this never count")
+    compare.set_defaults(func=command_compare)
+
+    history = commands.add_parser("history", help="Print the recorded runs for charting")
+    add_baseline_argument(history)
+    history.add_argument("--history", default=DEFAULT_HISTORY, help="JSON Lines history file")
+    history.add_argument("--case", help="Only this case, e.g. mixed-1000")
+    history.add_argument("--stage", default="total", type=stage_name, help="Stage to report")
+    history.add_argument("--metric", default="p50_ms", choices=("p50_ms", "p95_ms"))
+    history.add_argument("--csv", action="store_true", help="CSV output")
+    history.set_defaults(func=command_history)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
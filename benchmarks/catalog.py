@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark the museum catalog queries on large synthetic catalogs
+
+Usage:
+    python -m benchmarks.catalog [--records N] [--repeat N] [--path FILE]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from museum_catalog import MuseumCatalog, load_museum_data
+from museum_registry import Achievement, Collection, HackerGroup, Incident
+
+RATINGS = ("A+", "A", "A-", "B+", "B", "B-", "C")
+
+
+def fill(catalog, records, rng):
+    """Add `records` synthetic groups, events (half incidents, half achievements) and collections"""
+    groups = []
+    for index in range(max(1, records)):
+        start = rng.randrange(1960, 2020)
+        groups.append(HackerGroup(f"G{index}", f"Group {index}", "💾", "Synthetic group",
+                                  f"{start}-{start + rng.randrange(1, 15)}", ("Someone",)))
+    catalog.add_groups(groups)
+    keys = [group.key for group in groups]
+    half = records // 2
+    catalog.add_events('incident', (Incident(rng.randrange(1960, 2030), f"Incident {index}", "Synthetic",
+                                             rng.choice(keys)) for index in range(half)))
+    catalog.add_events('achievement', (Achievement(rng.randrange(1960, 2030), f"Achievement {index}",
+                                                   "Synthetic", rng.choice(keys)) for index in range(records - half)))
+    catalog.add_collections(Collection(f"Collection {index}", rng.randrange(1, 500), f"0x{index:08X}",
+                                       rng.choice(RATINGS)) for index in range(max(1, records)))
+
+
+def best_of(func, repeat):
+    """Return the best wall-clock time of `repeat` calls to func"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the museum catalog")
+    parser.add_argument("--records", type=int, default=100000, help="Records added to each table")
+    parser.add_argument("--repeat", type=int, default=200, help="Runs per query (best is reported)")
+    parser.add_argument("--path", default=":memory:", help="Catalog file, in memory by default")
+    args = parser.parse_args()
+
+    catalog = load_museum_data(MuseumCatalog(args.path))
+    start = time.perf_counter()
+    fill(catalog, args.records, random.Random(1))
+    print(f"[+] Loaded {catalog.stats()} in {time.perf_counter() - start:.2f}s\n")
+
+    cases = [
+        ("group by key", lambda: catalog.group("G42")),
+        ("groups active in 1998", lambda: catalog.groups(active_in=1998, limit=20)),
+        ("groups active in 2025", lambda: catalog.groups(active_in=2025, limit=20)),
+        ("groups of the 1990s", lambda: catalog.groups(era="1990s", limit=20)),
+        ("groups of the 2020s", lambda: catalog.groups(era="2020s", limit=20)),
+        ("incidents 1998-2000", lambda: catalog.incidents(year_from=1998, year_to=2000, limit=20)),
+        ("incidents of the 2010s", lambda: catalog.incidents(era="2010s", limit=20)),
+        ("achievements of a group", lambda: catalog.achievements(group="G7")),
+        ("achievements of a group, 1990s", lambda: catalog.achievements(group="G7", era="1990s")),
+        ("BR tab", lambda: catalog.incidents(group="BR")),
+        ("collection by name", lambda: catalog.collection("Collection 99999")),
+        ("collections rated A+", lambda: catalog.collections(rating="A+", limit=20)),
+        ("collections rated A or better", lambda: catalog.collections(min_rating="A", limit=20)),
+    ]
+
+    print(f"{'query':<36} {'ms':>9} {'rows':>6}")
+    for name, func in cases:
+        elapsed = best_of(func, args.repeat)
+        rows = func()
+        count = len(rows) if isinstance(rows, list) else int(rows is not None)
+        print(f"{name:<36} {elapsed * 1000:9.3f} {count:6d}")
+
+
+if __name__ == "__main__":
+    main()
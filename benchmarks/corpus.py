@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Synthetic markdown corpus for the manuscript benchmarks
+
+Builds reproducible documents of a given line count from a mix of
+markdown blocks: plain prose, accented and CJK text, emoji, fenced code,
+lists and quotes.
+
+Usage:
+    python -m benchmarks.corpus [--lines N] [--mix mixed]
+"""
+
+import argparse
+import random
+
+# Sizes of the default corpus, in source lines
+DEFAULT_SIZES = (1, 10, 100, 1000, 10000, 100000)
+
+WORDS = ("phone phreaking blue box tone switch hacker group bulletin board modem warez "
+         "advisory exploit kernel stack overflow crack password museum archive").split()
+UNICODE_WORDS = ("ñandú", "açaí", "Émile", "Zürich", "smörgåsbord", "ハッカー", "ブラック",
+                 "黑客", "해커", "Ωmega", "Δelta", "кибер")
+EMOJI = ("🔐", "📞", "💾", "🐄", "⚡", "✊", "🖥️", "💻", "🇧🇷", "🏛️")
+CODE_LINES = ("def crack(hash):", "    return brute_force(hash, charset='0123456789')",
+              "for (i = 0; i < 2600; i++) { tone(i); }", "$ nc -lvp 31337", "mov eax, 0x2600")
+
+# Mix name -> block kinds drawn from, weighted by repetition
+MIXES = {
+    'plain': ('heading', 'prose', 'prose', 'prose', 'list'),
+    'unicode': ('heading', 'unicode', 'unicode', 'prose', 'list'),
+    'emoji': ('heading', 'emoji', 'emoji', 'prose', 'list'),
+    'code': ('heading', 'code', 'code', 'prose'),
+    'mixed': ('heading', 'prose', 'unicode', 'emoji', 'code', 'list', 'quote'),
+}
+
+
+def _sentence(rng, extra=(), extra_rate=0.0):
+    """Return a sentence of 6-16 words, sprinkling in words from `extra`"""
+    words = []
+    for _ in range(rng.randint(6, 16)):
+        if extra and rng.random() < extra_rate:
+            words.append(rng.choice(extra))
+        else:
+            words.append(rng.choice(WORDS))
+    return ' '.join(words).capitalize() + '.'
+
+
+def _block(kind, rng):
+    """Return the source lines of one markdown block"""
+    if kind == 'heading':
+        return ['#' * rng.randint(1, 3) + ' ' + _sentence(rng)[:40].rstrip('.'), '']
+    if kind == 'prose':
+        return [' '.join(_sentence(rng) for _ in range(rng.randint(1, 4))), '']
+    if kind == 'unicode':
+        return [_sentence(rng, UNICODE_WORDS, 0.4), '']
+    if kind == 'emoji':
+        return [_sentence(rng, EMOJI, 0.3), '']
+    if kind == 'code':
+        body = [rng.choice(CODE_LINES) for _ in range(rng.randint(2, 8))]
+        return ['```'] + body + ['```', '']
+    if kind == 'list':
+        return ['- ' + _sentence(rng) for _ in range(rng.randint(2, 6))] + ['']
+    if kind == 'quote':
+        return ['> ' + _sentence(rng), '']
+    raise ValueError(f"Unknown block kind: {kind}")
+
+
+def generate_document(lines, mix='mixed', seed=0):
+    """
+    Generate a markdown document of exactly `lines` source lines
+
+    Args:
+        lines (int): Number of source lines
+        mix (str): Block mix, one of MIXES
+        seed (int): Random seed, equal seeds give equal documents
+
+    Returns:
+        str: Markdown text
+    """
+    if mix not in MIXES:
+        raise ValueError(f"Unknown corpus mix: {mix}")
+    rng = random.Random(f"{mix}:{lines}:{seed}")
+    source = []
+    while len(source) < lines:
+        source.extend(_block(rng.choice(MIXES[mix]), rng))
+    source = source[:lines]
+    # Keep fences balanced when the last block was cut off
+    if sum(1 for line in source if line == '```') % 2:
+        source[-1] = '' if source[-1] == '```' else '```'
+    return '\n'.join(source)
+
+
+def build_corpus(sizes=DEFAULT_SIZES, mixes=tuple(MIXES), seed=0):
+    """
+    Generate one document per (size, mix)
+
+    Args:
+        sizes (iterable): Line counts
+        mixes (iterable): Mix names
+        seed (int): Random seed
+
+    Returns:
+        list: Dicts with name, lines, mix and markdown
+    """
+    return [{'name': f"{mix}-{lines}", 'lines': lines, 'mix': mix,
+             'markdown': generate_document(lines, mix, seed)}
+            for lines in sizes for mix in mixes]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print a synthetic markdown document")
+    parser.add_argument("--lines", type=int, default=40, help="Source lines")
+    parser.add_argument("--mix", default="mixed", choices=sorted(MIXES), help="Block mix")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+    print(generate_document(args.lines, args.mix, args.seed))
+
+
+if __name__ == "__main__":
+    main()
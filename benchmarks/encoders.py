@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark the manuscript image encoder presets
+
+Paints real manuscript canvases and reports encode time and output bytes
+for every registered preset.
+
+Usage:
+    python -m benchmarks.encoders [--heights 1000,4000] [--repeat N]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gradio.l33t import manuscript
+from src.gradio.l33t.background_pool import get_background_pool
+from src.gradio.l33t.encoders import get_encoder, list_encoders
+
+SAMPLE_LINE = "Ph0n3 phr34k1ng b3g4n 1n th3 1960s wh3n h4ck3r5 f0und th3 2600 Hz t0n3"
+
+
+def paint_canvas(height):
+    """Return a painted manuscript canvas of roughly the given height"""
+    rng = random.Random(1)
+    lines = [SAMPLE_LINE] * max(1, (height - 200) // manuscript.LINE_HEIGHT)
+    layout = manuscript.layout_manuscript(lines, banner="B3NCHM4RK", rng=rng)
+    canvas = get_background_pool().get(layout['width'], layout['height'], rng)
+    manuscript.paint_band(canvas, layout, 0, manuscript._load_font())
+    return canvas
+
+
+def time_encode(encoder, image, repeat):
+    """Return (best seconds, bytes) of encoding image `repeat` times"""
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        output = io.BytesIO()
+        start = time.perf_counter()
+        encoder.encode(image, output)
+        best = min(best, time.perf_counter() - start)
+        size = output.tell()
+    return best, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image encoder presets")
+    parser.add_argument("--heights", default="1000,4000", help="Comma-separated canvas heights")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per preset (best is reported)")
+    args = parser.parse_args()
+
+    for height in (int(value) for value in args.heights.split(',')):
+        canvas = paint_canvas(height)
+        raw = canvas.width * canvas.height * 4
+        print(f"\n[+] Canvas {canvas.width}x{canvas.height} RGBA ({raw / 1024:.0f} KB raw)")
+        print(f"{'preset':<16} {'ms':>9} {'KB':>9} {'ratio':>7}")
+        for name in list_encoders():
+            elapsed, size = time_encode(get_encoder(name), canvas, args.repeat)
+            print(f"{name:<16} {elapsed * 1000:9.1f} {size / 1024:9.1f} {raw / size:7.1f}")
+
+
+if __name__ == "__main__":
+    main()
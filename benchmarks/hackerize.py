@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark the l33t engine on large inputs
+
+Compares the original replace-per-key loop with the single-pass engine.
+
+Usage:
+    python -m benchmarks.hackerize [--size-mb N] [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gradio.l33t.leet import DEFAULT_REPLACEMENTS, hackerize, hackerize_batch
+
+SAMPLE = ("Phone phreaking began in the 1960s when hackers discovered that a 2600 Hz tone "
+          "could manipulate AT&T's long-distance switching systems. Attack the stack! ")
+
+
+def legacy_hackerize(text, rng):
+    """The original implementation: one str.replace pass per key"""
+    for char, replacement in DEFAULT_REPLACEMENTS.items():
+        if rng.random() < 0.7:
+            text = text.replace(char, replacement)
+    return text
+
+
+def best_of(func, repeat):
+    """Return the best wall-clock time of `repeat` calls to func"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the l33t engine")
+    parser.add_argument("--size-mb", type=float, default=1.0, help="Input size in MB")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (best is reported)")
+    args = parser.parse_args()
+
+    size = int(args.size_mb * 1024 * 1024)
+    text = (SAMPLE * (size // len(SAMPLE) + 1))[:size]
+    lines = text.split('. ')
+    megabytes = len(text.encode('utf-8')) / (1024 * 1024)
+
+    cases = [
+        ("legacy replace loop (per key)", lambda: legacy_hackerize(text, random.Random(1))),
+        ("engine p=1.0 (every occurrence)", lambda: hackerize(text, probability=1.0)),
+        ("engine p=0.7 (per occurrence)", lambda: hackerize(text, rng=random.Random(1))),
+        (f"batch p=0.7 ({len(lines)} strings)", lambda: hackerize_batch(lines, rng=random.Random(1))),
+        (f"per-item p=0.7 ({len(lines)} strings)",
+         lambda: [hackerize(line, rng=random.Random(1)) for line in lines]),
+    ]
+
+    print(f"[+] Input: {megabytes:.2f} MB\n")
+    print(f"{'case':<40} {'ms':>9} {'MB/s':>9}")
+    for name, func in cases:
+        elapsed = best_of(func, args.repeat)
+        print(f"{name:<40} {elapsed * 1000:9.1f} {megabytes / elapsed:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Benchmark the matrix background engines
+
+Compares the reference per-glyph Pillow renderer with the glyph-atlas engine.
+
+Usage:
+    python -m benchmarks.matrix_background [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.gradio.l33t.matrix import get_glyph_atlas, render_matrix_field, render_matrix_field_pillow
+
+SIZES = [(800, 400), (800, 4000), (800, 40000)]
+
+
+def time_call(func, repeat):
+    """Return the best wall-clock time of `repeat` calls to func"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark matrix background engines")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (best is reported)")
+    args = parser.parse_args()
+
+    # Build the atlas up front, it is a one-time cost per process
+    start = time.perf_counter()
+    get_glyph_atlas()
+    print(f"[+] Atlas build: {(time.perf_counter() - start) * 1000:.1f} ms (once per process)\n")
+
+    print(f"{'size':>12} {'pillow (ms)':>12} {'atlas (ms)':>12} {'speedup':>9}")
+    for width, height in SIZES:
+        pillow = time_call(lambda: render_matrix_field_pillow(width, height), args.repeat)
+        atlas = time_call(lambda: render_matrix_field(width, height), args.repeat)
+        print(f"{width}x{height:<8} {pillow * 1000:12.1f} {atlas * 1000:12.1f} {pillow / atlas:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Benchmark the manuscript pipeline stage by stage on a synthetic corpus
+
+Renders page 1 of every document with the real prepare_manuscript() and
+render_page(), reads the stage timings back from the spans and stage
+clocks of src/gradio/l33t/metrics.py (parse, hackerize, paginate, layout,
+background, draw, encode) and reports p50/p95/p99 latency per stage,
+throughput in documents/s and the peak Python heap of one render, as a
+table and optionally as JSON.
+
+Usage:
+    python -m benchmarks.pipeline [--sizes 1,100,1000] [--mixes plain,mixed]
+                                  [--repeat N] [--budget SECONDS] [--json PATH]
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.corpus import DEFAULT_SIZES, MIXES, build_corpus
+from src.gradio.l33t import manuscript, metrics
+
+# Stages as the pipeline's spans name them, in pipeline order, "total" is
+# the wall time of the whole render
+STAGES = ('parse', 'hackerize', 'paginate', 'layout', 'background', 'draw', 'encode', 'total')
+PERCENTILES = (50, 95, 99)
+SCHEMA_VERSION = 2
+
+QUICK_SIZES = (1, 100, 1000)
+QUICK_MIXES = ('plain', 'mixed')
+
+BENCH_GROUPS = {
+    "L0PHT": {
+        "name": "L0pht Heavy Industries",
+        "emoji": "🔐",
+        "description": "Created L0phtCrack and testified to Congress",
+        "members": ["Mudge", "Space Rogue", "Weld Pond", "Kingpin"],
+        "era": "Late 1990s",
+    }
+}
+
+
+def render_stages(markdown_text, hacker_groups=BENCH_GROUPS, group_theme="L0PHT", encoder=None):
+    """
+    Render page 1 of a manuscript like render_manuscript() and time its stages
+
+    The stages are timed by the pipeline's own spans and stage clocks,
+    metrics must be enabled (run_suite() does it).
+
+    Args:
+        markdown_text (str): Markdown text to convert
+        hacker_groups (dict): Dictionary of hacker group information
+        group_theme (str, optional): Hacker group theme to apply
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+
+    Returns:
+        tuple: (image_bytes, seconds by stage)
+    """
+    metrics.reset_metrics()
+    start = time.perf_counter()
+    prepared = manuscript.prepare_manuscript(markdown_text, hacker_groups, group_theme)
+    image_bytes = manuscript.render_page(prepared, 1, encoder=encoder)
+    total = time.perf_counter() - start
+
+    stage_seconds = metrics.get_metrics().stage_seconds
+    seconds = {stage: stage_seconds.total(stage) for stage in STAGES[:-1]}
+    seconds['total'] = total
+    return image_bytes, seconds
+
+
+def percentiles(samples):
+    """Return p50/p95/p99 and mean of a list of seconds, in milliseconds"""
+    values = np.asarray(samples, dtype=np.float64) * 1000.0
+    summary = {f"p{q}_ms": float(np.percentile(values, q)) for q in PERCENTILES}
+    summary['mean_ms'] = float(values.mean())
+    return summary
+
+
+def peak_heap(markdown_text, encoder=None):
+    """Return the peak traced Python heap of one render, in bytes"""
+    tracemalloc.start()
+    try:
+        render_stages(markdown_text, encoder=encoder)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_document(document, repeat, min_repeat, budget, encoder=None):
+    """
+    Benchmark one corpus document
+
+    Args:
+        document (dict): Corpus entry from build_corpus()
+        repeat (int): Most timed runs
+        min_repeat (int): Fewest timed runs, even past the budget
+        budget (float): Seconds of timed runs after which sampling stops
+        encoder (str or ImageEncoder, optional): Output preset
+
+    Returns:
+        dict: Result entry of the JSON report
+    """
+    markdown_text = document['markdown']
+
+    # Warm-up run: fonts, pools and caches
+    image_bytes, _ = render_stages(markdown_text, encoder=encoder)
+
+    samples = {stage: [] for stage in STAGES}
+    spent = 0.0
+    runs = 0
+    while runs < repeat and (runs < min_repeat or spent < budget):
+        _, seconds = render_stages(markdown_text, encoder=encoder)
+        for stage in STAGES:
+            samples[stage].append(seconds[stage])
+        spent += seconds['total']
+        runs += 1
+
+    mean_total = sum(samples['total']) / runs
+    return {
+        'name': document['name'],
+        'lines': document['lines'],
+        'mix': document['mix'],
+        'input_bytes': len(markdown_text.encode('utf-8')),
+        'image_bytes': len(image_bytes),
+        'runs': runs,
+        'stages': {stage: percentiles(samples[stage]) for stage in STAGES},
+        'throughput_docs_per_s': 1.0 / mean_total if mean_total else float('inf'),
+        'peak_heap_mb': peak_heap(markdown_text, encoder) / (1024 * 1024),
+    }
+
+
+def environment():
+    """Return the facts about this machine that make results comparable"""
+    from PIL import __version__ as pillow_version
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'pillow': pillow_version,
+        'numpy': np.__version__,
+    }
+
+
+def run_suite(sizes=DEFAULT_SIZES, mixes=tuple(MIXES), repeat=20, min_repeat=3, budget=5.0,
+              encoder=None, seed=0, progress=None):
+    """
+    Benchmark every (size, mix) document of the synthetic corpus
+
+    Args:
+        sizes (iterable): Document sizes in source lines
+        mixes (iterable): Corpus mixes
+        repeat (int): Most timed runs per document
+        min_repeat (int): Fewest timed runs per document
+        budget (float): Seconds of timed runs per document
+        encoder (str, optional): Encoder preset, "balanced" if None
+        seed (int): Corpus seed
+        progress (callable, optional): Called with each finished result
+
+    Returns:
+        dict: Report with schema, environment, config and one entry per document
+    """
+    results = []
+    enabled = metrics.metrics_enabled()
+    metrics.enable_metrics()
+    try:
+        for document in build_corpus(sizes, mixes, seed):
+            result = bench_document(document, repeat, min_repeat, budget, encoder)
+            results.append(result)
+            if progress is not None:
+                progress(result)
+    finally:
+        metrics.enable_metrics(enabled)
+    return {
+        'schema': SCHEMA_VERSION,
+        'suite': 'manuscript-pipeline',
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'environment': environment(),
+        'config': {
+            'sizes': list(sizes),
+            'mixes': list(mixes),
+            'repeat': repeat,
+            'min_repeat': min_repeat,
+            'budget_s': budget,
+            'encoder': encoder or 'balanced',
+            'seed': seed,
+        },
+        'results': results,
+        'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def format_table(report):
+    """
+    Render a report as human-readable tables
+
+    Args:
+        report (dict): Result of run_suite()
+
+    Returns:
+        str: Summary table followed by the per-stage latency table
+    """
+    out = [f"{'case':<16} {'runs':>5} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} "
+           f"{'docs/s':>9} {'heap MB':>8} {'image KB':>9}"]
+    for result in report['results']:
+        total = result['stages']['total']
+        out.append(f"{result['name']:<16} {result['runs']:>5} {total['p50_ms']:>10.2f} "
+                   f"{total['p95_ms']:>10.2f} {total['p99_ms']:>10.2f} "
+                   f"{result['throughput_docs_per_s']:>9.2f} {result['peak_heap_mb']:>8.1f} "
+                   f"{result['image_bytes'] / 1024:>9.1f}")
+
+    out.append("")
+    out.append(f"{'case':<16} {'stage':<11} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'mean ms':>10}")
+    for result in report['results']:
+        for stage in STAGES[:-1]:
+            numbers = result['stages'][stage]
+            out.append(f"{result['name']:<16} {stage:<11} {numbers['p50_ms']:>10.2f} "
+                       f"{numbers['p95_ms']:>10.2f} {numbers['p99_ms']:>10.2f} {numbers['mean_ms']:>10.2f}")
+    out.append("")
+    out.append(f"max RSS: {report['max_rss_mb']:.1f} MB")
+    return "\n".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the manuscript pipeline per stage")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated document sizes in source lines")
+    parser.add_argument("--mixes", default=",".join(MIXES), help="Comma-separated corpus mixes")
+    parser.add_argument("--quick", action="store_true",
+                        help=f"Only sizes {QUICK_SIZES} and mixes {QUICK_MIXES}")
+    parser.add_argument("--repeat", type=int, default=20, help="Most timed runs per document")
+    parser.add_argument("--min-repeat", type=int, default=3, help="Fewest timed runs per document")
+    parser.add_argument("--budget", type=float, default=5.0, help="Seconds of timed runs per document")
+    parser.add_argument("--encoder", default=None, help="Encoder preset, balanced by default")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed")
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON ('-' for stdout)")
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else tuple(int(value) for value in args.sizes.split(','))
+    mixes = QUICK_MIXES if args.quick else tuple(args.mixes.split(','))
+
+    def progress(result):
+        print(f"[+] {result['name']}: {result['stages']['total']['p50_ms']:.1f} ms p50 "
+              f"over {result['runs']} runs", file=sys.stderr)
+
+    report = run_suite(sizes, mixes, args.repeat, args.min_repeat, args.budget, args.encoder,
+                       args.seed, progress)
+
+    if args.json == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    print(format_table(report))
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[+] Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -43,6 +43,24 @@ def get_br_hacker_data():
         ]
     }
 
+def get_br_leet_replacements():
+    """Returns l33t replacement rules for Portuguese (PT-BR) text."""
+    return {
+        'a': '4', 'e': '3', 'i': '1', 'o': '0',
+        't': '7', 's': '5', 'A': '4', 'E': '3',
+        'I': '1', 'O': '0', 'T': '7', 'S': '5',
+        'á': '4', 'à': '4', 'â': '4', 'ã': '4',
+        'Á': '4', 'À': '4', 'Â': '4', 'Ã': '4',
+        'é': '3', 'ê': '3', 'É': '3', 'Ê': '3',
+        'í': '1', 'Í': '1',
+        'ó': '0', 'ô': '0', 'õ': '0', 'Ó': '0', 'Ô': '0', 'Õ': '0',
+        'ç': '(', 'Ç': '(',
+        'ção': '540', 'ÇÃO': '540',
+        'ções': '5035', 'ÇÕES': '5035',
+        'qu': 'kw', 'Qu': 'Kw', 'QU': 'KW',
+        'lh': '|h', 'nh': '~n'
+    }
+
 def get_br_template():
     """Returns markdown template with Brazilian hacker history."""
     return """# 🇧🇷 Brazilian Hacker History
@@ -0,0 +1,449 @@
+"""
+Museum Catalog for the OMEGA HACKER HISTORICAL MUSEUM
+SQLite catalog of groups, incidents, achievements and NFT collections with indexed queries
+"""
+
+import contextlib
+import json
+import re
+import sqlite3
+import threading
+
+from museum_registry import get_museum_registry
+
+# Rows a query returns unless the caller asks for another limit
+DEFAULT_LIMIT = 100
+
+# Incidents of the Brazilian data module belong to the scene, not to one group
+BR_SCENE = "BR"
+
+# Longest era indexed year by year, longer ones are clipped to their last years
+MAX_ERA_YEARS = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    emoji TEXT,
+    description TEXT,
+    era TEXT,
+    era_start INTEGER,
+    era_end INTEGER,
+    members TEXT,
+    leet TEXT
+);
+CREATE INDEX IF NOT EXISTS groups_era ON groups (era_start, era_end, key);
+
+-- One row per year a group was active, so "active in" is one index range
+CREATE TABLE IF NOT EXISTS group_years (
+    year INTEGER NOT NULL,
+    era_start INTEGER NOT NULL,
+    era_end INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (year, era_start, era_end, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS group_years_key ON group_years (key);
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    group_key TEXT,
+    year INTEGER,
+    year_end INTEGER,
+    year_label TEXT,
+    name TEXT NOT NULL,
+    description TEXT,
+    quote TEXT
+);
+CREATE INDEX IF NOT EXISTS events_year ON events (kind, year);
+CREATE INDEX IF NOT EXISTS events_group ON events (group_key, kind, year);
+
+CREATE TABLE IF NOT EXISTS collections (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    items INTEGER,
+    nft_contract TEXT,
+    preservation_rating TEXT,
+    rating_score INTEGER,
+    url TEXT,
+    description TEXT,
+    includes TEXT
+);
+CREATE INDEX IF NOT EXISTS collections_rating ON collections (rating_score DESC, id);
+"""
+
+_YEAR = re.compile(r'(\d{4})(s?)')
+_RATING = re.compile(r'^\s*([A-F])([+-]?)\s*$')
+
+
+def parse_years(text):
+    """
+    Return the year range of an era or year label
+
+    "1992-2000" is (1992, 2000), "Early 1990s" is (1990, 1999) and
+    "2000s-2010s" is (2000, 2019).
+
+    Args:
+        text (str or int): Era, year range or year
+
+    Returns:
+        tuple: (start, end) years, (None, None) when there is no year
+    """
+    if isinstance(text, int):
+        return text, text
+    years = _YEAR.findall(str(text or ''))
+    if not years:
+        return None, None
+    start = int(years[0][0])
+    end = int(years[-1][0]) + (9 if years[-1][1] else 0)
+    return start, end
+
+
+def rating_score(rating):
+    """
+    Rank a preservation rating, higher is better
+
+    Args:
+        rating (str): Letter grade such as "A+", "A" or "B-"
+
+    Returns:
+        int: Score that sorts like the grades, None for an unknown rating
+    """
+    match = _RATING.match(rating or '')
+    if match is None:
+        return None
+    letter, modifier = match.groups()
+    return (ord('F') - ord(letter)) * 3 + {'-': 0, '': 1, '+': 2}[modifier]
+
+
+class MuseumCatalog:
+    """
+    SQLite catalog of the museum records
+
+    Years, groups, eras and preservation ratings are indexed, so the
+    queries stay well under a millisecond on catalogs of 100k records.
+    An era is an interval, which one B-tree cannot search from both ends,
+    so every group also gets a row per active year in `group_years`.
+    A file catalog uses write-ahead logging, so worker processes can
+    read it while another one writes. Queries share one connection under
+    a lock and return plain dicts.
+
+    Example:
+        catalog = MuseumCatalog()
+        load_museum_data(catalog)
+        catalog.achievements(group="L0PHT", year_from=1995)
+    """
+
+    def __init__(self, path=':memory:'):
+        """
+        Args:
+            path (str): Database file, ":memory:" for a private in-memory catalog
+        """
+        self.path = path
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        # Catalog files written before the year index get it on open
+        if self._query("SELECT 1 FROM groups WHERE era_start IS NOT NULL LIMIT 1") and \
+                not self._query("SELECT 1 FROM group_years LIMIT 1"):
+            with self.transaction():
+                rows = self._db.execute("SELECT key, era_start, era_end FROM groups "
+                                        "WHERE era_start IS NOT NULL").fetchall()
+                self._db.executemany("INSERT OR IGNORE INTO group_years VALUES (?, ?, ?, ?)",
+                                     [row for key, era_start, era_end in rows
+                                      for row in _era_years(key, era_start, era_end)])
+
+    def close(self):
+        """Close the database connection"""
+        with self._lock:
+            self._db.close()
+
+    def add_groups(self, groups):
+        """
+        Insert or replace groups
+
+        Args:
+            groups (iterable): HackerGroup records
+        """
+        rows, years = [], []
+        for group in groups:
+            era_start, era_end = parse_years(group.era)
+            rows.append((group.key, group.name, group.emoji, group.description, group.era,
+                         era_start, era_end, json.dumps(list(group.members)), group.leet))
+            if era_start is not None:
+                years.extend(_era_years(group.key, era_start, era_end))
+        with self.transaction():
+            self._db.executemany("DELETE FROM group_years WHERE key = ?", [(row[0],) for row in rows])
+            self._db.executemany("INSERT OR REPLACE INTO groups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._db.executemany("INSERT INTO group_years VALUES (?, ?, ?, ?)", years)
+
+    def add_events(self, kind, records, group=None):
+        """
+        Insert dated records
+
+        Args:
+            kind (str): "incident" or "achievement"
+            records (iterable): Incident or Achievement records
+            group (str, optional): Group key of every record, the record's
+                source if None
+        """
+        rows = []
+        for record in records:
+            year, year_end = parse_years(record.year)
+            rows.append((kind, group or record.source, year, year_end, str(record.year), record.name,
+                         record.description, getattr(record, 'quote', None)))
+        self._write("INSERT INTO events (kind, group_key, year, year_end, year_label, name, description, quote) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def add_collections(self, collections):
+        """
+        Insert or replace NFT collections
+
+        Args:
+            collections (iterable): Collection records
+        """
+        rows = [(collection.name, collection.items, collection.nft_contract, collection.preservation_rating,
+                 rating_score(collection.preservation_rating), collection.url, collection.description,
+                 json.dumps(list(collection.includes)))
+                for collection in collections]
+        self._write("INSERT OR REPLACE INTO collections (name, items, nft_contract, preservation_rating, "
+                    "rating_score, url, description, includes) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    @contextlib.contextmanager
+    def transaction(self):
+        """
+        Make the writes inside one atomic transaction, e.g. `with catalog.transaction(): ...`
+
+        The transaction takes the database write lock up front, so other
+        processes writing the same file wait for it to finish.
+        """
+        with self._lock:
+            if self._db.in_transaction:
+                yield
+                return
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._db.rollback()
+                raise
+            self._db.commit()
+
+    def is_empty(self):
+        """Return True when the catalog holds no records"""
+        return not any(self.stats().values())
+
+    def clear(self):
+        """Delete every record"""
+        with self.transaction():
+            for table in ('groups', 'group_years', 'events', 'collections'):
+                self._db.execute(f"DELETE FROM {table}")
+
+    def group(self, key):
+        """Return one group as a dict, None if there is none"""
+        rows = self._query("SELECT * FROM groups WHERE key = ?", (key,))
+        return _group(rows[0]) if rows else None
+
+    def groups(self, era=None, active_in=None, limit=DEFAULT_LIMIT):
+        """
+        Return groups by era
+
+        Args:
+            era (str, optional): Era such as "1990s", groups active during any of it
+            active_in (int, optional): Year the groups were active in
+            limit (int): Most rows to return
+
+        Returns:
+            list: Group dicts ordered by the start of their era
+        """
+        if era is None and active_in is None:
+            rows = self._query("SELECT * FROM groups ORDER BY era_start, era_end, key LIMIT ?", (limit,))
+            return [_group(row) for row in rows]
+        if active_in is not None:
+            where, params = ["y.year = ?"], [active_in]
+            if era is not None:
+                start, end = parse_years(era)
+                where.append("y.era_start <= ? AND y.era_end >= ?")
+                params += [end, start]
+            return self._active_groups(where, params, limit)
+
+        # Groups overlapping [start, end]: those already active at its start,
+        # then those that started during it, each one ordered index range
+        start, end = parse_years(era)
+        groups = self._active_groups(["y.year = ?", "y.era_start < ?"], [start, start], limit)
+        if len(groups) < limit:
+            rows = self._query("SELECT * FROM groups WHERE era_start >= ? AND era_start <= ? "
+                               "ORDER BY era_start, era_end, key LIMIT ?", (start, end, limit - len(groups)))
+            groups += [_group(row) for row in rows]
+        return groups
+
+    def _active_groups(self, where, params, limit):
+        """Groups of the year index matching `where`, ordered by era"""
+        rows = self._query(f"SELECT g.* FROM group_years y JOIN groups g ON g.key = y.key {_where(where)} "
+                           f"ORDER BY y.era_start, y.era_end, y.key LIMIT ?", params + [limit])
+        return [_group(row) for row in rows]
+
+    def incidents(self, group=None, year_from=None, year_to=None, era=None, limit=DEFAULT_LIMIT):
+        """
+        Return incidents by group and year, see events()
+
+        Returns:
+            list: Incident dicts ordered by year
+        """
+        return self.events('incident', group, year_from, year_to, era, limit)
+
+    def achievements(self, group=None, year_from=None, year_to=None, era=None, limit=DEFAULT_LIMIT):
+        """
+        Return achievements by group and year, see events()
+
+        Returns:
+            list: Achievement dicts ordered by year
+        """
+        return self.events('achievement', group, year_from, year_to, era, limit)
+
+    def events(self, kind, group=None, year_from=None, year_to=None, era=None, limit=DEFAULT_LIMIT):
+        """
+        Return dated records by group and year
+
+        A record matches a year range when it starts inside it; an era
+        such as "1990s" is the range it spans.
+
+        Args:
+            kind (str): "incident" or "achievement"
+            group (str, optional): Group key
+            year_from (int, optional): First year
+            year_to (int, optional): Last year
+            era (str, optional): Era, combined with the year bounds
+            limit (int): Most rows to return
+
+        Returns:
+            list: Dicts with kind, group, year, year_end, year_label, name,
+                description and quote, ordered by year
+        """
+        if era is not None:
+            start, end = parse_years(era)
+            year_from = start if year_from is None else max(year_from, start)
+            year_to = end if year_to is None else min(year_to, end)
+        where, params = ["kind = ?"], [kind]
+        if group is not None:
+            where.append("group_key = ?")
+            params.append(group)
+        if year_from is not None:
+            where.append("year >= ?")
+            params.append(year_from)
+        if year_to is not None:
+            where.append("year <= ?")
+            params.append(year_to)
+        rows = self._query(f"SELECT * FROM events {_where(where)} ORDER BY year, id LIMIT ?", params + [limit])
+        return [_event(row) for row in rows]
+
+    def collection(self, name):
+        """Return one NFT collection as a dict, None if there is none"""
+        rows = self._query("SELECT * FROM collections WHERE name = ?", (name,))
+        return _collection(rows[0]) if rows else None
+
+    def collections(self, rating=None, min_rating=None, limit=DEFAULT_LIMIT):
+        """
+        Return NFT collections by preservation rating
+
+        Args:
+            rating (str, optional): Exact rating such as "A+"
+            min_rating (str, optional): Lowest rating, e.g. "A" includes "A+"
+            limit (int): Most rows to return
+
+        Returns:
+            list: Collection dicts, best rated first
+        """
+        where, params = [], []
+        if rating is not None:
+            where.append("rating_score = ?")
+            params.append(rating_score(rating))
+        if min_rating is not None:
+            where.append("rating_score >= ?")
+            params.append(rating_score(min_rating))
+        rows = self._query(f"SELECT * FROM collections {_where(where)} ORDER BY rating_score DESC, id LIMIT ?",
+                           params + [limit])
+        return [_collection(row) for row in rows]
+
+    def stats(self):
+        """
+        Return record counts
+
+        Returns:
+            dict: groups, incidents, achievements and collections
+        """
+        counts = {'groups': 0, 'incidents': 0, 'achievements': 0, 'collections': 0}
+        for table in ('groups', 'collections'):
+            counts[table] = self._query(f"SELECT COUNT(*) FROM {table}")[0][0]
+        for row in self._query("SELECT kind, COUNT(*) FROM events GROUP BY kind"):
+            counts[row[0] + 's'] = row[1]
+        return counts
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _write(self, sql, rows):
+        with self.transaction():
+            self._db.executemany(sql, rows)
+
+
+def _era_years(key, era_start, era_end):
+    """Rows of the year index for one group"""
+    return [(year, era_start, era_end, key)
+            for year in range(max(era_start, era_end - MAX_ERA_YEARS + 1), era_end + 1)]
+
+
+def _where(conditions):
+    return "WHERE " + " AND ".join(conditions) if conditions else ""
+
+
+def _group(row):
+    group = dict(row)
+    group['members'] = json.loads(group['members'] or '[]')
+    return group
+
+
+def _event(row):
+    event = dict(row)
+    del event['id']
+    event['group'] = event.pop('group_key')
+    return event
+
+
+def _collection(row):
+    collection = dict(row)
+    del collection['id']
+    collection['includes'] = json.loads(collection['includes'] or '[]')
+    return collection
+
+
+def load_museum_data(catalog, registry=None, if_empty=False):
+    """
+    Replace the catalog's records with those of the museum data modules
+
+    The import is one transaction, so workers that share a catalog file
+    and load it at the same time do not duplicate records.
+
+    Args:
+        catalog (MuseumCatalog): Catalog to fill
+        registry (MuseumRegistry, optional): Source records, the process-wide registry if None
+        if_empty (bool): Leave a catalog that already holds records alone
+
+    Returns:
+        MuseumCatalog: The catalog
+    """
+    if registry is None:
+        registry = get_museum_registry()
+    with catalog.transaction():
+        if if_empty and not catalog.is_empty():
+            return catalog
+        catalog.clear()
+        catalog.add_groups(registry.groups.values())
+        catalog.add_events('incident', registry.incidents, group=BR_SCENE)
+        catalog.add_events('achievement', registry.achievements)
+        catalog.add_collections(registry.collections.values())
+    return catalog
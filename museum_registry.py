@@ -0,0 +1,236 @@
+"""
+Museum Data Registry for the OMEGA HACKER HISTORICAL MUSEUM
+Loads the museum data modules once per process into immutable, indexed records
+"""
+
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from brazilian_module import get_br_hacker_data
+from lopht_module import get_lopht_data
+from webarchive_nft_module import get_webarchive_nft_data
+
+# Hacker groups that have no data module of their own
+BASE_GROUPS = {
+    "MOD": {
+        "name": "Masters of Deception",
+        "emoji": "📞",
+        "description": "Phone phreaking specialists who rivaled Legion of Doom",
+        "members": ["Phiber Optik", "Acid Phreak", "Scorpion", "Corrupt"],
+        "era": "Early 1990s"
+    },
+    "CDC": {
+        "name": "Cult of the Dead Cow",
+        "emoji": "🐄",
+        "description": "Coined 'hacktivism' and created Back Orifice",
+        "members": ["Mudge", "Dildog", "Deth Veggie", "Omega"],
+        "era": "1980s-1990s"
+    },
+    "LOD": {
+        "name": "Legion of Doom",
+        "emoji": "⚡",
+        "description": "Legendary group known for technical journals",
+        "members": ["Erik Bloodaxe", "The Mentor", "Lex Luthor"],
+        "era": "1980s-early 1990s"
+    }
+}
+
+
+def freeze(value):
+    """
+    Return a read-only copy of nested module data
+
+    Args:
+        value: Data made of dicts, lists and scalars
+
+    Returns:
+        The same data with dicts as read-only mappings and lists as tuples
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+@dataclass(frozen=True, slots=True)
+class HackerGroup:
+    """A hacking collective that manuscripts can be themed with"""
+
+    key: str
+    name: str
+    emoji: str
+    description: str
+    era: str
+    members: tuple = ()
+    leet: str = None
+
+    def as_dict(self):
+        """
+        Return the group in the dict form the renderers take
+
+        Returns:
+            dict: name, emoji, description, members, era and leet when set
+        """
+        group = {
+            "name": self.name,
+            "emoji": self.emoji,
+            "description": self.description,
+            "members": list(self.members),
+            "era": self.era,
+        }
+        if self.leet is not None:
+            group["leet"] = self.leet
+        return group
+
+
+@dataclass(frozen=True, slots=True)
+class Incident:
+    """A dated operation or event"""
+
+    year: int
+    name: str
+    description: str
+    source: str
+
+
+@dataclass(frozen=True, slots=True)
+class Achievement:
+    """A milestone of a group, the year may be a range such as "1992-2000" """
+
+    year: object
+    name: str
+    description: str
+    source: str
+    quote: str = None
+
+
+@dataclass(frozen=True, slots=True)
+class Collection:
+    """A preserved NFT collection"""
+
+    name: str
+    items: int = None
+    nft_contract: str = None
+    preservation_rating: str = None
+    url: str = None
+    description: str = None
+    includes: tuple = ()
+
+
+class MuseumRegistry:
+    """
+    Immutable view of all museum data with lookups by key
+
+    `groups` and `collections` are read-only mappings keyed by group key
+    and collection name, `sources` holds the frozen data of every module
+    keyed by the data_sources() names.
+
+    Example:
+        registry = get_museum_registry()
+        registry.groups["L0PHT"].era
+    """
+
+    def __init__(self, groups, incidents, achievements, collections, sources):
+        """
+        Args:
+            groups (iterable): HackerGroup records
+            incidents (iterable): Incident records
+            achievements (iterable): Achievement records
+            collections (iterable): Collection records
+            sources (dict): Module data by data source name
+        """
+        self.groups = MappingProxyType({group.key: group for group in groups})
+        self.incidents = tuple(incidents)
+        self.achievements = tuple(achievements)
+        self.collections = MappingProxyType({collection.name: collection for collection in collections})
+        self.sources = freeze(dict(sources))
+
+    @classmethod
+    def load(cls):
+        """
+        Build a registry from the museum data modules
+
+        Returns:
+            MuseumRegistry: New registry
+        """
+        br_data = get_br_hacker_data()
+        lopht_data = get_lopht_data()
+        webarchive_data = get_webarchive_nft_data()
+
+        groups = [HackerGroup(key, group["name"], group["emoji"], group["description"], group["era"],
+                              tuple(group["members"]))
+                  for key, group in BASE_GROUPS.items()]
+        # Brazilian manuscripts use the PT-BR l33t rules
+        groups += [HackerGroup(key, group["name"], group["emoji"], group["description"], group["era"],
+                               ("Unknown",), leet="pt-br")
+                   for key, group in br_data["groups"].items()]
+        groups.append(HackerGroup(
+            "L0PHT", lopht_data["name"], lopht_data["emoji"],
+            "Created L0phtCrack and testified to Congress in 1998", lopht_data["years_active"],
+            tuple(member.split(" (")[0] for member in lopht_data["founders"][:5])))
+
+        incidents = [Incident(incident["year"], incident["name"], incident["description"], "br")
+                     for incident in br_data["incidents"]]
+        achievements = [Achievement(achievement["year"], achievement["name"], achievement["description"],
+                                    "L0PHT", achievement.get("quote"))
+                        for achievement in lopht_data["achievements"]]
+        collections = [Collection(collection["name"], collection.get("items"), collection.get("nft_contract"),
+                                  collection.get("preservation_rating"), collection.get("url"),
+                                  collection.get("description"), tuple(collection.get("includes", ())))
+                       for collection in webarchive_data["collections"]]
+
+        return cls(groups, incidents, achievements, collections, {
+            'br_data': br_data,
+            'lopht_data': lopht_data,
+            'webarchive_data': webarchive_data,
+        })
+
+    def group(self, key, default=None):
+        """Return the HackerGroup with a key, default if there is none"""
+        return self.groups.get(key, default)
+
+    def collection(self, name, default=None):
+        """Return the Collection with a name, default if there is none"""
+        return self.collections.get(name, default)
+
+    def hacker_groups(self):
+        """
+        Return every group in the dict form the renderers take
+
+        The dicts are new on every call and picklable, so they can be
+        handed to render worker processes.
+
+        Returns:
+            dict: Group dicts by group key
+        """
+        return {key: group.as_dict() for key, group in self.groups.items()}
+
+    def data_sources(self):
+        """
+        Return the frozen module data the UI tabs read
+
+        Returns:
+            dict: br_data, lopht_data and webarchive_data
+        """
+        return dict(self.sources)
+
+
+_default_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_museum_registry():
+    """
+    Return the process-wide museum registry, loading it on first use
+
+    Returns:
+        MuseumRegistry: Shared registry
+    """
+    global _default_registry
+    if _default_registry is None:
+        with _registry_lock:
+            if _default_registry is None:
+                _default_registry = MuseumRegistry.load()
+    return _default_registry
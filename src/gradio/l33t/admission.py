@@ -0,0 +1,337 @@
+"""
+H4X0R-OMEGA-H1ST0RY Admission Control
+Cost-based admission of manuscript renders against a per-process work budget
+"""
+
+import asyncio
+import collections
+import contextlib
+import threading
+
+from .encoders import get_encoder
+from .fonts import TEXT_FONT_SIZE, get_font_registry
+from .layout import (
+    BLANK_LINE_HEIGHT,
+    CANVAS_WIDTH,
+    CONTENT_BOTTOM_MARGIN,
+    CONTENT_TOP,
+    LINE_HEIGHT,
+    MIN_CANVAS_HEIGHT,
+    get_font_metrics,
+    text_width,
+)
+from .manuscript import LINE_PREFIXES, MAX_PAGE_HEIGHT, RenderRejected
+
+# Cost model, in milliseconds of render work on one core. Measured with
+# the bundled presets: paint is ~0.9 ms per text row, the pooled background
+# ~17 ns and the encoders 20-190 ns per canvas pixel.
+BASE_COST_MS = 5.0
+TEXT_MS_PER_LINE = 0.05
+PAINT_MS_PER_ROW = 0.9
+BACKGROUND_NS_PER_PIXEL = 17.0
+
+# Default controller configuration
+DEFAULT_BUDGET_MS = 4000.0
+DEFAULT_MAX_QUEUE = 32
+DEFAULT_MAX_WAIT = 10.0
+
+
+def encode_ns_per_pixel(encoder=None):
+    """
+    Estimate the encode time of one canvas pixel
+
+    Args:
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+
+    Returns:
+        float: Nanoseconds per pixel
+    """
+    encoder = get_encoder(encoder)
+    if encoder.format == 'WEBP':
+        return 160.0 if encoder.lossless else 110.0
+    if encoder.palette:
+        cost = 15.0 + 3.0 * encoder.compress_level
+    else:
+        cost = 150.0 + 6.0 * encoder.compress_level
+    return cost * 4 if encoder.optimize else cost
+
+
+def render_cost(lines, rows, pixels, encoder=None):
+    """
+    Estimate the work of a render from what it draws
+
+    Args:
+        lines (int): Source lines parsed and hackerized
+        rows (int): Text rows drawn
+        pixels (int): Canvas pixels painted and encoded
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+
+    Returns:
+        float: Estimated milliseconds
+    """
+    return (BASE_COST_MS + TEXT_MS_PER_LINE * lines + PAINT_MS_PER_ROW * rows
+            + (BACKGROUND_NS_PER_PIXEL + encode_ns_per_pixel(encoder)) * pixels / 1e6)
+
+
+def estimate_cost(markdown_text, encoder=None, width=CANVAS_WIDTH, font=None):
+    """
+    Estimate the work of rendering a manuscript without rendering it
+
+    Every source line is parsed and hackerized, but only the first page is
+    painted, so rows and pixels stop at MAX_PAGE_HEIGHT. Rows are counted
+    from the source lines wrapped at the text width, which is close enough
+    to the rendered layout to rank requests.
+
+    Args:
+        markdown_text (str): Markdown text to convert
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+        width (int): Canvas width
+        font (ImageFont, optional): Text font, the registry's text font if None
+
+    Returns:
+        dict: lines, rows, height, pixels and cost (estimated milliseconds)
+    """
+    if font is None:
+        font = get_font_registry().primary_font(TEXT_FONT_SIZE)
+    prefix = max(len(prefix) for prefix in LINE_PREFIXES)
+    columns = max(1, int(text_width(width) // max(1.0, get_font_metrics(font).advance('M'))) - prefix)
+
+    lines = markdown_text.count('\n') + 1
+    rows = 0
+    bottom = CONTENT_TOP
+    for line in markdown_text.split('\n', (MAX_PAGE_HEIGHT - CONTENT_TOP) // BLANK_LINE_HEIGHT):
+        if bottom >= MAX_PAGE_HEIGHT:
+            break
+        if line.strip():
+            line_rows = -(-len(line) // columns)
+            rows += line_rows
+            bottom += line_rows * LINE_HEIGHT
+        else:
+            bottom += BLANK_LINE_HEIGHT
+    height = min(max(bottom + CONTENT_BOTTOM_MARGIN, MIN_CANVAS_HEIGHT), MAX_PAGE_HEIGHT)
+    pixels = width * height
+
+    cost = render_cost(lines, rows, pixels, encoder)
+    return {'lines': lines, 'rows': rows, 'height': height, 'pixels': pixels, 'cost': cost}
+
+
+class _Waiter:
+    """One queued request"""
+
+    __slots__ = ('cost', 'wake', 'granted')
+
+    def __init__(self, cost, wake):
+        self.cost = cost
+        self.wake = wake
+        self.granted = False
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdmissionController:
+    """
+    Admits, queues or rejects renders by their estimated cost
+
+    The controller tracks the estimated work of the renders in flight.
+    A request is admitted when its cost fits in the remaining budget,
+    queued (first come, first served) while it does not, and rejected with
+    RenderRejected when it alone exceeds `max_cost`, when `max_queue`
+    requests are already waiting, or when it waited `max_wait` seconds.
+    A request is always admitted into an idle process, so a budget below
+    `max_cost` cannot lock a request out.
+
+    Example:
+        admission = AdmissionController(budget=4000)
+        create_hacker_manuscript(text, groups, "L0PHT", admission=admission)
+    """
+
+    def __init__(self, budget=DEFAULT_BUDGET_MS, max_queue=DEFAULT_MAX_QUEUE, max_wait=DEFAULT_MAX_WAIT,
+                 max_cost=None, estimator=estimate_cost):
+        """
+        Args:
+            budget (float): Estimated milliseconds of work allowed in flight
+            max_queue (int): Requests allowed to wait for budget
+            max_wait (float, optional): Seconds a request may wait, None for no limit
+            max_cost (float, optional): Largest single request, the budget if None
+            estimator (callable): (markdown_text, encoder) -> dict with a 'cost'
+        """
+        self.budget = float(budget)
+        self.max_queue = max(0, max_queue)
+        self.max_wait = max_wait
+        self.max_cost = self.budget if max_cost is None else float(max_cost)
+        self.estimator = estimator
+
+        self._lock = threading.Lock()
+        self._waiters = collections.deque()
+        self.in_flight = 0.0
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_too_large = 0
+        self.rejected_busy = 0
+        self.timed_out = 0
+        self.peak_in_flight = 0.0
+
+    def estimate(self, markdown_text, encoder=None):
+        """Return the cost estimate of a request, see estimate_cost()"""
+        return self.estimator(markdown_text, encoder)
+
+    def acquire(self, cost, timeout=None):
+        """
+        Reserve budget for a render, waiting in line if needed
+
+        Args:
+            cost (float): Estimated milliseconds of the render
+            timeout (float, optional): Seconds to wait, max_wait if None
+
+        Raises:
+            RenderRejected: The request is too large, the queue is full or
+                the wait timed out
+        """
+        event = threading.Event()
+        waiter = self._enqueue(cost, event.set)
+        if waiter is None:
+            return
+        if not event.wait(self.max_wait if timeout is None else timeout) and not self._abandon(waiter):
+            raise self._timed_out()
+
+    async def acquire_async(self, cost, timeout=None):
+        """
+        Reserve budget for a render without blocking the event loop
+
+        Same as acquire(); a cancelled waiter leaves the queue or gives
+        back the budget it was just granted.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiter = self._enqueue(cost, lambda: loop.call_soon_threadsafe(_resolve, future))
+        if waiter is None:
+            return
+        try:
+            await asyncio.wait_for(future, self.max_wait if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            if not self._abandon(waiter):
+                raise self._timed_out() from None
+        except asyncio.CancelledError:
+            if self._abandon(waiter):
+                self.release(cost)
+            raise
+
+    def release(self, cost):
+        """Return the budget of a finished render and admit whoever now fits"""
+        with self._lock:
+            self.in_flight = max(0.0, self.in_flight - cost)
+            self._grant()
+
+    @contextlib.contextmanager
+    def admit(self, markdown_text, encoder=None, cost=None):
+        """
+        Hold budget for the render of one request, e.g. `with admission.admit(text): ...`
+
+        Args:
+            markdown_text (str): Markdown text to convert
+            encoder (str or ImageEncoder, optional): Output preset
+            cost (float, optional): Milliseconds to charge instead of the
+                estimate, e.g. for a partial repaint (see render_cost())
+
+        Yields:
+            dict: The request's cost estimate
+
+        Raises:
+            RenderRejected: The request was not admitted
+        """
+        estimate = self.estimate(markdown_text, encoder) if cost is None else {'cost': cost}
+        self.acquire(estimate['cost'])
+        try:
+            yield estimate
+        finally:
+            self.release(estimate['cost'])
+
+    @contextlib.asynccontextmanager
+    async def admit_async(self, markdown_text, encoder=None):
+        """Async variant of admit()"""
+        estimate = self.estimate(markdown_text, encoder)
+        await self.acquire_async(estimate['cost'])
+        try:
+            yield estimate
+        finally:
+            self.release(estimate['cost'])
+
+    def stats(self):
+        """
+        Return controller counters
+
+        Returns:
+            dict: budget, in_flight, peak_in_flight, waiting, admitted, queued,
+                rejected_too_large, rejected_busy and timed_out
+        """
+        with self._lock:
+            return {
+                'budget': self.budget,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'waiting': len(self._waiters),
+                'admitted': self.admitted,
+                'queued': self.queued,
+                'rejected_too_large': self.rejected_too_large,
+                'rejected_busy': self.rejected_busy,
+                'timed_out': self.timed_out,
+            }
+
+    def _fits(self, cost):
+        return self.in_flight == 0 or self.in_flight + cost <= self.budget
+
+    def _take(self, cost):
+        self.in_flight += cost
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        self.admitted += 1
+
+    def _enqueue(self, cost, wake):
+        """Admit now (returns None), queue (returns the waiter) or raise RenderRejected"""
+        if cost > self.max_cost:
+            with self._lock:
+                self.rejected_too_large += 1
+            raise RenderRejected(
+                f"This document would take about {cost / 1000:.1f}s to render, more than the "
+                f"{self.max_cost / 1000:.1f}s allowed per request. Split it into smaller parts "
+                f"or pick a faster quality preset.")
+        with self._lock:
+            if not self._waiters and self._fits(cost):
+                self._take(cost)
+                return None
+            if len(self._waiters) >= self.max_queue:
+                self.rejected_busy += 1
+                raise RenderRejected(
+                    f"The server is busy rendering other manuscripts ({len(self._waiters)} waiting). "
+                    f"Please try again in a few seconds.")
+            waiter = _Waiter(cost, wake)
+            self._waiters.append(waiter)
+            self.queued += 1
+            return waiter
+
+    def _grant(self):
+        """Admit queued requests in order while the head fits, caller holds the lock"""
+        while self._waiters and self._fits(self._waiters[0].cost):
+            waiter = self._waiters.popleft()
+            self._take(waiter.cost)
+            waiter.granted = True
+            waiter.wake()
+
+    def _abandon(self, waiter):
+        """Take a waiter out of line, returns True when it was granted meanwhile"""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._waiters.remove(waiter)
+            # The head may have been the only one blocking smaller requests
+            self._grant()
+            return False
+
+    def _timed_out(self):
+        with self._lock:
+            self.timed_out += 1
+        return RenderRejected("The server is busy rendering other manuscripts and your request waited "
+                              "too long. Please try again in a few seconds.")
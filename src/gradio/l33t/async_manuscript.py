@@ -0,0 +1,233 @@
+"""
+H4X0R-OMEGA-H1ST0RY Async Manuscript Generator
+Event-loop friendly manuscript rendering with cancellation
+"""
+
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .manuscript import (
+    MAX_PAGE_HEIGHT,
+    PREVIEW_HEIGHT,
+    ManuscriptRequest,
+    RenderRejected,
+    layout_page,
+    manuscript_html,
+    prepare_manuscript,
+    render_manuscript_png,
+    render_page,
+    render_preview,
+)
+from .memory import bind_account, finish_account, start_account
+
+# Threads running the CPU-heavy stages of async renders
+DEFAULT_RENDER_THREADS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor():
+    """
+    Return the process-wide executor of the async renders, creating it on first use
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: Shared executor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=DEFAULT_RENDER_THREADS,
+                                           thread_name_prefix="manuscript-render")
+        return _executor
+
+
+def configure_render_executor(max_workers=DEFAULT_RENDER_THREADS):
+    """
+    Replace the process-wide executor with one of the given size
+
+    Args:
+        max_workers (int): Render threads
+
+    Returns:
+        concurrent.futures.ThreadPoolExecutor: The new shared executor
+    """
+    global _executor
+    with _executor_lock:
+        previous = _executor
+        _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="manuscript-render")
+    if previous is not None:
+        previous.shutdown(wait=False)
+    return _executor
+
+
+def _bound(account, func, *args, **kwargs):
+    """Run one executor stage with the request's memory account bound"""
+    with bind_account(account):
+        return func(*args, **kwargs)
+
+
+def _stage(loop, executor, account, func, *args, **kwargs):
+    """Run one CPU stage in the executor, accounting its memory to `account`"""
+    return loop.run_in_executor(executor, functools.partial(_bound, account, func, *args, **kwargs))
+
+
+async def create_hacker_manuscript_async(markdown_text, hacker_groups=None, group_theme=None, seed=None,
+                                         use_cache=True, encoder=None, executor=None, admission=None,
+                                         matrix_style=None):
+    """
+    Async variant of create_hacker_manuscript()
+
+    The cache lookup runs on the event loop; parsing and hackerizing, then
+    background, drawing and encoding of the page run in `executor`, so the
+    loop keeps serving other events meanwhile. When the awaiting task is
+    cancelled (e.g. the client disconnected) the stage in flight stops at
+    its next checkpoint and nothing after it runs.
+
+    Args:
+        markdown_text (str): Markdown text to convert
+        hacker_groups (dict): Dictionary of hacker group information
+        group_theme (str, optional): Hacker group theme to apply
+        seed (int, optional): Render seed, derived from the content if None
+        use_cache (bool): Set to False to bypass the render cache
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+        executor (concurrent.futures.Executor, optional): Thread executor for
+            the CPU stages, the shared render executor if None
+        admission (AdmissionController, optional): Work budget the render must
+            fit in, waited for without blocking the loop
+        matrix_style (tuple, optional): Background (column step, glow radius),
+            the full style if None
+
+    Returns:
+        tuple: (html_content, image_bytes) - the same result as create_hacker_manuscript()
+
+    Raises:
+        asyncio.CancelledError: If the awaiting task was cancelled
+    """
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        executor = get_render_executor()
+    cancel = threading.Event()
+    account = start_account("manuscript")
+    request = ManuscriptRequest(markdown_text, hacker_groups, group_theme, seed, use_cache, encoder,
+                                matrix_style, account)
+
+    try:
+        cached = request.prepare()
+        if cached is not None:
+            return cached
+
+        async with request.admit_async(admission):
+            prepared = await _stage(
+                loop, executor, account, prepare_manuscript, markdown_text, request.hacker_groups, group_theme,
+                MAX_PAGE_HEIGHT, request.seed)
+            image_bytes = await _stage(loop, executor, account, render_page, prepared, 1, encoder=encoder,
+                                       cancel=cancel, matrix_style=matrix_style)
+        return request.finish((manuscript_html(prepared), image_bytes))
+
+    except asyncio.CancelledError:
+        # Stop the stage still running in the executor
+        cancel.set()
+        raise
+    except RenderRejected as e:
+        return request.rejected(e)
+    except Exception as e:
+        return request.failed(e)
+    finally:
+        finish_account(account)
+
+
+async def create_hacker_manuscript_progressive(markdown_text, hacker_groups=None, group_theme=None,
+                                               seed=None, use_cache=True, encoder=None, executor=None,
+                                               admission=None, matrix_style=None, observe_render=None):
+    """
+    Async generator that yields a quick preview before the finished manuscript
+
+    For canvases taller than one screen it first yields the HTML with a
+    low-resolution preview of the first screenful (render_preview()), then
+    the full image. Both come from one parse and one layout: the full
+    render continues from the prepared stages, and the preview consumes no
+    randomness, so the final image equals create_hacker_manuscript().
+    Short manuscripts and cache hits yield the final result only.
+
+    Args:
+        markdown_text (str): Markdown text to convert
+        hacker_groups (dict): Dictionary of hacker group information
+        group_theme (str, optional): Hacker group theme to apply
+        seed (int, optional): Render seed, derived from the content if None
+        use_cache (bool): Set to False to bypass the render cache
+        encoder (str or ImageEncoder, optional): Output preset of the final image
+        executor (concurrent.futures.Executor, optional): Thread executor for
+            the CPU stages, the shared render executor if None
+        admission (AdmissionController, optional): Work budget the render must fit in
+        matrix_style (tuple, optional): Background (column step, glow radius),
+            the full style if None
+        observe_render (callable, optional): Called with the seconds a finished
+            render took, without the admission wait and the consumer's time
+
+    Yields:
+        tuple: (html_content, image_bytes), the last one is the final render
+    """
+    loop = asyncio.get_running_loop()
+    if executor is None:
+        executor = get_render_executor()
+    cancel = threading.Event()
+    finished = False
+    account = start_account("manuscript-progressive")
+    request = ManuscriptRequest(markdown_text, hacker_groups, group_theme, seed, use_cache, encoder,
+                                matrix_style, account)
+
+    async def render(preview_ready):
+        # Holds the admission budget for the render work only, never while
+        # the consumer handles the preview
+        async with request.admit_async(admission):
+            start = time.perf_counter()
+            prepared = await _stage(
+                loop, executor, account, prepare_manuscript, markdown_text, request.hacker_groups,
+                group_theme, MAX_PAGE_HEIGHT, request.seed)
+            layout, footer_text = await _stage(loop, executor, account, layout_page, prepared, 1)
+            html_content = manuscript_html(prepared)
+
+            preview = None
+            if layout['height'] > PREVIEW_HEIGHT:
+                preview = await _stage(loop, executor, account, render_preview, layout,
+                                       prepared['font'], footer_text)
+            preview_ready.set_result(None if preview is None else (html_content, preview))
+
+            image_bytes = await _stage(loop, executor, account, render_manuscript_png, layout,
+                                       font=prepared['font'], footer_text=footer_text,
+                                       rng=prepared['rng'], encoder=encoder, cancel=cancel,
+                                       matrix_style=matrix_style)
+            if observe_render is not None:
+                observe_render(time.perf_counter() - start)
+        return html_content, image_bytes
+
+    task = None
+    try:
+        try:
+            result = request.prepare()
+            if result is None:
+                preview_ready = loop.create_future()
+                task = asyncio.ensure_future(render(preview_ready))
+                await asyncio.wait([preview_ready, task], return_when=asyncio.FIRST_COMPLETED)
+                if preview_ready.done() and preview_ready.result() is not None:
+                    # The final stage keeps running in the executor meanwhile
+                    yield preview_ready.result()
+                result = request.finish(await task)
+        except RenderRejected as e:
+            result = request.rejected(e)
+        except Exception as e:
+            result = request.failed(e)
+        finished = True
+        yield result
+
+    finally:
+        # Cancelled or closed early: stop the render and give its budget back
+        if not finished:
+            cancel.set()
+            if task is not None:
+                task.cancel()
+        finish_account(account)
@@ -0,0 +1,371 @@
+"""
+H4X0R-OMEGA-H1ST0RY Background Pool
+Keeps ready-made matrix backgrounds so requests only crop or tile them
+"""
+
+import collections
+import queue
+import random
+import threading
+
+import numpy as np
+from PIL import Image
+
+from .matrix import DEFAULT_MATRIX_STYLE, get_glyph_atlas, render_matrix_field
+from .memory import note_canvas
+from .metrics import span
+
+# Default pool configuration
+DEFAULT_WIDTH = 800
+DEFAULT_BUCKET_HEIGHT = 400
+DEFAULT_MAX_HEIGHT = 4000
+DEFAULT_VARIANTS = 2
+DEFAULT_MAX_BYTES = 128 * 1024 * 1024
+DEFAULT_WARM_HEIGHTS = (400, 800, 1200, 1600)
+
+# Most buckets waiting for a refill, further refills are dropped
+MAX_PENDING_FILLS = 64
+
+# Base seed of the pool, every (width, bucket, variant) slot derives from it
+DEFAULT_SEED = 0x4D415452
+
+
+class BackgroundPool:
+    """
+    Pool of pre-rendered matrix backgrounds keyed by height bucket
+
+    Heights are rounded up to a multiple of `bucket_height`; every bucket
+    (per matrix style, see matrix.DEFAULT_MATRIX_STYLE) has `variants` slots, each rendered from its own fixed seed so a slot always
+    holds the same picture whether it came from the pool or was rendered on a
+    miss. A request crops its bucket down to the exact height, and heights
+    above `max_height` tile the largest bucket.
+
+    A worker thread fills the warm buckets at startup and refills the slots of
+    every bucket a request touches, including slots evicted by the memory
+    ceiling. Each bucket waits in the refill queue at most once, and buckets
+    whose slots exceed the ceiling on their own are never refilled.
+    """
+
+    def __init__(self, width=DEFAULT_WIDTH, bucket_height=DEFAULT_BUCKET_HEIGHT,
+                 max_height=DEFAULT_MAX_HEIGHT, variants=DEFAULT_VARIANTS,
+                 max_bytes=DEFAULT_MAX_BYTES, warm_heights=DEFAULT_WARM_HEIGHTS,
+                 seed=DEFAULT_SEED, enabled=True):
+        """
+        Args:
+            width (int): Width the warm buckets are rendered at
+            bucket_height (int): Height granularity of the buckets
+            max_height (int): Tallest bucket, taller requests are tiled
+            variants (int): Distinct backgrounds kept per bucket
+            max_bytes (int): Memory ceiling for all pooled images
+            warm_heights (iterable): Heights filled when the worker starts
+            seed (int): Base seed of the pooled backgrounds
+            enabled (bool): When False every request renders a fresh background
+        """
+        self.width = width
+        self.bucket_height = bucket_height
+        self.max_height = max(bucket_height, max_height - max_height % bucket_height)
+        self.variants = max(1, variants)
+        self.max_bytes = max_bytes
+        self.warm_heights = tuple(warm_heights)
+        self.seed = seed
+        self.enabled = enabled
+
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._fill_queue = queue.Queue(MAX_PENDING_FILLS)
+        self._pending_fills = set()
+        self._worker = None
+        self._stopping = threading.Event()
+
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+        self.evictions = 0
+
+    def bucket_for(self, height):
+        """
+        Return the bucket height that serves a requested height
+
+        Args:
+            height (int): Requested background height
+
+        Returns:
+            int: Bucket height, capped at max_height
+        """
+        bucket = -(-height // self.bucket_height) * self.bucket_height
+        return min(max(bucket, self.bucket_height), self.max_height)
+
+    def get(self, width, height, rng=None, style=None):
+        """
+        Return a matrix background of exactly width x height
+
+        Args:
+            width (int): Width of the background
+            height (int): Height of the background
+            rng (random.Random, optional): Picks the pool slot, a fresh one if None
+            style (tuple, optional): (column step, glow radius), the full style if None
+
+        Returns:
+            PIL.Image: Fresh RGBA image the caller may draw on
+        """
+        if rng is None:
+            rng = random.Random()
+        return self.get_region(width, height, 0, height, rng.randrange(self.variants), rng, style)
+
+    def get_region(self, width, height, top, band_height, variant=0, rng=None, style=None):
+        """
+        Return one horizontal band of a width x height background
+
+        Bands of the same background (same size and variant) line up
+        seamlessly, so a tall canvas can be rendered strip by strip.
+
+        Args:
+            width (int): Width of the background
+            height (int): Full height of the background
+            top (int): First row of the band
+            band_height (int): Rows in the band
+            variant (int): Pool slot to use
+            rng (random.Random, optional): Seeds the fresh background when the
+                pool is disabled
+            style (tuple, optional): (column step, glow radius), the full style if None
+
+        Returns:
+            PIL.Image: Fresh RGBA image of width x band_height
+        """
+        style = tuple(style) if style is not None else DEFAULT_MATRIX_STYLE
+        if not self.enabled:
+            with self._lock:
+                self.misses += 1
+            np_rng = np.random.default_rng(rng.getrandbits(64)) if rng is not None else None
+            with span("matrix"):
+                return _render_style(width, band_height, np_rng, style)
+
+        bucket = self.bucket_for(height)
+        key = (width, bucket, variant % self.variants, style)
+
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if image is None:
+            image = self._render(key)
+            self._store(key, image)
+
+        # Refill whatever this bucket is missing in the background
+        if self._worker is not None:
+            self._queue_fill(width, bucket, style)
+
+        return self._fit(image, top, band_height)
+
+    def start(self):
+        """Start the refill worker and queue the warm buckets"""
+        if self._worker is not None or not self.enabled:
+            return
+        self._stopping.clear()
+        # Drop fills a previous worker left queued
+        self._fill_queue = queue.Queue(MAX_PENDING_FILLS)
+        with self._lock:
+            self._pending_fills.clear()
+        self._worker = threading.Thread(target=self._run, name="matrix-background-pool", daemon=True)
+        self._worker.start()
+        for height in self.warm_heights:
+            self._queue_fill(self.width, self.bucket_for(height), DEFAULT_MATRIX_STYLE)
+
+    def stop(self, timeout=None):
+        """
+        Stop the refill worker
+
+        Args:
+            timeout (float, optional): Seconds to wait for the worker to exit
+        """
+        worker = self._worker
+        if worker is None:
+            return
+        self._stopping.set()
+        try:
+            self._fill_queue.put_nowait(None)
+        except queue.Full:
+            # The worker is not waiting, it sees the stop flag after its next item
+            pass
+        worker.join(timeout)
+        self._worker = None
+
+    def options(self):
+        """
+        Return the keyword arguments that recreate this pool's configuration
+
+        Returns:
+            dict: Options for BackgroundPool or configure_background_pool()
+        """
+        return {
+            'width': self.width,
+            'bucket_height': self.bucket_height,
+            'max_height': self.max_height,
+            'variants': self.variants,
+            'max_bytes': self.max_bytes,
+            'warm_heights': self.warm_heights,
+            'seed': self.seed,
+            'enabled': self.enabled,
+        }
+
+    def clear(self):
+        """Drop every pooled background"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return pool counters
+
+        Returns:
+            dict: hits, misses, fills, evictions, entries and bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'fills': self.fills,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _run(self):
+        """Worker loop: render every missing slot of the queued buckets"""
+        while not self._stopping.is_set():
+            item = self._fill_queue.get()
+            if item is None:
+                break
+            with self._lock:
+                self._pending_fills.discard(item)
+            width, bucket, style = item
+            for variant in range(self.variants):
+                if self._stopping.is_set():
+                    break
+                key = (width, bucket, variant, style)
+                with self._lock:
+                    present = key in self._entries
+                if not present:
+                    self._store(key, self._render(key))
+                    with self._lock:
+                        self.fills += 1
+
+    def _queue_fill(self, width, bucket, style):
+        """Queue a bucket for the worker unless it is full, already queued or can never be pooled"""
+        if not self._fits(width, bucket):
+            return
+        item = (width, bucket, style)
+        with self._lock:
+            if item in self._pending_fills:
+                return
+            if all((width, bucket, variant, style) in self._entries for variant in range(self.variants)):
+                return
+            self._pending_fills.add(item)
+        try:
+            self._fill_queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self._pending_fills.discard(item)
+
+    def _fits(self, width, bucket):
+        """Whether one RGBA slot of this size fits under the memory ceiling"""
+        return width * bucket * 4 <= self.max_bytes
+
+    def _render(self, key):
+        """Render the background of one pool slot from its own seed"""
+        width, bucket, variant, style = key
+        np_rng = np.random.default_rng([self.seed, width, bucket, variant])
+        with span("matrix"):
+            return _render_style(width, bucket, np_rng, style)
+
+    def _store(self, key, image):
+        """Insert a slot and evict least recently used slots over the ceiling"""
+        size = image.width * image.height * len(image.getbands())
+        with self._lock:
+            if key in self._entries:
+                return
+            if size > self.max_bytes:
+                return
+            self._entries[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.width * evicted.height * len(evicted.getbands())
+                self.evictions += 1
+
+    @staticmethod
+    def _fit(image, top, band_height):
+        """Cut rows [top, top + band_height) from the vertical tiling of image"""
+        note_canvas("background", image.width, band_height, len(image.getbands()))
+        if top + band_height <= image.height:
+            return image.crop((0, top, image.width, top + band_height))
+        band = Image.new(image.mode, (image.width, band_height))
+        row = top
+        while row < top + band_height:
+            source_top = row % image.height
+            rows = min(image.height - source_top, top + band_height - row)
+            band.paste(image.crop((0, source_top, image.width, source_top + rows)), (0, row - top))
+            row += rows
+        return band
+
+
+def _render_style(width, height, np_rng, style):
+    """Render a matrix field in the given (column step, glow radius) style"""
+    column_step, glow_radius = style
+    atlas = get_glyph_atlas() if style == DEFAULT_MATRIX_STYLE else get_glyph_atlas(glow_radius=glow_radius)
+    return render_matrix_field(width, height, atlas=atlas, np_rng=np_rng, column_step=column_step)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_background_pool():
+    """
+    Return the process-wide background pool, creating it on first use
+
+    Returns:
+        BackgroundPool: Shared pool
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = BackgroundPool()
+        return _default_pool
+
+
+def configure_background_pool(**options):
+    """
+    Replace the process-wide pool with a newly configured one
+
+    Args:
+        **options: Keyword arguments for BackgroundPool
+
+    Returns:
+        BackgroundPool: The new shared pool (not started)
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.stop()
+        _default_pool = BackgroundPool(**options)
+        return _default_pool
+
+
+def start_background_pool():
+    """
+    Start the refill worker of the process-wide pool
+
+    Returns:
+        BackgroundPool: Shared pool
+    """
+    pool = get_background_pool()
+    pool.start()
+    return pool
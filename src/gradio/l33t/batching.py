@@ -0,0 +1,214 @@
+"""
+H4X0R-OMEGA-H1ST0RY Render Batching
+Coalesces concurrent convert requests into batches that share one render pass
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .manuscript import create_hacker_manuscripts, render_error
+
+# Default batching configuration
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_MAX_BATCH_DELAY = 0.05
+DEFAULT_MAX_QUEUE_SIZE = 64
+
+
+class BatchQueueFull(RuntimeError):
+    """The batcher already holds max_queue_size waiting requests"""
+
+
+class ManuscriptBatcher:
+    """
+    Micro-batcher for the convert endpoint
+
+    Gradio's batched events hand over whatever is queued when a slot frees
+    up, but have no delay knob. This batcher adds one: the first request of
+    a batch waits up to `max_batch_delay` seconds for more, then up to
+    `max_batch_size` requests are rendered together with
+    create_hacker_manuscripts(). It does the shared setup once, renders
+    identical requests (e.g. several visitors clicking the same template)
+    only once and hands the distinct ones to `render_threads` threads at
+    the same time, so a render pool behind `renderer` gets one request per
+    worker. Each item passes `admission` on its own; with `quality` the
+    whole batch renders at one tier.
+
+    Example:
+        batcher = ManuscriptBatcher(hacker_groups, max_batch_size=8).start()
+        html_list, image_list = batcher.render_batch(texts, groups)
+    """
+
+    def __init__(self, hacker_groups=None, max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+                 max_batch_delay=DEFAULT_MAX_BATCH_DELAY, max_queue_size=DEFAULT_MAX_QUEUE_SIZE,
+                 encoder=None, renderer=None, admission=None, quality=None, render_threads=None):
+        """
+        Args:
+            hacker_groups (dict, optional): Group information used by every render
+            max_batch_size (int): Most requests rendered in one batch
+            max_batch_delay (float): Seconds the first request waits for company
+            max_queue_size (int): Most requests waiting at once, also the Gradio queue size
+            encoder (str or ImageEncoder, optional): Output preset of every render
+            renderer (callable, optional): Replacement for render_manuscript(), e.g.
+                a render process pool
+            admission (AdmissionController, optional): Work budget every render must fit in
+            quality (QualityController, optional): Picks the quality tier of each batch
+            render_threads (int, optional): Items of a batch rendered at once,
+                max_batch_size if None
+        """
+        self.hacker_groups = hacker_groups or {}
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_delay = max(0.0, max_batch_delay)
+        self.max_queue_size = max(self.max_batch_size, max_queue_size)
+        self.encoder = encoder
+        self.renderer = renderer
+        self.admission = admission
+        self.quality = quality
+        self.render_threads = max(1, render_threads or self.max_batch_size)
+
+        self._pending = []
+        self._condition = threading.Condition()
+        self._dispatcher = None
+        self._executor = None
+        self._stopping = False
+
+        self.batches = 0
+        self.rendered = 0
+        self.rejected = 0
+
+    def start(self):
+        """
+        Start the dispatcher thread
+
+        Returns:
+            ManuscriptBatcher: self
+        """
+        with self._condition:
+            if self._dispatcher is not None:
+                return self
+            self._stopping = False
+            self._executor = ThreadPoolExecutor(max_workers=self.render_threads,
+                                                thread_name_prefix="manuscript-batch")
+            self._dispatcher = threading.Thread(target=self._run, name="manuscript-batcher", daemon=True)
+            self._dispatcher.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stop the dispatcher after the queued requests are rendered
+
+        Args:
+            timeout (float, optional): Seconds to wait for the dispatcher to exit
+        """
+        with self._condition:
+            dispatcher = self._dispatcher
+            self._stopping = True
+            self._condition.notify_all()
+        if dispatcher is not None:
+            dispatcher.join(timeout)
+        self._dispatcher = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self):
+        """
+        Return batcher counters
+
+        Returns:
+            dict: pending, batches, rendered, rejected and mean batch size
+        """
+        with self._condition:
+            return {
+                'pending': len(self._pending),
+                'batches': self.batches,
+                'rendered': self.rendered,
+                'rejected': self.rejected,
+                'mean_batch_size': self.rendered / self.batches if self.batches else 0.0,
+            }
+
+    def submit(self, markdown_text, group_theme=None):
+        """
+        Queue one request
+
+        Args:
+            markdown_text (str): Markdown text to convert
+            group_theme (str, optional): Hacker group theme to apply
+
+        Returns:
+            concurrent.futures.Future: Resolves to (html_content, image_bytes)
+
+        Raises:
+            BatchQueueFull: Too many requests are already waiting
+        """
+        if self._dispatcher is None:
+            self.start()
+        future = Future()
+        with self._condition:
+            if len(self._pending) >= self.max_queue_size:
+                self.rejected += 1
+                raise BatchQueueFull(f"Manuscript queue is full ({self.max_queue_size} waiting)")
+            self._pending.append((time.monotonic(), markdown_text, group_theme, future))
+            self._condition.notify_all()
+        return future
+
+    def render_batch(self, markdown_texts, group_themes):
+        """
+        Batched Gradio callback: render lists of inputs, one result per input
+
+        Args:
+            markdown_texts (list): Markdown texts to convert
+            group_themes (list): Hacker group theme of each text
+
+        Returns:
+            tuple: (html_list, image_list) in input order
+        """
+        futures = []
+        for markdown_text, group_theme in zip(markdown_texts, group_themes):
+            try:
+                futures.append(self.submit(markdown_text, group_theme))
+            except BatchQueueFull as e:
+                rejected = Future()
+                rejected.set_result(render_error(e))
+                futures.append(rejected)
+        results = [future.result() for future in futures]
+        return [html for html, _ in results], [image for _, image in results]
+
+    def _next_batch(self):
+        """Wait for the first request, then for a full batch or the delay to pass"""
+        with self._condition:
+            while not self._pending and not self._stopping:
+                self._condition.wait()
+            if not self._pending:
+                return None
+            deadline = self._pending[0][0] + self.max_batch_delay
+            while len(self._pending) < self.max_batch_size and not self._stopping:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        """Dispatcher loop: render batches until stopped and drained"""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            texts = [markdown_text for _, markdown_text, _, _ in batch]
+            groups = [group_theme for _, _, group_theme, _ in batch]
+            render = create_hacker_manuscripts
+            if self.quality is not None:
+                render = self.quality.create_hacker_manuscripts
+            try:
+                results = render(texts, self.hacker_groups, groups, encoder=self.encoder,
+                                 renderer=self.renderer, admission=self.admission, executor=self._executor)
+            except Exception as e:
+                results = [render_error(e)] * len(batch)
+            for (_, _, _, future), result in zip(batch, results):
+                future.set_result(result)
+            with self._condition:
+                self.batches += 1
+                self.rendered += len(batch)
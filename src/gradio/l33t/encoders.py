@@ -0,0 +1,169 @@
+"""
+H4X0R-OMEGA-H1ST0RY Image Encoders
+Configurable output encoders for manuscript images with named presets
+"""
+
+import logging
+import threading
+
+from PIL import Image
+
+from .memory import note_canvas
+
+logger = logging.getLogger(__name__)
+
+# WebP cannot store images taller or wider than this
+WEBP_MAX_DIMENSION = 16383
+
+_MIME_TYPES = {'PNG': 'image/png', 'WEBP': 'image/webp'}
+
+
+class ImageEncoder:
+    """
+    Output format and settings for a finished manuscript image
+
+    The default settings write lossless RGBA PNG. The manuscripts are shades
+    of green on black, so an 8-bit palette holds them with barely visible
+    loss (mean error below 2 levels per channel) at a fraction of the bytes
+    and encode time, but it is lossy and only used when asked for. The
+    palette is computed per image with Pillow's fast octree quantizer.
+
+    Attributes:
+        format (str): "PNG" or "WEBP"
+        compress_level (int): PNG zlib level 0-9
+        optimize (bool): Let PNG search for the smallest encoding (slow)
+        palette (bool): Quantize PNG output to an 8-bit palette (lossy)
+        lossless (bool): Lossless WebP
+        quality (int): WebP quality 0-100
+        method (int): WebP effort 0 (fast) to 6 (small)
+    """
+
+    def __init__(self, format='PNG', compress_level=6, optimize=False, palette=False,
+                 lossless=True, quality=80, method=4):
+        format = format.upper()
+        if format not in _MIME_TYPES:
+            raise ValueError(f"Unsupported image format: {format}")
+        self.format = format
+        self.compress_level = compress_level
+        self.optimize = optimize
+        self.palette = palette
+        self.lossless = lossless
+        self.quality = quality
+        self.method = method
+
+    @property
+    def streamable(self):
+        """True if the output can be written strip by strip (lossless PNG)"""
+        return self.format == 'PNG' and not self.palette
+
+    @property
+    def mime_type(self):
+        """MIME type of the encoded bytes"""
+        return _MIME_TYPES[self.format]
+
+    def options(self):
+        """
+        Return the settings that change the encoded bytes
+
+        Returns:
+            dict: JSON-serializable settings, used in render cache keys
+        """
+        if self.format == 'WEBP':
+            return {'format': 'WEBP', 'lossless': self.lossless, 'quality': self.quality,
+                    'method': self.method}
+        return {'format': 'PNG', 'compress_level': self.compress_level,
+                'optimize': self.optimize, 'palette': self.palette}
+
+    def encode(self, image, stream):
+        """
+        Write an image to a binary stream
+
+        WebP cannot hold canvases above WEBP_MAX_DIMENSION, those are
+        written as lossless PNG at the default level instead, with a warning.
+
+        Args:
+            image (PIL.Image): Image to encode
+            stream (file-like): Binary stream receiving the encoded bytes
+        """
+        if self.format == 'WEBP' and max(image.size) <= WEBP_MAX_DIMENSION:
+            image.save(stream, format='WEBP', lossless=self.lossless,
+                       quality=self.quality, method=self.method)
+            return
+        if self.format == 'WEBP':
+            logger.warning("%dx%d canvas is too large for WebP, writing lossless PNG instead",
+                           image.width, image.height)
+        elif self.palette:
+            note_canvas("palette", image.width, image.height, 1)
+            image = image.quantize(256, method=Image.Quantize.FASTOCTREE)
+        compress_level = self.compress_level if self.format == 'PNG' else 6
+        image.save(stream, format='PNG', compress_level=compress_level, optimize=self.optimize)
+
+    def __repr__(self):
+        settings = ', '.join(f"{key}={value!r}" for key, value in self.options().items())
+        return f"ImageEncoder({settings})"
+
+
+_presets = {}
+_presets_lock = threading.Lock()
+
+
+def register_encoder(name, encoder):
+    """
+    Register an encoder under a preset name
+
+    Args:
+        name (str): Preset name
+        encoder (ImageEncoder): Encoder settings
+
+    Returns:
+        ImageEncoder: The registered encoder
+    """
+    with _presets_lock:
+        _presets[name] = encoder
+    return encoder
+
+
+def get_encoder(encoder=None):
+    """
+    Resolve a preset name (or instance) to an encoder
+
+    Args:
+        encoder (str or ImageEncoder, optional): Preset name, instance or None for "balanced"
+            (lossless PNG)
+
+    Returns:
+        ImageEncoder: Encoder settings
+
+    Raises:
+        KeyError: If no preset is registered under the name
+    """
+    if isinstance(encoder, ImageEncoder):
+        return encoder
+    name = encoder or 'balanced'
+    with _presets_lock:
+        if name not in _presets:
+            raise KeyError(f"Unknown encoder preset: {name}")
+        return _presets[name]
+
+
+def list_encoders():
+    """
+    Return the names of the registered presets
+
+    Returns:
+        list: Sorted preset names
+    """
+    with _presets_lock:
+        return sorted(_presets)
+
+
+# Named presets, the lossy ones say so in their name
+register_encoder('fast', ImageEncoder(compress_level=1))
+register_encoder('balanced', ImageEncoder(compress_level=6))
+register_encoder('small', ImageEncoder(compress_level=9, optimize=True))
+register_encoder('lossless', get_encoder('balanced'))
+register_encoder('palette-fast', ImageEncoder(palette=True, compress_level=1))
+register_encoder('palette', ImageEncoder(palette=True, compress_level=6))
+register_encoder('palette-small', ImageEncoder(palette=True, compress_level=9, optimize=True))
+register_encoder('webp', ImageEncoder(format='WEBP', lossless=False, quality=80, method=0))
+register_encoder('webp-lossless', ImageEncoder(format='WEBP', lossless=True, method=0))
@@ -0,0 +1,345 @@
+"""
+H4X0R-OMEGA-H1ST0RY Font Registry
+Process-wide TrueType faces with per-character fallback chains
+"""
+
+import os
+import threading
+import weakref
+
+from PIL import ImageFont
+
+# Directories searched for font files, H4X0R_FONT_DIR takes precedence
+DEFAULT_FONT_DIRS = (
+    "/usr/share/fonts/truetype",
+    "/usr/share/fonts/opentype",
+    "/usr/share/fonts",
+    os.path.expanduser("~/.fonts"),
+)
+
+# Face name -> candidate font files, the first one found is used
+DEFAULT_FACES = {
+    'mono': ("DejaVuSansMono.ttf", "LiberationMono-Regular.ttf", "NotoSansMono-Regular.ttf"),
+    'sans': ("DejaVuSans.ttf", "LiberationSans-Regular.ttf", "NotoSans-Regular.ttf"),
+    'cjk': ("NotoSansCJK-Regular.ttc", "NotoSansCJKjp-Regular.otf", "NotoSansJP-Regular.otf",
+            "DroidSansFallbackFull.ttf", "DroidSansJapanese.ttf", "fonts-japanese-gothic.ttf"),
+    'emoji': ("NotoEmoji-Regular.ttf", "Symbola.ttf", "Symbola_hint.ttf"),
+}
+
+# Latin first, then CJK, then emoji
+DEFAULT_CHAIN = ('mono', 'sans', 'cjk', 'emoji')
+
+# Size of the manuscript text and of the matrix glyphs
+TEXT_FONT_SIZE = 14
+MATRIX_FONT_SIZE = 14
+
+# Code point no font maps, renders as the .notdef glyph
+_UNMAPPED = '\U0010FFFF'
+
+
+class FontRegistry:
+    """
+    Loads font faces once and picks a face for every character
+
+    Font files are looked up by name in the configured directories the
+    first time a face is needed; FreeTypeFont objects are cached per
+    (face, size). A character is drawn with the first face of the chain
+    whose cmap covers it, coverage and the resolved face are memoized per
+    character. Faces whose files are missing are skipped, and without any
+    TrueType file the registry falls back to Pillow's default font.
+    """
+
+    def __init__(self, font_dirs=None, faces=None, chain=DEFAULT_CHAIN):
+        """
+        Args:
+            font_dirs (list, optional): Directories to search, $H4X0R_FONT_DIR
+                then DEFAULT_FONT_DIRS if None
+            faces (dict, optional): Face name -> candidate file names
+            chain (tuple): Face names in fallback order, the first is the primary face
+        """
+        if font_dirs is None:
+            configured = os.environ.get("H4X0R_FONT_DIR")
+            font_dirs = ((configured,) if configured else ()) + DEFAULT_FONT_DIRS
+        self.font_dirs = tuple(font_dirs)
+        self.faces = dict(DEFAULT_FACES if faces is None else faces)
+        self.chain = tuple(chain)
+
+        self._files = None
+        self._paths = {}
+        self._fonts = {}
+        self._owners = weakref.WeakKeyDictionary()
+        self._coverage = {}
+        self._resolved = {}
+        self._lock = threading.RLock()
+
+        self.loads = 0
+
+    def _index(self):
+        """Map every font file name under the font directories to its path, once"""
+        if self._files is None:
+            files = {}
+            for directory in self.font_dirs:
+                for root, _, names in os.walk(directory):
+                    for name in names:
+                        files.setdefault(name, os.path.join(root, name))
+            self._files = files
+        return self._files
+
+    def face_path(self, face):
+        """
+        Return the font file of a face
+
+        Args:
+            face (str): Face name
+
+        Returns:
+            str: Path of the first candidate found, None if the face is unavailable
+        """
+        with self._lock:
+            if face not in self._paths:
+                files = self._index()
+                self._paths[face] = next((files[name] for name in self.faces.get(face, ()) if name in files), None)
+            return self._paths[face]
+
+    def available_faces(self):
+        """
+        Return the faces of the chain that have a font file
+
+        Returns:
+            list: Face names in chain order
+        """
+        return [face for face in self.chain if self.face_path(face)]
+
+    def get_font(self, face, size=TEXT_FONT_SIZE):
+        """
+        Return the cached font of a face at a size
+
+        Args:
+            face (str): Face name
+            size (int): Size in pixels
+
+        Returns:
+            FreeTypeFont: The font, None if the face is unavailable or fails to load
+        """
+        key = (face, size)
+        with self._lock:
+            if key in self._fonts:
+                return self._fonts[key]
+            font = None
+            path = self.face_path(face)
+            if path is not None:
+                try:
+                    font = ImageFont.truetype(path, size)
+                    self.loads += 1
+                    self._owners[font] = key
+                except OSError:
+                    font = None
+            self._fonts[key] = font
+            return font
+
+    def primary_font(self, size=TEXT_FONT_SIZE):
+        """
+        Return the font of the first available face of the chain
+
+        Args:
+            size (int): Size in pixels
+
+        Returns:
+            ImageFont: Primary font, Pillow's default font without any TrueType face
+        """
+        for face in self.chain:
+            font = self.get_font(face, size)
+            if font is not None:
+                return font
+        key = ('default', size)
+        with self._lock:
+            if key not in self._fonts:
+                self._fonts[key] = ImageFont.load_default()
+            return self._fonts[key]
+
+    def covers(self, face, char):
+        """
+        Tell whether a face has a glyph for a character
+
+        Args:
+            face (str): Face name
+            char (str): Single character
+
+        Returns:
+            bool: True if the face maps the character to a real glyph
+        """
+        key = (face, char)
+        covered = self._coverage.get(key)
+        if covered is None:
+            font = self.get_font(face, TEXT_FONT_SIZE)
+            if font is None:
+                covered = False
+            elif char.isspace():
+                covered = True
+            else:
+                glyph, notdef = font.getmask(char), font.getmask(_UNMAPPED)
+                covered = glyph.size != notdef.size or bytes(glyph) != bytes(notdef)
+            self._coverage[key] = covered
+        return covered
+
+    def resolve(self, char):
+        """
+        Return the face a character is drawn with
+
+        Args:
+            char (str): Single character
+
+        Returns:
+            str: First face of the chain covering the character, the primary
+                face if none does, None without any TrueType face
+        """
+        face = self._resolved.get(char, False)
+        if face is False:
+            available = self.available_faces()
+            face = next((name for name in available if self.covers(name, char)),
+                        available[0] if available else None)
+            self._resolved[char] = face
+        return face
+
+    def font_for(self, char, font):
+        """
+        Return the font that draws a character in place of `font`
+
+        Args:
+            char (str): Single character
+            font (ImageFont): Font from this registry, others are returned as is
+
+        Returns:
+            ImageFont: Fallback font of the same size, or `font` itself
+        """
+        owner = self._owners.get(font) if font is not None else None
+        if owner is None:
+            return font
+        face = self.resolve(char)
+        if face is None or face == owner[0]:
+            return font
+        return self.get_font(face, owner[1]) or font
+
+    def split_runs(self, text, font):
+        """
+        Split text into runs that share one font
+
+        Args:
+            text (str): Text to split
+            font (ImageFont): Primary font of the text
+
+        Returns:
+            list: (font, run) pairs in text order
+        """
+        runs = []
+        for char in text:
+            char_font = self.font_for(char, font)
+            if runs and runs[-1][0] is char_font:
+                runs[-1][1].append(char)
+            else:
+                runs.append((char_font, [char]))
+        return [(run_font, ''.join(chars)) for run_font, chars in runs]
+
+    def draw_text(self, draw, xy, text, fill, font=None):
+        """
+        Draw text, switching to fallback faces for characters the font lacks
+
+        Args:
+            draw (ImageDraw.ImageDraw): Target drawing context
+            xy (tuple): Top-left corner, as for ImageDraw.text()
+            text (str): Text to draw
+            fill: Text color
+            font (ImageFont, optional): Primary font, Pillow's default if None
+        """
+        if font is None or font not in self._owners:
+            if font is None:
+                draw.text(xy, text, fill=fill)
+            else:
+                draw.text(xy, text, fill=fill, font=font)
+            return
+        runs = self.split_runs(text, font)
+        if len(runs) == 1 and runs[0][0] is font:
+            draw.text(xy, text, fill=fill, font=font)
+            return
+        # Runs share the primary font's baseline
+        x, y = xy
+        baseline = y + font.getmetrics()[0]
+        for run_font, run in runs:
+            draw.text((x, baseline), run, fill=fill, font=run_font, anchor='ls')
+            x += run_font.getlength(run)
+
+    def stats(self):
+        """
+        Return registry counters
+
+        Returns:
+            dict: faces available, fonts loaded, characters resolved
+        """
+        with self._lock:
+            return {
+                'faces': self.available_faces(),
+                'fonts_loaded': self.loads,
+                'characters_resolved': len(self._resolved),
+            }
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_font_registry():
+    """
+    Return the process-wide font registry, creating it on first use
+
+    Returns:
+        FontRegistry: Shared registry
+    """
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = FontRegistry()
+        return _default_registry
+
+
+def configure_font_registry(**options):
+    """
+    Replace the process-wide registry, e.g. to point it at another font directory
+
+    Args:
+        **options: Keyword arguments for FontRegistry
+
+    Returns:
+        FontRegistry: The new shared registry
+    """
+    global _default_registry
+    with _default_registry_lock:
+        _default_registry = FontRegistry(**options)
+        return _default_registry
+
+
+def fallback_font(font, char):
+    """
+    Return the font that draws `char` in place of `font`
+
+    Args:
+        font (ImageFont): Font from the shared registry, others are returned as is
+        char (str): Single character
+
+    Returns:
+        ImageFont: Font to draw or measure the character with
+    """
+    return get_font_registry().font_for(char, font)
+
+
+def draw_text(draw, xy, text, fill, font=None):
+    """
+    Draw text with the shared registry's fallback chain
+
+    Args:
+        draw (ImageDraw.ImageDraw): Target drawing context
+        xy (tuple): Top-left corner
+        text (str): Text to draw
+        fill: Text color
+        font (ImageFont, optional): Primary font, Pillow's default if None
+    """
+    get_font_registry().draw_text(draw, xy, text, fill, font)
@@ -0,0 +1,527 @@
+"""
+H4X0R-OMEGA-H1ST0RY Incremental Renderer
+Per-session manuscript state that repaints and re-encodes only what changed
+"""
+
+import collections
+import difflib
+import hashlib
+import random
+import struct
+import threading
+import zlib
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from .admission import render_cost
+from .background_pool import get_background_pool
+from .fonts import draw_text
+from .layout import CANVAS_WIDTH, LINE_HEIGHT, canvas_height, place_lines
+from .leet import DEFAULT_PROBABILITY, hackerize_batch
+from .manuscript import (
+    FOOTER_TEXT,
+    LINE_PREFIXES,
+    MAX_PAGE_HEIGHT,
+    ManuscriptRequest,
+    RenderRejected,
+    _group_banner,
+    _load_font,
+    create_hacker_manuscript,
+    paint_band,
+)
+from .markdown_pool import convert_markdown
+from .memory import account_request
+from .strips import PNG_SIGNATURE, _chunk
+
+# Rows per independently compressed PNG band
+DEFAULT_BAND_ROWS = 64
+
+# Memory the default store keeps sessions in, canvases and encoder bands included
+DEFAULT_MAX_SESSION_MB = 512
+
+_ADLER_BASE = 65521
+
+# Final empty deflate block, closes a stream of sync-flushed bands
+_DEFLATE_END = b'\x03\x00'
+
+
+def _adler32_combine(adler1, adler2, length2):
+    """Adler-32 of A + B from the checksums of A and B (zlib's adler32_combine)"""
+    remainder = length2 % _ADLER_BASE
+    sum1 = adler1 & 0xffff
+    sum2 = (remainder * sum1) % _ADLER_BASE
+    sum1 += (adler2 & 0xffff) + _ADLER_BASE - 1
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + _ADLER_BASE - remainder
+    if sum1 >= _ADLER_BASE:
+        sum1 -= _ADLER_BASE
+    if sum1 >= _ADLER_BASE:
+        sum1 -= _ADLER_BASE
+    if sum2 >= _ADLER_BASE << 1:
+        sum2 -= _ADLER_BASE << 1
+    if sum2 >= _ADLER_BASE:
+        sum2 -= _ADLER_BASE
+    return sum1 | (sum2 << 16)
+
+
+class BandedPNGEncoder:
+    """
+    RGBA PNG encoder that keeps every band of rows compressed separately
+
+    Each band is filtered on its own (first row unfiltered, the rest with
+    the Up filter) and deflated into a sync-flushed raw stream, so the
+    bands concatenate into one valid zlib stream. Re-encoding after an
+    edit only recompresses the bands that were touched.
+    """
+
+    def __init__(self, compress_level=6, band_rows=DEFAULT_BAND_ROWS):
+        """
+        Args:
+            compress_level (int): zlib compression level 0-9
+            band_rows (int): Rows per band
+        """
+        self.compress_level = compress_level
+        self.band_rows = band_rows
+        self._size = None
+        self._bands = []
+        self.compressed_bands = 0
+
+    @property
+    def nbytes(self):
+        """Bytes of the compressed bands kept for the next call"""
+        return sum(len(data) for data, _, _ in self._bands)
+
+    def reset(self):
+        """Forget the kept bands, the next call compresses everything"""
+        self._size = None
+        self._bands = []
+
+    def _compress_band(self, rows):
+        """Return (deflate bytes, adler32, raw length) of one band"""
+        filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+        filtered[0, 0] = 0
+        filtered[0, 1:] = rows[0]
+        filtered[1:, 0] = 2
+        np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+        raw = filtered.tobytes()
+        compressor = zlib.compressobj(self.compress_level, zlib.DEFLATED, -15)
+        data = compressor.compress(raw) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        return data, zlib.adler32(raw), len(raw)
+
+    def encode(self, image, dirty_rows=None):
+        """
+        Encode an RGBA image, reusing the bands outside the dirty rows
+
+        Args:
+            image (PIL.Image): RGBA image
+            dirty_rows (list, optional): (top, bottom) row ranges that changed
+                since the previous call, None to recompress everything
+
+        Returns:
+            bytes: PNG file
+        """
+        width, height = image.size
+        if self._size != (width, height):
+            dirty_rows = None
+        band_count = -(-height // self.band_rows)
+        if dirty_rows is None:
+            dirty = set(range(band_count))
+        else:
+            dirty = set()
+            for top, bottom in dirty_rows:
+                dirty.update(range(max(0, top) // self.band_rows,
+                                   min(band_count, -(-bottom // self.band_rows))))
+
+        pixels = np.asarray(image, dtype=np.uint8).reshape(height, width * 4)
+        bands = self._bands if dirty_rows is not None else [None] * band_count
+        for index in sorted(dirty):
+            top = index * self.band_rows
+            bands[index] = self._compress_band(pixels[top:top + self.band_rows])
+            self.compressed_bands += 1
+        self._bands = bands
+        self._size = (width, height)
+
+        checksum = 1
+        for _, adler, length in bands:
+            checksum = _adler32_combine(checksum, adler, length)
+        idat = b''.join([b'\x78\x9c'] + [data for data, _, _ in bands]
+                        + [_DEFLATE_END, struct.pack('>I', checksum)])
+
+        header = struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)
+        return b''.join([PNG_SIGNATURE, _chunk(b'IHDR', header), _chunk(b'IDAT', idat),
+                         _chunk(b'IEND', b'')])
+
+
+def _merge_ranges(ranges):
+    """Merge overlapping or touching (top, bottom) row ranges"""
+    merged = []
+    for top, bottom in sorted(ranges):
+        if merged and top <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], bottom)
+        else:
+            merged.append([top, bottom])
+    return [tuple(item) for item in merged]
+
+
+class ManuscriptSession:
+    """
+    Render state of one user's manuscript, updated in place on re-submit
+
+    The session keeps the painted canvas, the placement of every wrapped
+    line and a glyph layer holding the text pixels. A re-submit re-parses
+    the markdown (cheap) and matches the new lines against the old ones
+    with difflib, so inserting a line does not invalidate the lines after
+    it: unchanged lines keep their glyph rows, moved as whole bands when
+    they shifted, and only inserted or edited lines are drawn. The rows
+    that changed are composited again from the background and the glyph
+    layer, then only the PNG bands those rows touch are re-encoded.
+
+    Randomness is per line instead of per document, so an unchanged line
+    keeps its l33t spelling and prefix across edits: each line is
+    hackerized once and remembered by its text. The background is the
+    session's pool variant tiled at a fixed period, so every row keeps its
+    pixels when lines are added or removed. The output is therefore a
+    manuscript of the same style as create_hacker_manuscript(), not
+    byte-identical to it. Documents taller than MAX_PAGE_HEIGHT are handed
+    to create_hacker_manuscript(), with the same admission and quality
+    tiers as the other render paths.
+    """
+
+    def __init__(self, seed=None, width=CANVAS_WIDTH, compress_level=6, band_rows=DEFAULT_BAND_ROWS):
+        """
+        Args:
+            seed (int, optional): Session seed, random if None
+            width (int): Canvas width
+            compress_level (int): zlib compression level of the PNG
+            band_rows (int): Rows per independently compressed PNG band
+        """
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.width = width
+        self.font = _load_font()
+        self.encoder = BandedPNGEncoder(compress_level, band_rows)
+        self.lock = threading.Lock()
+
+        pool = get_background_pool()
+        self._variant = self.seed % pool.variants
+        self._tile = None if pool.enabled else self._render_tile(pool)
+
+        self._canvas = None
+        self._glyphs = None
+        self._layout = None
+        self._decorated = {}
+
+        self.renders = 0
+        self.last_repainted_lines = 0
+        self.last_shifted_lines = 0
+        self.last_dirty_rows = 0
+        self.nbytes = 0
+
+    @staticmethod
+    def _render_tile(pool):
+        """Own background tile for a disabled pool, whose bands are not repeatable"""
+        return pool.get_region(pool.width, pool.max_height, 0, pool.max_height, rng=random.Random(0))
+
+    def _background(self, top, rows):
+        """Rows [top, top + rows) of the session background"""
+        pool = get_background_pool()
+        if self._tile is not None:
+            return pool._fit(self._tile, top, rows)
+        return pool.get_region(self.width, pool.max_height, top, rows, self._variant)
+
+    def _decorate(self, lines, dictionary):
+        """Return the decorated text of every line, hackerizing only unseen lines"""
+        memo = self._decorated.get(dictionary, {})
+        fresh = [line for line in dict.fromkeys(lines) if line.strip() and line not in memo]
+        if fresh:
+            digest = hashlib.blake2b(digest_size=8)
+            digest.update(self.seed.to_bytes(8, 'big'))
+            digest.update('\n'.join(fresh).encode('utf-8'))
+            rng = random.Random(int.from_bytes(digest.digest(), 'big'))
+            for line, hacked in zip(fresh, hackerize_batch(fresh, dictionary, DEFAULT_PROBABILITY, rng)):
+                memo[line] = rng.choice(LINE_PREFIXES) + hacked
+        # Forget lines that left the document
+        self._decorated[dictionary] = {line: memo[line] for line in lines if line in memo}
+        return [self._decorated[dictionary].get(line) for line in lines]
+
+    def _layout_lines(self, decorated, banner):
+        """Wrap and place decorated lines the way layout_manuscript() does"""
+        placed, bottom = place_lines(decorated, self.font, self.width)
+        return {'width': self.width, 'height': canvas_height(bottom), 'banner': banner, 'placed': placed}
+
+    def _mask(self, line):
+        """Glyph mask of one decorated line"""
+        mask = Image.new('L', (self.width, LINE_HEIGHT), 0)
+        draw = ImageDraw.Draw(mask)
+        try:
+            draw_text(draw, (20, 0), line, 255, self.font)
+        except Exception:
+            # Same placeholder as paint_band() for lines that fail to draw
+            draw.rectangle([(20, 0), (min(self.width - 20, 20 + len(line) * 8), 5)], fill=255)
+        return np.asarray(mask)
+
+    def _plan(self, layout):
+        """
+        Work out what a new layout changes, without touching any pixels
+
+        Returns:
+            tuple: (segments to draw, glyph rows to copy as (old top, new top,
+                rows), dirty row ranges, lines shifted)
+        """
+        height, placed, previous = layout['height'], layout['placed'], self._layout
+        if previous is None or previous['banner'] != layout['banner']:
+            return list(placed), [], [(0, height)], 0
+        old = previous['placed']
+        matcher = difflib.SequenceMatcher(None, [line for _, line in old], [line for _, line in placed],
+                                          autojunk=False)
+        drawn, copies, dirty, shifted = [], [], [], 0
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag != 'equal':
+                drawn.extend(placed[new_start:new_end])
+                # Rows the replaced or deleted lines leave behind
+                dirty.extend((y_position, y_position + LINE_HEIGHT) for y_position, _ in old[old_start:old_end])
+                continue
+            # Unchanged lines: copy every run with one offset as a single band
+            pairs = list(zip(old[old_start:old_end], placed[new_start:new_end]))
+            run_start = 0
+            for index in range(1, len(pairs) + 1):
+                if index < len(pairs) and (pairs[index][1][0] - pairs[index][0][0]
+                                           == pairs[run_start][1][0] - pairs[run_start][0][0]):
+                    continue
+                old_top, new_top = pairs[run_start][0][0], pairs[run_start][1][0]
+                rows = pairs[index - 1][0][0] + LINE_HEIGHT - old_top
+                copies.append((old_top, new_top, rows))
+                if new_top != old_top:
+                    dirty += [(old_top, old_top + rows), (new_top, new_top + rows)]
+                    shifted += index - run_start
+                run_start = index
+        if height != previous['height']:
+            # Old and new footer, plus any rows the old canvas did not have
+            dirty.append((min(height, previous['height']) - 30, height))
+        dirty.extend((y_position, y_position + LINE_HEIGHT) for y_position, _ in drawn)
+        dirty = _merge_ranges((max(0, top), min(height, bottom)) for top, bottom in dirty if top < height)
+        return drawn, copies, dirty, shifted
+
+    def _update_glyphs(self, layout, drawn, copies):
+        """Build the glyph layer of a new layout from the previous one and the planned changes"""
+        glyphs = np.zeros((layout['height'], self.width), dtype=np.uint8)
+        for old_top, new_top, rows in copies:
+            glyphs[new_top:new_top + rows] = self._glyphs[old_top:old_top + rows]
+        masks = {}
+        for y_position, line in drawn:
+            if line not in masks:
+                masks[line] = self._mask(line)
+            glyphs[y_position:y_position + LINE_HEIGHT] = masks[line]
+        return glyphs
+
+    def _composite(self, canvas, layout, glyphs, top, bottom):
+        """Paint rows [top, bottom) from background, chrome and the glyph layer"""
+        band = self._background(top, bottom - top)
+        # Banner and footer only, lines come from the glyph layer
+        paint_band(band, {'width': layout['width'], 'height': layout['height'], 'banner': layout['banner'],
+                          'lines': [], 'line_tops': []}, top, self.font, FOOTER_TEXT)
+        band.paste((0, 255, 0, 255), (0, 0), Image.fromarray(glyphs[top:bottom], 'L'))
+        canvas.paste(band, (0, top))
+
+    def render(self, markdown_text, hacker_groups=None, group_theme=None, admission=None, quality=None):
+        """
+        Render the manuscript, reusing everything the last render left behind
+
+        Every render passes `admission`, charged for the work it plans: the
+        first render of a session paints and encodes a full canvas, later
+        repaints only the lines they draw and the rows they dirty. Renders
+        are recorded in the metrics and memory accounts like those of
+        create_hacker_manuscript().
+
+        Args:
+            markdown_text (str): Markdown text to convert
+            hacker_groups (dict): Dictionary of hacker group information
+            group_theme (str, optional): Hacker group theme to apply
+            admission (AdmissionController, optional): Work budget every render must fit in
+            quality (QualityController, optional): Picks the tier of documents
+                handed to create_hacker_manuscript()
+
+        Returns:
+            tuple: (html_content, image_bytes) - styled HTML and PNG image
+        """
+        with self.lock, account_request("session") as account:
+            request = ManuscriptRequest(markdown_text, hacker_groups, group_theme, self.seed, use_cache=False,
+                                        account=account)
+            try:
+                html_content, plain_text = convert_markdown(markdown_text)
+                lines = plain_text.split('\n')
+                dictionary = request.hacker_groups.get(group_theme, {}).get('leet')
+                banner = _group_banner(request.hacker_groups, group_theme)
+                layout = self._layout_lines(self._decorate(lines, dictionary), banner)
+                if layout['height'] > MAX_PAGE_HEIGHT:
+                    self._reset()
+                    render = create_hacker_manuscript if quality is None else quality.create_hacker_manuscript
+                    return render(markdown_text, request.hacker_groups, group_theme, admission=admission)
+
+                plan = self._plan(layout)
+                drawn, _, dirty, _ = plan
+                cost = render_cost(len(lines), len(drawn), self.width * sum(bottom - top for top, bottom in dirty))
+                with request.admit(admission, cost):
+                    image_bytes = self._paint(layout, plan)
+                return request.finish((html_content, image_bytes))
+            except RenderRejected as e:
+                return request.rejected(e)
+            except Exception as e:
+                self._reset()
+                return request.failed(e)
+
+    def _paint(self, layout, plan):
+        """Bring the canvas to a new layout as planned by _plan() and encode it, caller holds the lock"""
+        height, previous = layout['height'], self._layout
+        drawn, copies, dirty, shifted = plan
+        glyphs = self._update_glyphs(layout, drawn, copies)
+        canvas = self._canvas
+        if canvas is None or canvas.size != (self.width, height):
+            canvas = Image.new('RGBA', (self.width, height))
+            if previous is not None and self._canvas is not None:
+                canvas.paste(self._canvas.crop((0, 0, self.width, min(height, previous['height']))), (0, 0))
+        for top, bottom in dirty:
+            self._composite(canvas, layout, glyphs, top, bottom)
+
+        self._canvas = canvas
+        self._glyphs = glyphs
+        self._layout = layout
+        self.renders += 1
+        self.last_repainted_lines = len(drawn)
+        self.last_shifted_lines = shifted
+        self.last_dirty_rows = sum(bottom - top for top, bottom in dirty)
+        image_bytes = self.encoder.encode(canvas, dirty if previous is not None else None)
+        self.nbytes = height * self.width * 4 + glyphs.nbytes + self.encoder.nbytes
+        return image_bytes
+
+    def _reset(self):
+        """Drop the canvas, e.g. after a failed render, the next render starts over"""
+        self._canvas = self._glyphs = self._layout = None
+        self.encoder.reset()
+        self.nbytes = 0
+
+    def stats(self):
+        """
+        Return session counters
+
+        Returns:
+            dict: renders, lines drawn and shifted and rows repainted by the
+                last render, bands compressed and bytes held
+        """
+        return {
+            'renders': self.renders,
+            'last_repainted_lines': self.last_repainted_lines,
+            'last_shifted_lines': self.last_shifted_lines,
+            'last_dirty_rows': self.last_dirty_rows,
+            'compressed_bands': self.encoder.compressed_bands,
+            'bytes': self.nbytes,
+        }
+
+
+class SessionStore:
+    """
+    LRU map of session id -> ManuscriptSession
+
+    A session holds a full canvas, its glyph layer and the compressed PNG
+    bands, from a few MiB for a short manuscript to about 100 MiB at
+    MAX_PAGE_HEIGHT. The store keeps the sessions within `max_bytes` (and
+    `max_sessions`, when given) and drops the least recently used; the
+    session just rendered is always kept.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_SESSION_MB * 1024 * 1024, max_sessions=None, admission=None,
+                 quality=None, **session_options):
+        """
+        Args:
+            max_bytes (int): Memory the sessions may hold together
+            max_sessions (int, optional): Sessions kept at once, no limit if None
+            admission (AdmissionController, optional): Work budget every render must fit in
+            quality (QualityController, optional): Picks the tier of paginated documents
+            **session_options: Keyword arguments for new ManuscriptSession objects
+        """
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.admission = admission
+        self.quality = quality
+        self.session_options = session_options
+        self._sessions = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id):
+        """
+        Return the session of an id, creating it if needed
+
+        Args:
+            session_id (str): Client session id, e.g. gr.Request.session_hash
+
+        Returns:
+            ManuscriptSession: The session
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = ManuscriptSession(**self.session_options)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            self._trim()
+            return session
+
+    def render(self, session_id, markdown_text, hacker_groups=None, group_theme=None):
+        """
+        Render with the session of an id, then trim the store to its budget
+
+        Args:
+            session_id (str): Client session id, e.g. gr.Request.session_hash
+            markdown_text (str): Markdown text to convert
+            hacker_groups (dict): Dictionary of hacker group information
+            group_theme (str, optional): Hacker group theme to apply
+
+        Returns:
+            tuple: (html_content, image_bytes) - styled HTML and PNG image
+        """
+        result = self.get(session_id).render(markdown_text, hacker_groups, group_theme,
+                                             admission=self.admission, quality=self.quality)
+        with self._lock:
+            if session_id in self._sessions:
+                self._sessions.move_to_end(session_id)
+            self._trim()
+        return result
+
+    def discard(self, session_id):
+        """Forget a session"""
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def nbytes(self):
+        """Memory held by the kept sessions"""
+        with self._lock:
+            return sum(session.nbytes for session in self._sessions.values())
+
+    def stats(self):
+        """
+        Return store counters
+
+        Returns:
+            dict: sessions, bytes held and sessions evicted
+        """
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'bytes': sum(session.nbytes for session in self._sessions.values()),
+                'evicted': self.evicted,
+            }
+
+    def _trim(self):
+        """Drop least recently used sessions over the limits, caller holds the lock"""
+        total = sum(session.nbytes for session in self._sessions.values())
+        while len(self._sessions) > 1 and (
+                total > self.max_bytes
+                or (self.max_sessions is not None and len(self._sessions) > self.max_sessions)):
+            _, session = self._sessions.popitem(last=False)
+            total -= session.nbytes
+            self.evicted += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
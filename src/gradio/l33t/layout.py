@@ -0,0 +1,301 @@
+"""
+H4X0R-OMEGA-H1ST0RY Text Layout Engine
+Measures, wraps and places manuscript lines before any pixel is drawn
+"""
+
+import collections
+import threading
+import weakref
+
+from PIL import ImageFont
+
+from .fonts import fallback_font
+
+# Canvas geometry
+CANVAS_WIDTH = 800
+LINE_HEIGHT = 25
+BLANK_LINE_HEIGHT = 20
+TEXT_MARGIN = 20
+CONTENT_TOP = 60
+CONTENT_BOTTOM_MARGIN = 70
+MIN_CANVAS_HEIGHT = 400
+
+# Wrapped lines kept per font
+DEFAULT_WRAP_CACHE_SIZE = 8192
+
+
+class FontMetrics:
+    """
+    Glyph advance table and wrap cache of one font
+
+    Advances are measured once per character and summed afterwards, which
+    is exact for fonts without kerning (like Pillow's default font) and
+    off by a few pixels at most for kerned ones, well inside the margin.
+    Wrapped lines are kept in an LRU keyed by (text, max_width), so
+    repeated lines and template text are laid out only once.
+    """
+
+    def __init__(self, font, max_wraps=DEFAULT_WRAP_CACHE_SIZE):
+        """
+        Args:
+            font (ImageFont): Font to measure
+            max_wraps (int): Wrapped lines kept in the cache
+        """
+        self.font = font
+        self.max_wraps = max_wraps
+        self._advances = {}
+        self._wraps = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def advance(self, char):
+        """
+        Return the horizontal advance of one character
+
+        Args:
+            char (str): Single character
+
+        Returns:
+            float: Advance in pixels
+        """
+        width = self._advances.get(char)
+        if width is None:
+            # Registry fonts draw missing glyphs with a fallback face
+            font = fallback_font(self.font, char)
+            try:
+                width = font.getlength(char)
+            except Exception:
+                # Characters the font cannot render are drawn as boxes
+                width = font.getlength('?')
+            self._advances[char] = width
+        return width
+
+    def measure(self, text):
+        """
+        Return the advance width of a string
+
+        Args:
+            text (str): Text to measure
+
+        Returns:
+            float: Width in pixels
+        """
+        advances = self._advances
+        total = 0.0
+        for char in text:
+            width = advances.get(char)
+            total += width if width is not None else self.advance(char)
+        return total
+
+    def _break(self, text, max_width):
+        """Greedy word wrap, words wider than a line are split by character"""
+        segments = []
+        current, current_width = '', 0.0
+        space = self.advance(' ')
+        for word in text.split(' '):
+            word_width = self.measure(word)
+            gap = space if current else 0.0
+            if current_width + gap + word_width <= max_width:
+                current += (' ' if current else '') + word
+                current_width += gap + word_width
+                continue
+            if current:
+                segments.append(current)
+                current, current_width = '', 0.0
+            while word_width > max_width:
+                # Hard break: take as many characters as fit, at least one
+                taken, taken_width = 0, 0.0
+                while taken < len(word) and taken_width + self.advance(word[taken]) <= max_width:
+                    taken_width += self.advance(word[taken])
+                    taken += 1
+                taken = max(1, taken)
+                segments.append(word[:taken])
+                word = word[taken:]
+                word_width = self.measure(word)
+            current, current_width = word, word_width
+        if current or not segments:
+            segments.append(current)
+        return segments
+
+    def wrap(self, text, max_width):
+        """
+        Split a line into segments that each fit max_width
+
+        Args:
+            text (str): Line to wrap
+            max_width (float): Available width in pixels
+
+        Returns:
+            tuple: Wrapped segments, at least one
+        """
+        key = (text, max_width)
+        with self._lock:
+            segments = self._wraps.get(key)
+            if segments is not None:
+                self._wraps.move_to_end(key)
+                self.hits += 1
+                return segments
+            self.misses += 1
+        segments = tuple(self._break(text, max_width))
+        with self._lock:
+            self._wraps[key] = segments
+            while len(self._wraps) > self.max_wraps:
+                self._wraps.popitem(last=False)
+        return segments
+
+    def stats(self):
+        """
+        Return cache counters
+
+        Returns:
+            dict: glyphs measured, wrapped lines cached, hits and misses
+        """
+        with self._lock:
+            return {
+                'glyphs': len(self._advances),
+                'wraps': len(self._wraps),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+_metrics = weakref.WeakKeyDictionary()
+_metrics_lock = threading.Lock()
+_default_font = None
+
+
+def get_font_metrics(font=None):
+    """
+    Return the shared metrics of a font, creating them on first use
+
+    Args:
+        font (ImageFont, optional): Font to measure, Pillow's default font if None
+
+    Returns:
+        FontMetrics: Metrics shared by every layout with this font
+    """
+    global _default_font
+    with _metrics_lock:
+        if font is None:
+            if _default_font is None:
+                _default_font = ImageFont.load_default()
+            font = _default_font
+        metrics = _metrics.get(font)
+        if metrics is None:
+            metrics = _metrics[font] = FontMetrics(font)
+        return metrics
+
+
+def text_width(width=CANVAS_WIDTH):
+    """Return the width available to text on a canvas of the given width"""
+    return width - 2 * TEXT_MARGIN
+
+
+def place_lines(decorated_lines, font=None, width=CANVAS_WIDTH):
+    """
+    Wrap decorated lines and assign every segment its row
+
+    Args:
+        decorated_lines (list): Lines to place, blank strings or None for gaps
+        font (ImageFont, optional): Font the lines will be drawn with
+        width (int): Canvas width
+
+    Returns:
+        tuple: (placed, bottom) - (y, segment) pairs and the first row below the text
+    """
+    metrics = get_font_metrics(font)
+    max_width = text_width(width)
+    placed = []
+    y_position = CONTENT_TOP
+    for line in decorated_lines:
+        if not line or not line.strip():
+            y_position += BLANK_LINE_HEIGHT
+            continue
+        for segment in metrics.wrap(line, max_width):
+            placed.append((y_position, segment))
+            y_position += LINE_HEIGHT
+    return placed, y_position
+
+
+def canvas_height(bottom):
+    """
+    Return the exact canvas height for text ending at row `bottom`
+
+    Args:
+        bottom (int): First row below the last placed line
+
+    Returns:
+        int: Canvas height, room for the footer included
+    """
+    return max(bottom + CONTENT_BOTTOM_MARGIN, MIN_CANVAS_HEIGHT)
+
+
+def measure_rows(lines, font=None, width=CANVAS_WIDTH, prefixes=('',)):
+    """
+    Return the pixel rows each line takes once decorated and wrapped
+
+    Args:
+        lines (list): Undecorated lines
+        font (ImageFont, optional): Font the lines will be drawn with
+        width (int): Canvas width
+        prefixes (tuple): Decorators the line may get, the tallest result counts
+
+    Returns:
+        list: Rows in pixels per line, BLANK_LINE_HEIGHT for blank lines
+    """
+    metrics = get_font_metrics(font)
+    max_width = text_width(width)
+    rows = []
+    for line in lines:
+        if not line.strip():
+            rows.append(BLANK_LINE_HEIGHT)
+            continue
+        segments = max(len(metrics.wrap(prefix + line, max_width)) for prefix in prefixes)
+        rows.append(LINE_HEIGHT * segments)
+    return rows
+
+
+def split_line(line, max_rows, font=None, width=CANVAS_WIDTH, prefixes=('',)):
+    """
+    Split a line into pieces that each wrap into at most `max_rows` rows
+
+    Pieces break where the wrap does, so their text joins back into the
+    line; each piece is measured behind every prefix.
+
+    Args:
+        line (str): Undecorated line
+        max_rows (int): Most wrapped rows per piece, at least one
+        font (ImageFont, optional): Font the lines will be drawn with
+        width (int): Canvas width
+        prefixes (tuple): Decorators the pieces may get
+
+    Returns:
+        list: Pieces of the line, in order
+    """
+    metrics = get_font_metrics(font)
+    max_width = text_width(width)
+    segments = metrics.wrap(line, max_width)
+    # Start offset of every wrapped segment in the line
+    offsets, position = [], 0
+    for segment in segments:
+        position = line.find(segment, position)
+        offsets.append(position)
+        position += len(segment)
+    offsets.append(len(line))
+
+    max_rows = max(1, max_rows)
+    pieces, start = [], 0
+    while start < len(segments):
+        # A prefix can push a piece one row further, re-measure and shrink if it does
+        count = min(max(1, max_rows - 1), len(segments) - start)
+        while True:
+            piece = line[offsets[start]:offsets[start + count]].rstrip(' ')
+            rows = max(len(metrics.wrap(prefix + piece, max_width)) for prefix in prefixes)
+            if rows <= max_rows or count == 1:
+                break
+            count -= 1
+        pieces.append(piece)
+        start += count
+    return pieces
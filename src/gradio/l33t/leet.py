@@ -0,0 +1,308 @@
+"""
+H4X0R-OMEGA-H1ST0RY L33t Engine
+Single-pass l33t-speak substitution with pluggable dictionaries
+"""
+
+import random
+import threading
+
+import numpy as np
+
+# Share of occurrences replaced by default, for a more authentic look
+DEFAULT_PROBABILITY = 0.7
+
+DEFAULT_REPLACEMENTS = {
+    'a': '4', 'e': '3', 'i': '1', 'o': '0',
+    't': '7', 's': '5', 'A': '4', 'E': '3',
+    'I': '1', 'O': '0', 'T': '7', 'S': '5',
+    'ck': 'x', 'CK': 'X'
+}
+
+# Joins batch items, it can never be part of a match
+_BATCH_SEPARATOR = '\x00'
+
+
+class LeetDictionary:
+    """
+    Compiled set of l33t replacement rules
+
+    The text is encoded once into an array of code units: UTF-8 bytes when
+    every single-character rule is ASCII (ASCII bytes never occur inside a
+    multi-byte sequence), UTF-32 code points otherwise. Single-character
+    rules are then applied with one lookup-table pass over that array.
+    Multi-character rules are located with vectorized comparisons and
+    resolved leftmost-longest. Their replaced spans are never touched by
+    the single-character pass.
+
+    Attributes:
+        name (str): Registry name of the dictionary
+        replacements (dict): Original key -> replacement rules
+    """
+
+    def __init__(self, name, replacements):
+        self.name = name
+        self.replacements = dict(replacements)
+
+        # Astral characters stay out of the 16-bit lookup table
+        singles = {key: value for key, value in self.replacements.items()
+                   if len(key) == 1 and len(value) == 1 and ord(key) < 0xFFFF and ord(value) < 0xFFFF}
+        self._table = str.maketrans(singles)
+        self._multi = {key: value for key, value in self.replacements.items() if key not in singles}
+
+        self._wide = any(ord(key) > 127 or ord(value) > 127 for key, value in singles.items())
+        if self._wide:
+            self._encoding, self._unit, self._dtype, table_size = 'utf-32-le', 4, np.uint32, 0x10000
+        else:
+            self._encoding, self._unit, self._dtype, table_size = 'utf-8', 1, np.uint8, 0x100
+
+        self._has_rule = np.zeros(table_size, dtype=bool)
+        self._lookup = np.arange(table_size, dtype=self._dtype)
+        for key, value in singles.items():
+            self._has_rule[ord(key)] = True
+            self._lookup[ord(key)] = ord(value)
+
+        # Multi-character rules as code unit arrays, longest first so ties
+        # go to the longer key
+        self._multi_rules = [
+            (np.frombuffer(key.encode(self._encoding), dtype=self._dtype),
+             np.frombuffer(value.encode(self._encoding), dtype=self._dtype))
+            for key, value in sorted(self._multi.items(), key=lambda item: -len(item[0]))
+        ]
+        if self._multi_rules:
+            lengths = np.array([len(value) for _, value in self._multi_rules], dtype=np.intp)
+            self._replacement_units = np.concatenate([value for _, value in self._multi_rules])
+            self._replacement_lengths = lengths
+            self._replacement_offsets = np.cumsum(lengths) - lengths
+
+    def _encode(self, text):
+        """Return the text as a writable code unit array"""
+        return np.frombuffer(text.encode(self._encoding, 'surrogatepass'), dtype=self._dtype).copy()
+
+    def _find_spans(self, units):
+        """
+        Locate multi-character rule matches
+
+        Candidates are found with one vectorized comparison per distinct
+        first code unit, then checked unit by unit at the candidate offsets.
+
+        Args:
+            units (numpy.ndarray): Encoded text
+
+        Returns:
+            tuple: (starts, ends, rules) arrays in code units, non-overlapping
+                and sorted by start
+        """
+        starts, ends, rules = [], [], []
+        first_hits = {}
+        for rule, (key, _) in enumerate(self._multi_rules):
+            if len(key) > len(units):
+                continue
+            head = int(key[0])
+            if head not in first_hits:
+                first_hits[head] = np.flatnonzero(units == key[0])
+            found = first_hits[head]
+            found = found[found <= len(units) - len(key)]
+            for offset in range(1, len(key)):
+                found = found[units[found + offset] == key[offset]]
+            if len(found):
+                starts.append(found)
+                ends.append(found + len(key))
+                rules.append(np.full(len(found), rule, dtype=np.intp))
+
+        if not starts:
+            empty = np.zeros(0, dtype=np.intp)
+            return empty, empty, empty
+
+        starts, ends, rules = np.concatenate(starts), np.concatenate(ends), np.concatenate(rules)
+        order = np.lexsort((rules, starts))
+        starts, ends, rules = starts[order], ends[order], rules[order]
+
+        # Leftmost-longest: drop matches that start inside an earlier one
+        if len(starts) > 1 and np.any(starts[1:] < ends[:-1]):
+            keep = []
+            last_end = -1
+            for index, (start, end) in enumerate(zip(starts.tolist(), ends.tolist())):
+                if start >= last_end:
+                    keep.append(index)
+                    last_end = end
+            starts, ends, rules = starts[keep], ends[keep], rules[keep]
+        return starts, ends, rules
+
+    @staticmethod
+    def _sample(count, probability, np_rng):
+        """Return a boolean mask keeping each of `count` items with the given probability"""
+        draws = np.frombuffer(np_rng.bytes(2 * count), dtype=np.uint16)
+        return draws < int(round(probability * 0x10000))
+
+    def _apply(self, text, probability, np_rng):
+        """Apply the rules, each occurrence kept with the given probability"""
+        units = self._encode(text)
+        sampled = probability < 1
+
+        if self._unit > 1:
+            eligible = self._has_rule[np.minimum(units, 0xFFFF)]
+        else:
+            eligible = self._has_rule[units]
+
+        spans = None
+        if self._multi_rules:
+            starts, ends, rules = self._find_spans(units)
+            if sampled and len(starts):
+                chosen = self._sample(len(starts), probability, np_rng)
+                starts, ends, rules = starts[chosen], ends[chosen], rules[chosen]
+            if len(starts):
+                spans = (starts, ends, rules)
+                # Units covered by a replaced span: expand each span to its positions
+                widths = ends - starts
+                covered = np.repeat(starts - (np.cumsum(widths) - widths), widths) + np.arange(widths.sum())
+                eligible[covered] = False
+
+        hits = np.flatnonzero(eligible)
+        if sampled:
+            hits = hits[self._sample(len(hits), probability, np_rng)]
+        units[hits] = self._lookup[units[hits]]
+
+        if spans is not None:
+            starts, ends, rules = spans
+            kept = np.delete(units, covered)
+            # Insert each replacement where its span used to start
+            lengths = self._replacement_lengths[rules]
+            first = np.cumsum(lengths) - lengths
+            source = np.repeat(self._replacement_offsets[rules] - first, lengths) + np.arange(lengths.sum())
+            removed_before = np.cumsum(widths) - widths
+            units = np.insert(kept, np.repeat(starts - removed_before, lengths),
+                              self._replacement_units[source])
+
+        return units.tobytes().decode(self._encoding, 'surrogatepass')
+
+    def translate_all(self, text):
+        """
+        Replace every occurrence of every rule in one pass
+
+        Args:
+            text (str): Input text
+
+        Returns:
+            str: Fully l33t-ified text
+        """
+        if not self._multi_rules:
+            return text.translate(self._table)
+        return self._apply(text, 1.0, None)
+
+    def translate_sampled(self, text, probability, np_rng):
+        """
+        Replace each occurrence independently with the given probability
+
+        Args:
+            text (str): Input text
+            probability (float): Chance that a single occurrence is replaced
+            np_rng (numpy.random.Generator): Random source for the decisions
+
+        Returns:
+            str: Partially l33t-ified text
+        """
+        return self._apply(text, probability, np_rng)
+
+
+_dictionaries = {}
+_dictionaries_lock = threading.Lock()
+
+
+def register_dictionary(name, replacements):
+    """
+    Compile and register a replacement dictionary
+
+    Args:
+        name (str): Name used to look the dictionary up
+        replacements (dict): Key -> replacement rules
+
+    Returns:
+        LeetDictionary: The compiled dictionary
+    """
+    if any(_BATCH_SEPARATOR in key or _BATCH_SEPARATOR in value for key, value in replacements.items()):
+        raise ValueError("Replacement rules may not contain NUL characters")
+    dictionary = LeetDictionary(name, replacements)
+    with _dictionaries_lock:
+        _dictionaries[name] = dictionary
+    return dictionary
+
+
+def get_dictionary(dictionary=None):
+    """
+    Resolve a dictionary name (or instance) to a compiled dictionary
+
+    Args:
+        dictionary (str or LeetDictionary, optional): Name, instance or None for "default"
+
+    Returns:
+        LeetDictionary: Compiled dictionary
+
+    Raises:
+        KeyError: If no dictionary is registered under the name
+    """
+    if isinstance(dictionary, LeetDictionary):
+        return dictionary
+    name = dictionary or 'default'
+    with _dictionaries_lock:
+        if name not in _dictionaries:
+            raise KeyError(f"Unknown l33t dictionary: {name}")
+        return _dictionaries[name]
+
+
+def list_dictionaries():
+    """
+    Return the names of the registered dictionaries
+
+    Returns:
+        list: Sorted dictionary names
+    """
+    with _dictionaries_lock:
+        return sorted(_dictionaries)
+
+
+def hackerize(text, dictionary=None, probability=DEFAULT_PROBABILITY, rng=None):
+    """
+    Convert text to l33t speak in a single pass
+
+    Args:
+        text (str): Input text
+        dictionary (str or LeetDictionary, optional): Rules to apply, "default" if None
+        probability (float): Chance that each occurrence is replaced
+        rng (random.Random, optional): Random source, a fresh one if None
+
+    Returns:
+        str: L33t-ified text
+    """
+    rules = get_dictionary(dictionary)
+    if not text or probability <= 0:
+        return text
+    if probability >= 1:
+        return rules.translate_all(text)
+    if rng is None:
+        rng = random.Random()
+    return rules.translate_sampled(text, probability, np.random.default_rng(rng.getrandbits(64)))
+
+
+def hackerize_batch(texts, dictionary=None, probability=DEFAULT_PROBABILITY, rng=None):
+    """
+    Convert a list of strings to l33t speak in one engine call
+
+    Args:
+        texts (list): Input strings
+        dictionary (str or LeetDictionary, optional): Rules to apply, "default" if None
+        probability (float): Chance that each occurrence is replaced
+        rng (random.Random, optional): Random source, a fresh one if None
+
+    Returns:
+        list: L33t-ified strings, in input order
+    """
+    texts = list(texts)
+    if not texts:
+        return []
+    if any(_BATCH_SEPARATOR in text for text in texts):
+        return [hackerize(text, dictionary, probability, rng) for text in texts]
+    joined = hackerize(_BATCH_SEPARATOR.join(texts), dictionary, probability, rng)
+    return joined.split(_BATCH_SEPARATOR)
+
+
+register_dictionary('default', DEFAULT_REPLACEMENTS)
@@ -0,0 +1,228 @@
+"""
+H4X0R-OMEGA-H1ST0RY Live Preview
+Debounced re-rendering while the visitor types, one render per session at most
+"""
+
+import asyncio
+import collections
+import functools
+import threading
+
+from .async_manuscript import _bound, get_render_executor
+from .manuscript import ManuscriptRequest, RenderCancelled, RenderRejected, render_manuscript
+from .memory import finish_account, start_account
+
+# Idle seconds after the last keystroke before rendering
+DEFAULT_LIVE_DELAY = 0.4
+
+# Live renders running at once across all sessions
+DEFAULT_MAX_ACTIVE = 2
+
+# Sessions whose live state is kept
+DEFAULT_MAX_SESSIONS = 256
+
+
+class _LiveState:
+    """Live render state of one session"""
+
+    def __init__(self):
+        self.generation = 0
+        self.cancel = None
+        self.running = None
+        self.active = 0
+
+
+class LiveRenderer:
+    """
+    Debounced live preview of the markdown input
+
+    Every edit bumps the session's generation and stops the render the
+    session has in flight. A call only renders when no newer edit arrived
+    during its idle delay, and only after the stopped render has really
+    left its worker thread, so a session never has more than one render
+    running and superseded work is dropped instead of queued. A global
+    limit of `max_active` renders keeps live mode from crowding out the
+    convert button, and with `admission` live renders share the convert
+    button's work budget: a preview that does not fit gets the same
+    notice as a refused convert.
+
+    Example:
+        live = LiveRenderer(hacker_groups, delay=0.4)
+        result = await live.render(request.session_hash, text, group)
+        if result is None:
+            ...  # superseded by a newer edit, keep the current output
+    """
+
+    def __init__(self, hacker_groups=None, delay=DEFAULT_LIVE_DELAY, max_active=DEFAULT_MAX_ACTIVE,
+                 encoder="fast", executor=None, max_sessions=DEFAULT_MAX_SESSIONS, admission=None):
+        """
+        Args:
+            hacker_groups (dict, optional): Group information used by every render
+            delay (float): Idle seconds after the last edit before rendering
+            max_active (int): Live renders running at once across all sessions
+            encoder (str or ImageEncoder, optional): Output preset, "fast" by default
+            executor (concurrent.futures.Executor, optional): Thread executor of
+                the renders, the shared render executor if None
+            max_sessions (int): Sessions whose live state is kept
+            admission (AdmissionController, optional): Work budget every render must fit in
+        """
+        self.hacker_groups = hacker_groups or {}
+        self.delay = max(0.0, delay)
+        self.max_active = max(1, max_active)
+        self.encoder = encoder
+        self.executor = executor
+        self.max_sessions = max_sessions
+        self.admission = admission
+
+        self._sessions = collections.OrderedDict()
+        self._slots = asyncio.Semaphore(self.max_active)
+        self._lock = threading.Lock()
+
+        self.active = 0
+        self.started = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.debounced = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.errors = 0
+        self.peak_session_active = 0
+
+    def _state(self, session_id):
+        """Return the live state of a session, creating it if needed"""
+        state = self._sessions.get(session_id)
+        if state is None:
+            state = self._sessions[session_id] = _LiveState()
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        else:
+            self._sessions.move_to_end(session_id)
+        return state
+
+    def stats(self):
+        """
+        Return live mode counters
+
+        Returns:
+            dict: sessions, active renders and the started, completed,
+                cancelled, debounced, cache hit, rejected and error counts
+        """
+        with self._lock:
+            return {
+                'sessions': len(self._sessions),
+                'active': self.active,
+                'started': self.started,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'debounced': self.debounced,
+                'cache_hits': self.cache_hits,
+                'rejected': self.rejected,
+                'errors': self.errors,
+                'peak_session_active': self.peak_session_active,
+            }
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _finished(self, state, future):
+        """Executor callback: the render thread is done with this session"""
+        with self._lock:
+            self.active -= 1
+            state.active -= 1
+
+    async def render(self, session_id, markdown_text, group_theme=None):
+        """
+        Render the session's latest input once it stops changing
+
+        Args:
+            session_id (str): Client session id, e.g. gr.Request.session_hash
+            markdown_text (str): Markdown text to convert
+            group_theme (str, optional): Hacker group theme to apply
+
+        Returns:
+            tuple: (html_content, image_bytes), or None when a newer edit of
+                the same session superseded this one
+        """
+        state = self._state(session_id)
+        state.generation += 1
+        generation = state.generation
+        # A newer edit makes the render in flight worthless
+        if state.cancel is not None:
+            state.cancel.set()
+
+        await asyncio.sleep(self.delay)
+        if state.generation != generation:
+            self._count('debounced')
+            return None
+
+        account = start_account("live")
+        request = ManuscriptRequest(markdown_text, self.hacker_groups, group_theme, encoder=self.encoder,
+                                    account=account)
+        try:
+            return await self._render(state, generation, request)
+        finally:
+            finish_account(account)
+
+    async def _render(self, state, generation, request):
+        """Render a request that survived the debounce, None once superseded"""
+        try:
+            cached = request.prepare()
+        except Exception as e:
+            self._count('errors')
+            return request.failed(e)
+        if cached is not None:
+            self._count('cache_hits')
+            return cached
+
+        async with self._slots:
+            # Let the stopped render leave its thread before starting another
+            while state.running is not None and not state.running.done():
+                waiter = asyncio.wrap_future(state.running)
+                await asyncio.wait([waiter])
+                # Its owner reports the outcome, mark it retrieved here
+                waiter.exception()
+            if state.generation != generation:
+                self._count('debounced')
+                return None
+
+            try:
+                async with request.admit_async(self.admission):
+                    if state.generation != generation:
+                        self._count('debounced')
+                        return None
+                    result = await self._run(state, request)
+            except RenderRejected as e:
+                self._count('rejected')
+                return request.rejected(e)
+            except RenderCancelled:
+                self._count('cancelled')
+                return None
+            except Exception as e:
+                self._count('errors')
+                return request.failed(e)
+
+        self._count('completed')
+        return request.finish(result)
+
+    async def _run(self, state, request):
+        """Run one render in the executor, caller holds a slot and the admission budget"""
+        cancel = threading.Event()
+        executor = self.executor or get_render_executor()
+        with self._lock:
+            self.active += 1
+            self.started += 1
+            state.active += 1
+            self.peak_session_active = max(self.peak_session_active, state.active)
+        future = executor.submit(_bound, request.account, render_manuscript, request.markdown_text,
+                                 self.hacker_groups, request.group_theme, seed=request.seed,
+                                 encoder=self.encoder, cancel=cancel)
+        future.add_done_callback(functools.partial(self._finished, state))
+        state.cancel, state.running = cancel, future
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # The event itself was cancelled, e.g. the client left
+            cancel.set()
+            self._count('cancelled')
+            raise
@@ -3,206 +3,787 @@ H4X0R-OMEGA-H1ST0RY Manuscript Generator
 Converts markdown to stylized hacker-themed manuscripts
 """
 
-import re
 import random
 import io
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-import markdown
+import bisect
+import hashlib
+import contextlib
+import functools
+import logging
+import time
+from PIL import Image, ImageDraw
+import numpy as np
+
+from .background_pool import get_background_pool
+from .encoders import get_encoder
+from .fonts import TEXT_FONT_SIZE, draw_text, get_font_registry
+from .layout import (
+    CANVAS_WIDTH,
+    CONTENT_BOTTOM_MARGIN,
+    CONTENT_TOP,
+    LINE_HEIGHT,
+    canvas_height,
+    measure_rows,
+    place_lines,
+    split_line,
+)
+from .leet import DEFAULT_PROBABILITY, hackerize
+from .markdown_pool import convert_markdown
+from .memory import account_request, note_canvas
+from .metrics import record_canvas, record_error, record_request, span, stage_clock
+from .matrix import DEFAULT_MATRIX_STYLE, render_matrix_field, render_matrix_field_pillow
+from .render_cache import get_render_cache, make_render_key
+from .strips import PNGStripWriter
+
+# Canvases taller than this are painted and encoded strip by strip
+STRIP_THRESHOLD = 4000
+STRIP_HEIGHT = 1024
+
+# Hard cap on the canvas height, longer documents are paginated
+MAX_PAGE_HEIGHT = 20000
+
+# Progressive previews cover the first screenful at reduced resolution
+PREVIEW_HEIGHT = 800
+PREVIEW_SCALE = 2
+
+LINE_PREFIXES = ["[+] ", ">>> ", "## ", "/*", "$> ", "h4x: "]
+
+logger = logging.getLogger(__name__)
+FOOTER_TEXT = "0M3G4 H4X0R H1ST0R1C4L MU53UM // N30-M4TR1X"
+
+class RenderCancelled(Exception):
+    """The render was cancelled before it finished"""
+
+class RenderRejected(Exception):
+    """The render was refused before it started, e.g. by admission control"""
+
+def _check_cancelled(cancel):
+    """Raise RenderCancelled once the cancel event is set"""
+    if cancel is not None and cancel.is_set():
+        raise RenderCancelled("Manuscript render was cancelled")
+
+# Deterministic randomness
+def derive_seed(markdown_text, group_theme=None):
+    """
+    Derive the default render seed from the request content
+    
+    Identical (markdown, group) pairs get identical seeds and therefore
+    byte-identical images.
+    
+    Args:
+        markdown_text (str): Markdown text to convert
+        group_theme (str, optional): Hacker group theme to apply
+        
+    Returns:
+        int: 64-bit seed
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(str(group_theme).encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(markdown_text.encode('utf-8'))
+    return int.from_bytes(digest.digest(), 'big')
 
 # Text transformation functions
-def hackerize_text(text):
+def hackerize_text(text, rng=None, dictionary=None):
     """
     Convert normal text to l33t speak by replacing characters
     
     Args:
         text (str): Input text to transform
+        rng (random.Random, optional): Random source, a fresh one if None
+        dictionary (str, optional): Registered l33t dictionary, "default" if None
         
     Returns:
         str: Text with characters replaced for l33t aesthetics
     """
-    replacements = {
-        'a': '4', 'e': '3', 'i': '1', 'o': '0', 
-        't': '7', 's': '5', 'A': '4', 'E': '3', 
-        'I': '1', 'O': '0', 'T': '7', 'S': '5',
-        'ck': 'x', 'CK': 'X'
-    }
-    
-    for char, replacement in replacements.items():
-        # Randomly replace about 70% of occurrences for more authentic look
-        if random.random() < 0.7:
-            text = text.replace(char, replacement)
-    
-    return text
+    # Randomly replace about 70% of occurrences for more authentic look
+    return hackerize(text, dictionary, DEFAULT_PROBABILITY, rng)
 
 # Visual effects for manuscript generation
-def generate_matrix_background(width=800, height=400):
+def generate_matrix_background(width=800, height=400, engine="atlas", rng=None):
     """
     Create a matrix-style background image
     
     Args:
         width (int): Width of the image
         height (int): Height of the image
+        engine (str): "atlas" for the vectorized glyph-atlas renderer,
+            "pillow" for the reference per-glyph renderer
+        rng (random.Random, optional): Random source, a fresh one if None
         
     Returns:
         PIL.Image: Matrix-effect background image
     """
-    # Create a black background
-    image = Image.new('RGBA', (width, height), color=(0, 0, 0, 255))
-    draw = ImageDraw.Draw(image)
+    if rng is None:
+        rng = random.Random()
+    if engine == "pillow":
+        return render_matrix_field_pillow(width, height, rng=rng)
+    return render_matrix_field(width, height, np_rng=np.random.default_rng(rng.getrandbits(64)))
+
+# Manuscript layout and painting
+def _load_font():
+    """Return the registry's primary text font, None if unavailable"""
+    try:
+        return get_font_registry().primary_font(TEXT_FONT_SIZE)
+    except Exception:
+        return None
+
+def _group_banner(hacker_groups, group_theme):
+    """Return the banner text for a group theme, None without a known theme"""
+    if group_theme and group_theme in hacker_groups:
+        group = hacker_groups[group_theme]
+        return f"{group['emoji']} {group['name']} | {group['era']} | {group['emoji']}"
+    return None
+
+def layout_manuscript(text_lines, banner=None, width=CANVAS_WIDTH, rng=None, font=None):
+    """
+    Compute canvas size and element positions without drawing anything
     
-    # Add matrix-like falling characters
-    characters = "01ブラックハットネオハッカー"
-    green_shades = [(0, min(255, int(40 + i*20)), 0) for i in range(10)]
+    Decorated lines are wrapped to the canvas width with the font's cached
+    metrics, so the height is exact before any pixels are drawn.
     
-    for x in range(0, width, 20):
-        length = random.randint(5, height // 15)
-        y_offset = random.randint(0, height)
+    Args:
+        text_lines (list): Hackerized lines of the manuscript
+        banner (str, optional): Group banner text
+        width (int): Canvas width
+        rng (random.Random, optional): Picks the line decorators, a fresh one if None
+        font (ImageFont, optional): Font the lines will be drawn with
         
-        for y in range(length):
-            actual_y = (y_offset + y * 20) % height
-            opacity = int(255 * (1 - y / length))
-            color = random.choice(green_shades)
-            color_with_opacity = (color[0], color[1], color[2], opacity)
-            
-            char = random.choice(characters)
-            try:
-                draw.text((x, actual_y), char, fill=color_with_opacity)
-            except Exception as e:
-                # Fix: Use a default font or fallback to a simple shape
-                try:
-                    font = ImageFont.load_default()
-                    draw.text((x, actual_y), char, fill=color_with_opacity, font=font)
-                except Exception:
-                    # Fallback to simple rectangle if text fails
-                    draw.rectangle([(x, actual_y), (x+10, actual_y+10)], fill=color_with_opacity)
-    
-    # Apply a slight blur for the "glow" effect
+    Returns:
+        dict: width, height, banner and lines as (y, text) pairs, one per wrapped row
+    """
+    if rng is None:
+        rng = random.Random()
+    
+    # Add hackerspeak symbols as line decorators
+    decorated = [rng.choice(LINE_PREFIXES) + line if line.strip() else '' for line in text_lines]
+    placed, bottom = place_lines(decorated, font, width)
+    
+    return {
+        'width': width,
+        'height': canvas_height(bottom),
+        'banner': banner,
+        'lines': placed,
+        'line_tops': [y for y, _ in placed],
+    }
+
+def paginate_lines(text_lines, max_page_height=MAX_PAGE_HEIGHT, font=None, width=CANVAS_WIDTH):
+    """
+    Split manuscript lines into pages whose canvas fits the height cap
+    
+    Lines are measured wrapped behind the widest decorator, so a page never
+    outgrows the cap whichever decorators its layout picks. A single line
+    taller than a whole page is split where it wraps, and its pieces fill
+    pages of their own.
+    
+    Args:
+        text_lines (list): Hackerized lines of the manuscript
+        max_page_height (int): Hard cap on the canvas height of one page
+        font (ImageFont, optional): Font the lines will be drawn with
+        width (int): Canvas width
+        
+    Returns:
+        list: One list of lines per page
+    """
+    budget = max_page_height - CONTENT_TOP - CONTENT_BOTTOM_MARGIN
+    prefixes = tuple(LINE_PREFIXES)
+    pages = [[]]
+    used = 0
+    for line, rows in zip(text_lines, measure_rows(text_lines, font, width, prefixes)):
+        pieces = [(line, rows)]
+        if rows > budget:
+            pieces = split_line(line, budget // LINE_HEIGHT, font, width, prefixes)
+            pieces = zip(pieces, measure_rows(pieces, font, width, prefixes))
+        for piece, piece_rows in pieces:
+            if pages[-1] and used + piece_rows > budget:
+                pages.append([])
+                used = 0
+            pages[-1].append(piece)
+            used += piece_rows
+    return pages
+
+def paint_band(canvas, layout, top=0, font=None, footer_text=FOOTER_TEXT):
+    """
+    Draw banner, text lines and footer onto one band of the manuscript
+    
+    Args:
+        canvas (PIL.Image): Background band covering rows [top, top + canvas.height)
+        layout (dict): Layout from layout_manuscript()
+        top (int): Document row of the first canvas row
+        font (ImageFont, optional): Font to draw with
+        footer_text (str): Text drawn in the footer
+    """
+    draw = ImageDraw.Draw(canvas)
+    width, height = layout['width'], layout['height']
+    bottom = top + canvas.height
+    
+    # Draw group banner
+    if layout['banner'] and top < 40:
+        draw.rectangle([(0, -top), (width, 40 - top)], fill=(0, 30, 0, 230))
+        # Emoji in the banner come from the registry's fallback faces
+        draw_text(draw, (10, 10 - top), layout['banner'], (0, 255, 0), font)
+    
+    # Only the lines that reach into this band
+    first = bisect.bisect_left(layout['line_tops'], top - LINE_HEIGHT)
+    last = bisect.bisect_left(layout['line_tops'], bottom)
+    
+    for y_position, decorated_line in layout['lines'][first:last]:
+        y = y_position - top
+        # Draw text with green terminal-like glow
+        try:
+            draw_text(draw, (20, y), decorated_line, (0, 255, 0), font)
+        except Exception:
+            # Handle any text drawing errors gracefully
+            # Draw a placeholder line if text fails
+            draw.rectangle([(20, y), (min(width-20, 20 + len(decorated_line)*8), y+5)], fill=(0, 255, 0))
+    
+    # Draw footer
+    footer_y = height - 30
+    if footer_y < bottom:
+        draw.rectangle([(0, footer_y - top), (width, height - top)], fill=(0, 30, 0, 230))
+        try:
+            draw_text(draw, (10, footer_y + 5 - top), footer_text, (0, 255, 0), font)
+        except Exception:
+            # Draw a placeholder footer if text fails
+            draw.rectangle([(10, footer_y + 5 - top), (width - 10, footer_y + 15 - top)], fill=(0, 255, 0))
+
+def render_manuscript_png(layout, stream=None, font=None, render_mode="auto",
+                          strip_height=STRIP_HEIGHT, footer_text=FOOTER_TEXT, rng=None,
+                          encoder=None, cancel=None, matrix_style=None):
+    """
+    Paint a laid-out manuscript and encode it
+    
+    Canvases taller than STRIP_THRESHOLD (or any canvas with render_mode
+    "strips") are painted in bands of strip_height rows that are streamed
+    straight into the PNG encoder, so peak memory stays at one band. Strips
+    are always lossless RGBA PNG at the encoder's compress level: "strips"
+    rejects WebP and palette presets, "auto" writes them as lossless PNG
+    with a warning.
+    
+    Args:
+        layout (dict): Layout from layout_manuscript()
+        stream (file-like, optional): Binary stream to write to
+        font (ImageFont, optional): Font to draw with
+        render_mode (str): "auto", "single" or "strips"
+        strip_height (int): Rows per band in strip mode
+        footer_text (str): Text drawn in the footer
+        rng (random.Random, optional): Picks the background, a fresh one if None
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+        cancel (threading.Event, optional): Stops the render between stages
+            (and between strips) once set
+        matrix_style (tuple, optional): Background (column step, glow radius),
+            the full style if None
+        
+    Returns:
+        bytes: Image bytes when no stream was given, else None
+        
+    Raises:
+        RenderCancelled: If `cancel` was set before the image was finished
+        ValueError: If render_mode is "strips" and the encoder cannot stream
+    """
+    if rng is None:
+        rng = random.Random()
+    encoder = get_encoder(encoder)
+    output = stream if stream is not None else io.BytesIO()
+    width, height = layout['width'], layout['height']
+    pool = get_background_pool()
+    
+    # Strips repeat the stages, the clock records one sum per stage
+    clock = stage_clock()
+    
+    use_strips = render_mode == "strips" or (render_mode == "auto" and height > STRIP_THRESHOLD)
+    if use_strips and not encoder.streamable:
+        if render_mode == "strips":
+            raise ValueError(f"{encoder!r} cannot be written in strips, use a lossless PNG preset")
+        logger.warning("%d-row canvas is written in strips as lossless PNG, not with %r", height, encoder)
+    if use_strips:
+        compress_level = encoder.compress_level if encoder.format == 'PNG' else 6
+        writer = PNGStripWriter(output, width, height, mode='RGBA', compress_level=compress_level)
+        variant = rng.randrange(pool.variants)
+        for top in range(0, height, strip_height):
+            _check_cancelled(cancel)
+            band_height = min(strip_height, height - top)
+            with clock("background"):
+                band = pool.get_region(width, height, top, band_height, variant, rng, matrix_style)
+            with clock("draw"):
+                paint_band(band, layout, top, font, footer_text)
+            with clock("encode"):
+                writer.write(band)
+        with clock("encode"):
+            writer.close()
+    else:
+        # Create base image with matrix effect, cropped from the pool
+        with clock("background"):
+            background = pool.get(width, height, rng, matrix_style)
+        _check_cancelled(cancel)
+        with clock("draw"):
+            paint_band(background, layout, 0, font, footer_text)
+        _check_cancelled(cancel)
+        with clock("encode"):
+            encoder.encode(background, output)
+    
+    clock.observe()
+    record_canvas(width, height)
+    
+    if stream is None:
+        return output.getvalue()
+    return None
+
+def render_preview(layout, font=None, footer_text=FOOTER_TEXT, height=PREVIEW_HEIGHT,
+                   scale=PREVIEW_SCALE, encoder="palette-fast"):
+    """
+    Paint a quick preview of the top of a laid-out manuscript
+    
+    The text of the first `height` rows is drawn on plain black, without
+    the matrix background and its glow, and shrunk by `scale`. It consumes
+    no randomness, so the full render afterwards is unchanged.
+    
+    Args:
+        layout (dict): Layout from layout_manuscript()
+        font (ImageFont, optional): Font to draw with
+        footer_text (str): Text drawn in the footer
+        height (int): Canvas rows covered by the preview
+        scale (int): Downscale factor
+        encoder (str or ImageEncoder): Output preset of the preview
+        
+    Returns:
+        bytes: Encoded preview image
+    """
+    canvas = Image.new('RGBA', (layout['width'], min(height, layout['height'])), (0, 0, 0, 255))
+    note_canvas("preview", canvas.width, canvas.height, 4)
+    paint_band(canvas, layout, 0, font, footer_text)
+    if scale > 1:
+        canvas = canvas.reduce(scale)
+        note_canvas("preview reduced", canvas.width, canvas.height, 4)
+    output = io.BytesIO()
+    get_encoder(encoder).encode(canvas, output)
+    return output.getvalue()
+
+def _notice_image(headline, message, hint, color=(255, 0, 0)):
+    """Return the PNG bytes of a small notice image"""
+    error_img = Image.new('RGB', (800, 300), color=(0, 0, 0))
+    error_draw = ImageDraw.Draw(error_img)
     try:
-        image = image.filter(ImageFilter.GaussianBlur(radius=1))
+        error_draw.text((20, 20), headline, fill=color)
+        error_draw.text((20, 50), message, fill=color)
+        error_draw.text((20, 80), hint, fill=(0, 255, 0))
     except Exception:
-        # Skip blur if it fails
+        # Even drawing the message failed, just leave the black background
         pass
     
-    return image
+    error_bytes = io.BytesIO()
+    error_img.save(error_bytes, format='PNG')
+    return error_bytes.getvalue()
 
-# Main manuscript generator function
-def create_hacker_manuscript(markdown_text, hacker_groups=None, group_theme=None):
+def render_error(error):
+    """Return the HTML message and PNG bytes shown when rendering fails"""
+    error_message = f"<h1>Error generating manuscript</h1><p>{str(error)}</p>"
+    return error_message, _notice_image("Error generating H4X0R manuscript", str(error),
+                                        "Please try again with different content")
+
+def render_rejected(error):
+    """Return the HTML message and PNG bytes shown when a render is refused"""
+    message = f"<h1>Manuscript not rendered</h1><p>{str(error)}</p>"
+    return message, _notice_image("H4X0R manuscript not rendered", str(error),
+                                  "Nothing went wrong with your text", color=(255, 200, 0))
+
+def prepare_manuscript(markdown_text, hacker_groups=None, group_theme=None,
+                       max_page_height=MAX_PAGE_HEIGHT, seed=None):
     """
-    Create a styled hacker manuscript from markdown text
+    Run the text stages of a render: parse, hackerize and paginate
     
     Args:
         markdown_text (str): Markdown text to convert
         hacker_groups (dict): Dictionary of hacker group information
         group_theme (str, optional): Hacker group theme to apply
+        max_page_height (int): Hard cap on the canvas height of one page
+        seed (int, optional): Render seed, derived from the content if None
         
     Returns:
-        tuple: (html_content, image_bytes) - styled HTML and PNG image
+        dict: html, banner, font, pages (lines per page) and the rng the
+            image stages continue with
     """
     if hacker_groups is None:
         hacker_groups = {}
+    if seed is None:
+        seed = derive_seed(markdown_text, group_theme)
+    
+    # Every random choice of this render comes from this one instance
+    rng = random.Random(seed)
+    
+    # One parse gives the HTML and the plain text for the image
+    with span("parse"):
+        html_content, plain_text = convert_markdown(markdown_text)
+    
+    # Hackerize the text, groups may bring their own l33t dictionary
+    with span("hackerize"):
+        dictionary = hacker_groups.get(group_theme, {}).get('leet')
+        hacker_text = hackerize_text(plain_text, rng, dictionary)
+    
+    with span("paginate"):
+        font = _load_font()
+        pages = paginate_lines(hacker_text.split('\n'), max_page_height, font)
+    
+    return {
+        'html': html_content,
+        'banner': _group_banner(hacker_groups, group_theme),
+        'font': font,
+        'pages': pages,
+        'rng': rng,
+    }
+
+def layout_page(prepared, number):
+    """
+    Lay out one page of a prepared manuscript
+    
+    Pages must be laid out and rendered in order, they share the rng.
+    
+    Args:
+        prepared (dict): Result of prepare_manuscript()
+        number (int): Page number, starting at 1
         
-    try:
-        # Convert markdown to HTML
-        html_content = markdown.markdown(markdown_text)
-        
-        # Remove HTML tags to get plain text for image creation
-        plain_text = re.sub('<.*?>', '', html_content)
-        
-        # Hackerize the text
-        hacker_text = hackerize_text(plain_text)
+    Returns:
+        tuple: (layout, footer_text)
+    """
+    pages = prepared['pages']
+    footer_text = FOOTER_TEXT
+    if len(pages) > 1:
+        footer_text = f"{FOOTER_TEXT} // P4G3 {number}/{len(pages)}"
+    with span("layout"):
+        layout = layout_manuscript(pages[number - 1], prepared['banner'], rng=prepared['rng'],
+                                   font=prepared['font'])
+    return layout, footer_text
+
+def render_page(prepared, number, render_mode="auto", encoder=None, cancel=None, matrix_style=None):
+    """
+    Lay out, paint and encode one page of a prepared manuscript
+    
+    Args:
+        prepared (dict): Result of prepare_manuscript()
+        number (int): Page number, starting at 1
+        render_mode (str): "auto", "single" or "strips"
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+        cancel (threading.Event, optional): Stops the render once set
+        matrix_style (tuple, optional): Background (column step, glow radius)
         
-        # Generate background with matrix effect
-        width, height = 800, len(hacker_text.split('\n')) * 25 + 200
-        height = max(height, 400)  # Minimum height
+    Returns:
+        bytes: Encoded page image
+    """
+    layout, footer_text = layout_page(prepared, number)
+    return render_manuscript_png(layout, font=prepared['font'], render_mode=render_mode,
+                                 footer_text=footer_text, rng=prepared['rng'], encoder=encoder,
+                                 cancel=cancel, matrix_style=matrix_style)
+
+def render_manuscript_pages(markdown_text, hacker_groups=None, group_theme=None,
+                            max_page_height=MAX_PAGE_HEIGHT, render_mode="auto", seed=None,
+                            encoder=None):
+    """
+    Create a styled hacker manuscript split into pages of bounded height
+    
+    Args:
+        markdown_text (str): Markdown text to convert
+        hacker_groups (dict): Dictionary of hacker group information
+        group_theme (str, optional): Hacker group theme to apply
+        max_page_height (int): Hard cap on the canvas height of one page
+        render_mode (str): "auto", "single" or "strips"
+        seed (int, optional): Render seed, derived from the content if None
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
         
-        # Create base image with matrix effect
-        background = generate_matrix_background(width, height)
-        draw = ImageDraw.Draw(background)
+    Returns:
+        tuple: (html_content, pages) - styled HTML and a list of encoded images
+    """
+    prepared = prepare_manuscript(markdown_text, hacker_groups, group_theme, max_page_height, seed)
+    images = [render_page(prepared, number, render_mode, encoder)
+              for number in range(1, len(prepared['pages']) + 1)]
+    return prepared['html'], images
+
+# Main manuscript generator function
+def _render_options(seed, encoder=None, matrix_style=None):
+    """Return the settings besides content and group that shape a render"""
+    pool = get_background_pool()
+    options = {
+        'seed': seed,
+        'width': CANVAS_WIDTH,
+        'max_page_height': MAX_PAGE_HEIGHT,
+        'encoder': get_encoder(encoder).options(),
+        'background': [pool.enabled, pool.seed, pool.variants, pool.bucket_height, pool.max_height],
+    }
+    # Full-quality renders keep their keys
+    if matrix_style is not None and tuple(matrix_style) != DEFAULT_MATRIX_STYLE:
+        options['matrix_style'] = list(matrix_style)
+    return options
+
+def manuscript_html(prepared):
+    """Return the HTML of a prepared manuscript, noting when only page 1 is shown"""
+    html_content = prepared['html']
+    if len(prepared['pages']) > 1:
+        html_content += f"\n<p><em>H0L0 1M4G3 shows page 1 of {len(prepared['pages'])}</em></p>"
+    return html_content
+
+def render_manuscript(markdown_text, hacker_groups=None, group_theme=None, seed=None, encoder=None,
+                      cancel=None, matrix_style=None):
+    """
+    Render a manuscript without the render cache or error handling
+    
+    Only the first page is painted; it comes out identical to page 1 of
+    render_manuscript_pages() because later pages do not affect it.
+    
+    Args:
+        markdown_text (str): Markdown text to convert
+        hacker_groups (dict): Dictionary of hacker group information
+        group_theme (str, optional): Hacker group theme to apply
+        seed (int, optional): Render seed, derived from the content if None
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+        cancel (threading.Event, optional): Stops the render once set
+        matrix_style (tuple, optional): Background (column step, glow radius),
+            the full style if None
         
-        # Try to load a default font, fallback to None if unavailable
+    Returns:
+        tuple: (html_content, image_bytes) - styled HTML and the first page
+    """
+    prepared = prepare_manuscript(markdown_text, hacker_groups, group_theme, seed=seed)
+    _check_cancelled(cancel)
+    image_bytes = render_page(prepared, 1, encoder=encoder, cancel=cancel, matrix_style=matrix_style)
+    return manuscript_html(prepared), image_bytes
+
+class ManuscriptRequest:
+    """
+    Bookkeeping shared by every path that serves a manuscript request
+    
+    The sync, async, live and session paths only differ in how they run
+    the render. This resolves the seed and the cache key, holds the
+    admission budget and records the outcome in the render cache, the
+    metrics and the memory account the same way for all of them.
+    
+    Example:
+        request = ManuscriptRequest(text, groups, "L0PHT")
         try:
-            font = ImageFont.load_default()
-        except Exception:
-            font = None
+            cached = request.prepare()
+            if cached is not None:
+                return cached
+            with request.admit(admission):
+                result = render_manuscript(text, groups, "L0PHT", request.seed)
+            return request.finish(result)
+        except RenderRejected as e:
+            return request.rejected(e)
+        except Exception as e:
+            return request.failed(e)
+    """
+    
+    def __init__(self, markdown_text, hacker_groups=None, group_theme=None, seed=None, use_cache=True,
+                 encoder=None, matrix_style=None, account=None, options=None):
+        """
+        Args:
+            markdown_text (str): Markdown text to convert
+            hacker_groups (dict): Dictionary of hacker group information
+            group_theme (str, optional): Hacker group theme to apply
+            seed (int, optional): Render seed, derived from the content if None
+            use_cache (bool): Set to False to bypass the render cache
+            encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+            matrix_style (tuple, optional): Background (column step, glow radius),
+                the full style if None
+            account (MemoryAccount, optional): Memory account of the request
+            options (dict, optional): Render options without the seed, resolved
+                once for a whole batch; resolved here if None
+        """
+        self.markdown_text = markdown_text
+        self.hacker_groups = {} if hacker_groups is None else hacker_groups
+        self.group_theme = group_theme
+        self.seed = seed
+        self.use_cache = use_cache
+        self.encoder = encoder
+        self.matrix_style = matrix_style
+        self.account = account
+        self.options = options
+        self.key = None
+        self.start = time.perf_counter()
+    
+    @property
+    def style(self):
+        """Keyword arguments that hand the matrix style to a renderer, empty for the full style"""
+        return {} if self.matrix_style is None else {'matrix_style': self.matrix_style}
+    
+    def elapsed(self):
+        """Seconds since the request arrived"""
+        return time.perf_counter() - self.start
+    
+    def prepare(self, count_miss=True):
+        """
+        Resolve the seed and the cache key, then look the request up in the render cache
         
-        # Add group-specific theming if selected
-        group_banner = ""
-        if group_theme and group_theme in hacker_groups:
-            group = hacker_groups[group_theme]
-            group_banner = f"{group['emoji']} {group['name']} | {group['era']} | {group['emoji']}"
-            
-            # Draw group banner
-            draw.rectangle([(0, 0), (width, 40)], fill=(0, 30, 0, 230))
-            if font:
-                draw.text((10, 10), group_banner, fill=(0, 255, 0), font=font)
-            else:
-                draw.text((10, 10), group_banner, fill=(0, 255, 0))
-        
-        # Add content with retro hacker styling
-        y_position = 60
-        lines = hacker_text.split('\n')
-        
-        for line in lines:
-            if line.strip() == "":
-                y_position += 20
-                continue
-                
-            # Add hackerspeak symbols as line decorators
-            prefix = random.choice(["[+] ", ">>> ", "## ", "/*", "$> ", "h4x: "])
-            decorated_line = prefix + line
-            
-            # Draw text with green terminal-like glow
-            try:
-                if font:
-                    draw.text((20, y_position), decorated_line, fill=(0, 255, 0), font=font)
-                else:
-                    draw.text((20, y_position), decorated_line, fill=(0, 255, 0))
-            except Exception:
-                # Handle any text drawing errors gracefully
-                # Draw a placeholder line if text fails
-                draw.rectangle([(20, y_position), (min(width-20, 20 + len(decorated_line)*8), y_position+5)], fill=(0, 255, 0))
+        Args:
+            count_miss (bool): False leaves a miss out of the cache counters
             
-            y_position += 25
-        
-        # Draw footer
-        footer_y = height - 30
-        draw.rectangle([(0, footer_y), (width, height)], fill=(0, 30, 0, 230))
-        
-        footer_text = "0M3G4 H4X0R H1ST0R1C4L MU53UM // N30-M4TR1X"
-        try:
-            if font:
-                draw.text((10, footer_y + 5), footer_text, fill=(0, 255, 0), font=font)
-            else:
-                draw.text((10, footer_y + 5), footer_text, fill=(0, 255, 0))
-        except Exception:
-            # Draw a placeholder footer if text fails
-            draw.rectangle([(10, footer_y + 5), (width - 10, footer_y + 15)], fill=(0, 255, 0))
-        
-        # Convert to bytes for Gradio
-        img_byte_arr = io.BytesIO()
-        background.save(img_byte_arr, format='PNG')
-        img_byte_arr.seek(0)
+        Returns:
+            tuple: Cached (html_content, image_bytes), None on a miss or with the cache bypassed
+        """
+        if self.seed is None:
+            self.seed = derive_seed(self.markdown_text, self.group_theme)
+        if not self.use_cache:
+            return None
+        if self.options is None:
+            options = _render_options(self.seed, self.encoder, self.matrix_style)
+        else:
+            options = dict(self.options, seed=self.seed)
+        self.key = make_render_key(self.markdown_text, self.group_theme,
+                                   self.hacker_groups.get(self.group_theme), options)
+        cached = get_render_cache().get(self.key, count_miss)
+        if cached is not None:
+            record_request("cached", self.elapsed(), cached[1])
+        return cached
+    
+    def admit(self, admission, cost=None):
+        """
+        Return the context that holds the render's admission budget, a no-op without admission
+
+        `cost` charges that many estimated milliseconds instead of the
+        estimate of the whole document, e.g. for a partial repaint.
+        """
+        if admission is None:
+            return contextlib.nullcontext()
+        return admission.admit(self.markdown_text, self.encoder, cost)
+    
+    def admit_async(self, admission):
+        """Async variant of admit(), waits for budget without blocking the event loop"""
+        if admission is None:
+            return contextlib.nullcontext()
+        return admission.admit_async(self.markdown_text, self.encoder)
+    
+    def finish(self, result):
+        """
+        Cache and record a finished render
         
-        # Return both the styled HTML and the image
-        return html_content, img_byte_arr.getvalue()
+        Args:
+            result (tuple): (html_content, image_bytes)
+            
+        Returns:
+            tuple: The same result
+        """
+        if self.key is not None:
+            get_render_cache().put(self.key, result)
+        record_request("rendered", self.elapsed(), result[1])
+        if self.account is not None:
+            self.account.output_bytes = len(result[1])
+        return result
     
-    except Exception as e:
-        # If anything goes wrong, return an error message and a basic image
-        error_message = f"<h1>Error generating manuscript</h1><p>{str(e)}</p>"
+    def rejected(self, error):
+        """Record a refused render and return the notice shown instead"""
+        # Refused under load, tell the visitor instead of timing out
+        logger.info("Manuscript render rejected: %s", error)
+        record_request("rejected", self.elapsed())
+        return render_rejected(error)
+    
+    def failed(self, error):
+        """Log and record a failed render and return the error manuscript, call it from the except block"""
+        # Keep the failure visible in the logs and the error counters
+        logger.exception("Manuscript render failed")
+        record_error(error)
+        record_request("error", self.elapsed())
+        return render_error(error)
+
+def create_hacker_manuscript(markdown_text, hacker_groups=None, group_theme=None, seed=None,
+                             use_cache=True, encoder=None, renderer=None, admission=None,
+                             matrix_style=None, render_options=None):
+    """
+    Create a styled hacker manuscript from markdown text
+    
+    Documents taller than MAX_PAGE_HEIGHT are paginated and only the first
+    page is returned; use render_manuscript_pages() to get all of them.
+    Successful renders are kept in the process-wide render cache, keyed by
+    the content, the group theme and the render options.
+    
+    The render itself runs in this thread unless another `renderer` with
+    the signature of render_manuscript() is given, e.g. a process pool.
+    Cache misses pass through `admission` first, when given; refused
+    requests get a notice instead of a manuscript.
+    
+    Args:
+        markdown_text (str): Markdown text to convert
+        hacker_groups (dict): Dictionary of hacker group information
+        group_theme (str, optional): Hacker group theme to apply
+        seed (int, optional): Render seed, derived from the content if None
+        use_cache (bool): Set to False to bypass the render cache
+        encoder (str or ImageEncoder, optional): Output preset ("fast",
+            "balanced", "small", ...), "balanced" if None
+        renderer (callable, optional): Replacement for render_manuscript()
+        admission (AdmissionController, optional): Work budget the render must fit in
+        matrix_style (tuple, optional): Background (column step, glow radius),
+            the full style if None; passed to the renderer only when given
+        render_options (dict, optional): Render options without the seed,
+            shared by the items of a batch (see create_hacker_manuscripts())
         
-        # Create a simple error image
-        error_img = Image.new('RGB', (800, 300), color=(0, 0, 0))
-        error_draw = ImageDraw.Draw(error_img)
+    Returns:
+        tuple: (html_content, image_bytes) - styled HTML and encoded image
+    """
+    if renderer is None:
+        renderer = render_manuscript
+    with account_request("manuscript") as account:
+        request = ManuscriptRequest(markdown_text, hacker_groups, group_theme, seed, use_cache, encoder,
+                                    matrix_style, account, render_options)
         try:
-            error_draw.text((20, 20), "Error generating H4X0R manuscript", fill=(255, 0, 0))
-            error_draw.text((20, 50), str(e), fill=(255, 0, 0))
-            error_draw.text((20, 80), "Please try again with different content", fill=(0, 255, 0))
-        except Exception:
-            # Even drawing the error message failed, just leave the black background
-            pass
-        
-        error_bytes = io.BytesIO()
-        error_img.save(error_bytes, format='PNG')
-        error_bytes.seek(0)
+            cached = request.prepare()
+            if cached is not None:
+                return cached
+            with request.admit(admission):
+                result = renderer(markdown_text, request.hacker_groups, group_theme, request.seed, encoder,
+                                  **request.style)
+            return request.finish(result)
+        except RenderRejected as e:
+            return request.rejected(e)
+        except Exception as e:
+            # If anything goes wrong, return an error message and a basic image
+            return request.failed(e)
+
+def create_hacker_manuscripts(markdown_texts, hacker_groups=None, group_themes=None, seed=None,
+                              use_cache=True, encoder=None, renderer=None, admission=None,
+                              matrix_style=None, executor=None):
+    """
+    Create several manuscripts in one call
+    
+    The setup every item shares is done once for the whole batch: the
+    encoder and render options are resolved, the font is loaded and the
+    background pool is started. Identical requests are rendered once, the
+    others are handed to `executor` together, so a batch keeps as many
+    render threads or pool workers busy as it has distinct items. Every
+    item still gets its own content-derived seed and passes through
+    `admission` on its own, so results match create_hacker_manuscript().
+    
+    Args:
+        markdown_texts (list): Markdown texts to convert
+        hacker_groups (dict): Dictionary of hacker group information
+        group_themes (list, optional): Group theme of each text, None for no theme
+        seed (int, optional): Render seed of every item, derived per item if None
+        use_cache (bool): Set to False to bypass the render cache
+        encoder (str or ImageEncoder, optional): Output preset, "balanced" if None
+        renderer (callable, optional): Replacement for render_manuscript()
+        admission (AdmissionController, optional): Work budget every render must fit in
+        matrix_style (tuple, optional): Background (column step, glow radius),
+            the full style if None
+        executor (concurrent.futures.Executor, optional): Runs the distinct
+            items concurrently, they run one after another in this thread if None
         
-        return error_message, error_bytes.getvalue() 
\ No newline at end of file
+    Returns:
+        list: (html_content, image_bytes) per input, in input order
+    """
+    markdown_texts = list(markdown_texts)
+    if group_themes is None:
+        group_themes = [None] * len(markdown_texts)
+    try:
+        encoder = get_encoder(encoder)
+        render_options = _render_options(None, encoder, matrix_style)
+        _load_font()
+    except Exception as e:
+        return [render_error(e)] * len(markdown_texts)
+    
+    requests = list(dict.fromkeys(zip(markdown_texts, group_themes)))
+    render = functools.partial(create_hacker_manuscript, hacker_groups=hacker_groups, seed=seed,
+                               use_cache=use_cache, encoder=encoder, renderer=renderer, admission=admission,
+                               matrix_style=matrix_style, render_options=render_options)
+    if executor is None:
+        results = [render(markdown_text, group_theme=group_theme) for markdown_text, group_theme in requests]
+    else:
+        futures = [executor.submit(render, markdown_text, group_theme=group_theme)
+                   for markdown_text, group_theme in requests]
+        results = [future.result() for future in futures]
+    results = dict(zip(requests, results))
+    return [results[request] for request in zip(markdown_texts, group_themes)]
@@ -0,0 +1,250 @@
+"""
+H4X0R-OMEGA-H1ST0RY Markdown Pool
+Reusable per-thread Markdown parsers that yield both HTML and plain text
+"""
+
+import html
+import threading
+from html.parser import HTMLParser
+
+import markdown
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import AMP_SUBSTITUTE, HTML_PLACEHOLDER
+
+# Extensions of the manuscript parser, markdown.markdown() defaults
+DEFAULT_EXTENSIONS = ()
+
+# Elements that start a new line of plain text
+_BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt',
+    'figure', 'footer', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'li', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'thead', 'tfoot',
+    'tr', 'ul',
+))
+
+_PLACEHOLDER_START, _PLACEHOLDER_END = HTML_PLACEHOLDER.split('%s')
+
+
+class _TreeCapture(Treeprocessor):
+    """Keeps the finished element tree on the Markdown instance"""
+
+    def run(self, root):
+        self.md.manuscript_tree = root
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """Collects the text of a raw HTML fragment, one line per block element"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _BLOCK_TAGS or tag == 'br':
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in _BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def _html_fragment_text(fragment):
+    """Return the text of a stashed raw HTML fragment with entities decoded"""
+    extractor = _HTMLTextExtractor()
+    extractor.feed(fragment)
+    extractor.close()
+    return ''.join(extractor.parts)
+
+
+def _resolve_placeholders(text, stash):
+    """Replace raw HTML placeholders with the text of the stashed HTML"""
+    if _PLACEHOLDER_START not in text:
+        return text
+    pieces = text.split(_PLACEHOLDER_START)
+    resolved = [pieces[0]]
+    for piece in pieces[1:]:
+        index, found, rest = piece.partition(_PLACEHOLDER_END)
+        if found and index.isdigit() and int(index) < len(stash):
+            resolved.append(_html_fragment_text(stash[int(index)]))
+            resolved.append(rest)
+        else:
+            resolved.append(_PLACEHOLDER_START + piece)
+    return ''.join(resolved)
+
+
+def _decode(text, stash):
+    """
+    Return the plain text of an element's text or tail
+
+    Markdown keeps entities, escaped code and obfuscated email autolinks
+    (with its AMP_SUBSTITUTE marker for '&') in the tree, raw HTML as
+    placeholders.
+    """
+    return _resolve_placeholders(html.unescape(text.replace(AMP_SUBSTITUTE, '&')), stash)
+
+
+def _inline_text(element, stash, parts):
+    """Append the text inside an inline element, descendants included"""
+    if element.text:
+        parts.append(_decode(element.text, stash))
+    for child in element:
+        if child.tag == 'br':
+            parts.append('\n')
+        else:
+            _inline_text(child, stash, parts)
+        if child.tail:
+            parts.append(_decode(child.tail, stash))
+
+
+def _block_lines(element, stash, lines, marker=''):
+    """Append the lines of a block element and its nested blocks"""
+    if element.tag == 'hr':
+        lines.append('')
+        return
+
+    has_blocks = any(child.tag in _BLOCK_TAGS for child in element)
+    if not has_blocks:
+        parts = []
+        _inline_text(element, stash, parts)
+        text = ''.join(parts)
+        if element.tag == 'pre':
+            text = text.rstrip('\n')
+        else:
+            text = '\n'.join(line.strip() for line in text.split('\n') if line.strip())
+        if text or marker:
+            lines.append(marker + text)
+        return
+
+    # Mixed container: loose text runs become lines of their own
+    pending = marker
+    if element.text and element.text.strip():
+        lines.append(pending + _decode(element.text.strip(), stash))
+        pending = ''
+    for number, child in enumerate(element, 1):
+        if child.tag in _BLOCK_TAGS:
+            child_marker = pending
+            if child.tag == 'li':
+                child_marker = f"{number}. " if element.tag == 'ol' else "- "
+            before = len(lines)
+            _block_lines(child, stash, lines, child_marker)
+            if len(lines) > before:
+                pending = ''
+        elif child.tag != 'br':
+            parts = []
+            _inline_text(child, stash, parts)
+            text = ''.join(parts).strip()
+            if text:
+                lines.append(pending + text)
+                pending = ''
+        if child.tail and child.tail.strip():
+            lines.append(pending + _decode(child.tail.strip(), stash))
+            pending = ''
+
+
+def extract_text(root, stash=()):
+    """
+    Turn a parsed markdown element tree into plain text
+
+    Every block (heading, paragraph, list item, quote line) becomes its own
+    line, list items keep a "- " or "N. " marker, code blocks keep their
+    layout and entities come out decoded.
+
+    Args:
+        root (xml.etree.ElementTree.Element): Tree produced by markdown
+        stash (sequence): Raw HTML blocks the tree refers to by placeholder
+
+    Returns:
+        str: Plain text of the document
+    """
+    lines = []
+    _block_lines(root, stash, lines)
+    return '\n'.join(lines)
+
+
+class MarkdownPool:
+    """
+    Per-thread cache of markdown.Markdown instances
+
+    Building a Markdown instance loads and registers every processor, which
+    costs more than converting a short document. Each thread keeps one
+    instance per extension set and calls reset() between documents.
+    Instances are not shared across threads, since Markdown is not thread-safe.
+    """
+
+    def __init__(self, extensions=DEFAULT_EXTENSIONS):
+        """
+        Args:
+            extensions (iterable): Markdown extensions of the pooled parsers
+        """
+        self.extensions = tuple(extensions)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.created = 0
+
+    def _acquire(self):
+        """Return this thread's idle parser, creating one if needed"""
+        idle = getattr(self._local, 'idle', None)
+        if idle is None:
+            idle = self._local.idle = []
+        if idle:
+            return idle.pop()
+        md = markdown.Markdown(extensions=list(self.extensions))
+        md.treeprocessors.register(_TreeCapture(md), 'manuscript_capture', -100)
+        with self._lock:
+            self.created += 1
+        return md
+
+    def _release(self, md):
+        """Hand a parser back to this thread's idle list"""
+        self._local.idle.append(md)
+
+    def convert(self, text):
+        """
+        Parse markdown once into HTML and plain text
+
+        Args:
+            text (str): Markdown source
+
+        Returns:
+            tuple: (html_content, plain_text)
+        """
+        md = self._acquire()
+        try:
+            md.reset()
+            md.manuscript_tree = None
+            html_content = md.convert(text)
+            tree = md.manuscript_tree
+            plain_text = extract_text(tree, md.htmlStash.rawHtmlBlocks) if tree is not None else ''
+            return html_content, plain_text
+        finally:
+            md.manuscript_tree = None
+            self._release(md)
+
+
+_default_pool = MarkdownPool()
+
+
+def get_markdown_pool():
+    """
+    Return the process-wide markdown pool
+
+    Returns:
+        MarkdownPool: Shared pool
+    """
+    return _default_pool
+
+
+def convert_markdown(text):
+    """
+    Convert markdown to HTML and plain text with the process-wide pool
+
+    Args:
+        text (str): Markdown source
+
+    Returns:
+        tuple: (html_content, plain_text)
+    """
+    return _default_pool.convert(text)
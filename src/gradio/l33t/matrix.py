@@ -0,0 +1,337 @@
+"""
+H4X0R-OMEGA-H1ST0RY Matrix Rain Engine
+Renders the falling-glyph background with a pre-rasterized glyph atlas
+"""
+
+import functools
+import random
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from .fonts import MATRIX_FONT_SIZE, fallback_font, get_font_registry
+from .memory import note_canvas
+
+# Glyphs and palette shared by every matrix renderer
+MATRIX_CHARACTERS = "01ブラックハットネオハッカー"
+GREEN_SHADES = [(0, min(255, int(40 + i*20)), 0) for i in range(10)]
+
+# Grid spacing of the falling columns (pixels)
+COLUMN_STEP = 20
+ROW_STEP = 20
+
+# Radius of the GaussianBlur "glow"
+GLOW_RADIUS = 1
+
+# (column step, glow radius) of the full-quality background
+DEFAULT_MATRIX_STYLE = (COLUMN_STEP, GLOW_RADIUS)
+
+# Glyph placements composited per NumPy pass, keeps temporaries small
+_CHUNK_GLYPHS = 2048
+
+
+class GlyphAtlas:
+    """
+    Pre-rasterized coverage masks for the matrix glyphs
+
+    Every glyph is drawn once with the same Pillow call the legacy renderer
+    makes per character, then blurred in isolation. Because the field is
+    composited onto a flat black background and the blur is linear, blurring
+    each glyph up front gives the same pixels as blurring the whole canvas.
+
+    Attributes:
+        characters (str): Characters the atlas was built for
+        masks (numpy.ndarray): uint8 coverage masks, shape (glyphs, h, w)
+        offset (tuple): (dx, dy) from the text origin to the mask origin
+        index (numpy.ndarray): Atlas glyph index for every position in characters
+    """
+
+    def __init__(self, characters, masks, offset, index):
+        self.characters = characters
+        self.masks = masks
+        self.offset = offset
+        self.index = index
+
+    @property
+    def cell_size(self):
+        """tuple: (width, height) of a single glyph cell"""
+        return self.masks.shape[2], self.masks.shape[1]
+
+
+def _rasterize_glyph(char, font, canvas_size, origin):
+    """
+    Draw one glyph exactly as the legacy per-character loop would
+
+    Args:
+        char (str): Character to draw
+        font (ImageFont, optional): Font to draw with, Pillow default if None
+        canvas_size (int): Side of the square scratch canvas
+        origin (int): Text origin inside the scratch canvas
+
+    Returns:
+        PIL.Image: "L" image holding the glyph coverage
+    """
+    canvas = Image.new('L', (canvas_size, canvas_size), color=0)
+    draw = ImageDraw.Draw(canvas)
+    try:
+        if font:
+            draw.text((origin, origin), char, fill=255, font=font)
+        else:
+            draw.text((origin, origin), char, fill=255)
+    except Exception:
+        # Same fallback as the legacy loop: a simple rectangle
+        draw.rectangle([(origin, origin), (origin+10, origin+10)], fill=255)
+    return canvas
+
+
+def build_glyph_atlas(characters=MATRIX_CHARACTERS, font=None, glow_radius=GLOW_RADIUS):
+    """
+    Rasterize the matrix glyphs into an atlas
+
+    Args:
+        characters (str): Characters used by the falling columns
+        font (ImageFont, optional): Font to rasterize with, Pillow default if None;
+            registry fonts switch to their fallback faces for glyphs they lack
+        glow_radius (float): GaussianBlur radius baked into the masks, 0 disables
+
+    Returns:
+        GlyphAtlas: Atlas with one blurred coverage mask per distinct glyph
+    """
+    unique = list(dict.fromkeys(characters))
+    canvas_size = 3 * max(COLUMN_STEP, ROW_STEP)
+    origin = max(COLUMN_STEP, ROW_STEP)
+
+    layers = []
+    for char in unique:
+        canvas = _rasterize_glyph(char, fallback_font(font, char), canvas_size, origin)
+        if glow_radius:
+            canvas = canvas.filter(ImageFilter.GaussianBlur(radius=glow_radius))
+        layers.append(np.asarray(canvas, dtype=np.uint8))
+    stack = np.stack(layers)
+
+    # Crop every glyph to the union of the inked areas
+    inked = stack.max(axis=0)
+    rows = np.flatnonzero(inked.any(axis=1))
+    cols = np.flatnonzero(inked.any(axis=0))
+    if len(rows) == 0:
+        top, left, bottom, right = origin, origin, origin + 1, origin + 1
+    else:
+        top, bottom = rows[0], rows[-1] + 1
+        left, right = cols[0], cols[-1] + 1
+
+    # A cell must fit in one grid step so glyphs of one pass never overlap
+    bottom = min(bottom, top + ROW_STEP)
+    right = min(right, left + COLUMN_STEP)
+
+    masks = np.ascontiguousarray(stack[:, top:bottom, left:right])
+    offset = (int(left) - origin, int(top) - origin)
+    index = np.array([unique.index(char) for char in characters], dtype=np.intp)
+    return GlyphAtlas(characters, masks, offset, index)
+
+
+@functools.lru_cache(maxsize=8)
+def get_glyph_atlas(characters=MATRIX_CHARACTERS, glow_radius=GLOW_RADIUS):
+    """
+    Return the process-wide atlas for the registry font, building it once
+
+    The katakana come from the CJK face of the font registry when one is
+    installed.
+
+    Args:
+        characters (str): Characters used by the falling columns
+        glow_radius (float): GaussianBlur radius baked into the masks
+
+    Returns:
+        GlyphAtlas: Cached glyph atlas
+    """
+    try:
+        font = get_font_registry().primary_font(MATRIX_FONT_SIZE)
+    except Exception:
+        font = None
+    return build_glyph_atlas(characters, font=font, glow_radius=glow_radius)
+
+
+def plan_matrix_field(width, height, np_rng, glyph_count, column_step=COLUMN_STEP):
+    """
+    Lay out the falling columns without drawing anything
+
+    Mirrors the legacy loop: one column every COLUMN_STEP pixels with a random
+    length and start offset, rows wrapping around the bottom edge, opacity
+    fading along the column and a random shade and glyph per cell.
+
+    Args:
+        width (int): Width of the field
+        height (int): Height of the field
+        np_rng (numpy.random.Generator): Random source for the layout
+        glyph_count (int): Number of characters to choose glyphs from
+        column_step (int): Pixels between columns, at least COLUMN_STEP;
+            larger steps give a sparser, cheaper field
+
+    Returns:
+        dict: Per-placement arrays x, y, lap, opacity, green and char
+    """
+    columns = np.arange(0, width, max(COLUMN_STEP, column_step))
+    max_length = max(5, height // 15)
+    lengths = np_rng.integers(5, max_length + 1, size=len(columns))
+    offsets = np_rng.integers(0, height + 1, size=len(columns))
+
+    column = np.repeat(np.arange(len(columns)), lengths)
+    starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    step = np.arange(len(column)) - starts
+
+    raw_y = offsets[column] + step * ROW_STEP
+    green_levels = np.array([shade[1] for shade in GREEN_SHADES])
+
+    return {
+        'x': columns[column],
+        'y': raw_y % height,
+        'lap': raw_y // height,
+        'opacity': (255 * (1 - step / lengths[column])).astype(np.int32),
+        'green': green_levels[np_rng.integers(0, len(GREEN_SHADES), size=len(column))],
+        'char': np_rng.integers(0, glyph_count, size=len(column)),
+    }
+
+
+def _composite_chunk(green_plane, alpha_plane, pad, atlas, x, y, glyph, green, opacity):
+    """
+    Blend one batch of non-overlapping glyph placements into the planes
+
+    Uses the same integer blend as Pillow's text drawing so a single glyph
+    matches a draw.text() call pixel for pixel. Red and blue stay zero for
+    every placement, so only the green and alpha planes are touched.
+    """
+    cell_w, cell_h = atlas.cell_size
+    dx, dy = atlas.offset
+    stride = green_plane.shape[1]
+
+    rows = (y + dy + pad)[:, None, None] + np.arange(cell_h)[None, :, None]
+    cols = (x + dx + pad)[:, None, None] + np.arange(cell_w)[None, None, :]
+    target = (rows * stride + cols).ravel()
+    coverage = atlas.masks[glyph].astype(np.int32)
+
+    for plane, ink in ((green_plane, green), (alpha_plane, opacity)):
+        pixels = plane.reshape(-1)
+        current = pixels[target].reshape(coverage.shape).astype(np.int32)
+        blend = (ink[:, None, None] - current) * coverage + 128
+        pixels[target] = (current + (((blend >> 8) + blend) >> 8)).ravel()
+
+
+def composite_matrix_field(green_plane, alpha_plane, pad, plan, atlas):
+    """
+    Composite a planned matrix field onto green and alpha planes in place
+
+    Placements are processed one wrap-around lap at a time: inside a lap no two
+    cells overlap, and later laps are drawn over earlier ones just like the
+    legacy loop draws later rows over earlier ones.
+
+    Args:
+        green_plane (numpy.ndarray): uint8 green channel with `pad` pixels of margin
+        alpha_plane (numpy.ndarray): uint8 alpha channel with the same layout
+        pad (int): Margin around the visible area, absorbs glyphs cut by the edges
+        plan (dict): Placements from plan_matrix_field()
+        atlas (GlyphAtlas): Glyph masks to composite
+    """
+    glyphs = atlas.index[plan['char']]
+
+    for lap in np.unique(plan['lap']):
+        selected = np.flatnonzero(plan['lap'] == lap)
+        for start in range(0, len(selected), _CHUNK_GLYPHS):
+            part = selected[start:start + _CHUNK_GLYPHS]
+            _composite_chunk(
+                green_plane, alpha_plane, pad, atlas,
+                plan['x'][part], plan['y'][part], glyphs[part],
+                plan['green'][part], plan['opacity'][part]
+            )
+
+
+def render_matrix_field(width=800, height=400, atlas=None, np_rng=None, column_step=COLUMN_STEP):
+    """
+    Render a matrix-style background with the glyph atlas engine
+
+    Args:
+        width (int): Width of the image
+        height (int): Height of the image
+        atlas (GlyphAtlas, optional): Atlas to draw with, default atlas if None
+        np_rng (numpy.random.Generator, optional): Layout random source,
+            a freshly seeded generator if None
+        column_step (int): Pixels between columns, see plan_matrix_field()
+
+    Returns:
+        PIL.Image: Matrix-effect background image (already glowing)
+    """
+    if atlas is None:
+        atlas = get_glyph_atlas()
+    if np_rng is None:
+        np_rng = np.random.default_rng()
+
+    # Margins wide enough that no cell ever needs clipping
+    pad = max(atlas.cell_size) + max(abs(atlas.offset[0]), abs(atlas.offset[1]))
+    # The padded glow planes, their cropped copies plus the black plane, and the merged field
+    note_canvas("glow planes", width + 2 * pad, height + 2 * pad, 2)
+    note_canvas("glow crops", width, height, 3)
+    note_canvas("matrix field", width, height, 4)
+    green_plane = np.zeros((height + 2 * pad, width + 2 * pad), dtype=np.uint8)
+    alpha_plane = np.full((height + 2 * pad, width + 2 * pad), 255, dtype=np.uint8)
+
+    plan = plan_matrix_field(width, height, np_rng, len(atlas.characters), column_step)
+    composite_matrix_field(green_plane, alpha_plane, pad, plan, atlas)
+
+    # Crop in Pillow: slicing the arrays first would force a strided copy
+    visible = (pad, pad, pad + width, pad + height)
+    black = Image.new('L', (width, height), color=0)
+    return Image.merge('RGBA', (
+        black,
+        Image.fromarray(green_plane).crop(visible),
+        black,
+        Image.fromarray(alpha_plane).crop(visible),
+    ))
+
+
+def render_matrix_field_pillow(width=800, height=400, rng=None):
+    """
+    Render a matrix-style background with one Pillow call per glyph
+
+    This is the original renderer, kept as the reference for the atlas engine
+    and for benchmarking.
+
+    Args:
+        width (int): Width of the image
+        height (int): Height of the image
+        rng (random.Random, optional): Random source, a fresh one if None
+
+    Returns:
+        PIL.Image: Matrix-effect background image
+    """
+    if rng is None:
+        rng = random.Random()
+
+    # Create a black background
+    image = Image.new('RGBA', (width, height), color=(0, 0, 0, 255))
+    draw = ImageDraw.Draw(image)
+    font = get_font_registry().primary_font(MATRIX_FONT_SIZE)
+
+    for x in range(0, width, COLUMN_STEP):
+        length = rng.randint(5, height // 15)
+        y_offset = rng.randint(0, height)
+
+        for y in range(length):
+            actual_y = (y_offset + y * ROW_STEP) % height
+            opacity = int(255 * (1 - y / length))
+            color = rng.choice(GREEN_SHADES)
+            color_with_opacity = (color[0], color[1], color[2], opacity)
+
+            char = rng.choice(MATRIX_CHARACTERS)
+            try:
+                draw.text((x, actual_y), char, fill=color_with_opacity, font=fallback_font(font, char))
+            except Exception:
+                # Fallback to simple rectangle if text fails
+                draw.rectangle([(x, actual_y), (x+10, actual_y+10)], fill=color_with_opacity)
+
+    # Apply a slight blur for the "glow" effect
+    try:
+        image = image.filter(ImageFilter.GaussianBlur(radius=GLOW_RADIUS))
+    except Exception:
+        # Skip blur if it fails
+        pass
+
+    return image
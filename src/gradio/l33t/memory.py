@@ -0,0 +1,319 @@
+"""
+H4X0R-OMEGA-H1ST0RY Memory Accounting
+Per-request peak allocation, canvas estimates and top allocation sites
+"""
+
+import contextlib
+import contextvars
+import linecache
+import logging
+import os
+import threading
+import time
+import tracemalloc
+
+logger = logging.getLogger(__name__)
+
+# Requests whose peak allocation or canvas estimate exceeds this are logged
+DEFAULT_THRESHOLD_MB = 256
+# Allocation sites reported for a request over the threshold
+DEFAULT_TOP_SITES = 10
+# Frames kept per traced allocation, 1 is enough to group by line
+DEFAULT_TRACE_FRAMES = 1
+
+# Allocations of the accounting itself, never reported as sites
+_IGNORED_SITES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class MemoryAccount:
+    """
+    Memory used by one request
+
+    tracemalloc sees numpy arrays and Python objects, but Pillow allocates
+    pixel buffers outside the Python allocator, so every intermediate image
+    is also noted here as width x height x channels.
+
+    Attributes:
+        label (str): Request label used in the log
+        canvases (list): (label, width, height, channels) of every intermediate image
+        canvas_bytes (int): Sum of the canvas estimates
+        peak_bytes (int): Peak traced Python allocation above the request's start
+        output_bytes (int): Size of the encoded result
+        seconds (float): Wall time of the request
+        top_sites (list): (site, size in bytes, allocations) at the request's
+            largest checkpoint, only for requests over the threshold
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.canvases = []
+        self.canvas_bytes = 0
+        self.peak_bytes = 0
+        self.output_bytes = 0
+        self.seconds = 0.0
+        self.top_sites = []
+        self._baseline = 0
+        self._start = 0.0
+        self._snapshot = None
+        self._snapshot_bytes = 0
+
+    @property
+    def largest_canvas(self):
+        """Bytes of the largest single intermediate image"""
+        return max((width * height * channels for _, width, height, channels in self.canvases), default=0)
+
+    def note_canvas(self, label, width, height, channels=4):
+        """Add one intermediate image to the estimate"""
+        self.canvases.append((label, width, height, channels))
+        self.canvas_bytes += width * height * channels
+        self._checkpoint()
+
+    def summary(self):
+        """
+        Return the account as plain data
+
+        Returns:
+            dict: label, peak_bytes, canvas_bytes, largest_canvas, output_bytes,
+                seconds, canvases and top_sites
+        """
+        return {
+            'label': self.label,
+            'peak_bytes': self.peak_bytes,
+            'canvas_bytes': self.canvas_bytes,
+            'largest_canvas': self.largest_canvas,
+            'output_bytes': self.output_bytes,
+            'seconds': self.seconds,
+            'canvases': list(self.canvases),
+            'top_sites': list(self.top_sites),
+        }
+
+    def _checkpoint(self):
+        """
+        Snapshot the heap at the largest checkpoint of a request over the threshold
+
+        Pillow's pixel buffers are not traced, so a request can be over the
+        threshold by its canvases alone; its sites are then taken from the
+        largest traced heap seen while it was over.
+        """
+        current = tracemalloc.get_traced_memory()[0]
+        over = max(current - self._baseline, self.canvas_bytes) > _threshold_bytes
+        if over and (self._snapshot is None or current > self._snapshot_bytes):
+            self._snapshot = tracemalloc.take_snapshot()
+            self._snapshot_bytes = current
+
+
+_enabled = os.environ.get("H4X0R_MEMORY", "0") == "1"
+_threshold_bytes = int(float(os.environ.get("H4X0R_MEMORY_THRESHOLD_MB", DEFAULT_THRESHOLD_MB)) * 1024 * 1024)
+_top_sites = int(os.environ.get("H4X0R_MEMORY_TOP", DEFAULT_TOP_SITES))
+_current = contextvars.ContextVar("memory_account", default=None)
+_lock = threading.Lock()
+_active = 0
+_started_tracing = False
+_stats = {'requests': 0, 'over_threshold': 0, 'max_peak_bytes': 0, 'max_canvas_bytes': 0,
+          'max_output_bytes': 0}
+
+
+def memory_accounting_enabled():
+    """Return True when requests are being accounted"""
+    return _enabled
+
+
+def enable_memory_accounting(enabled=True, threshold_mb=None, top_sites=None):
+    """
+    Turn per-request memory accounting on or off for this process
+
+    tracemalloc starts with the first accounted request and slows every
+    allocation down while it runs, so keep this to diagnostic deployments.
+
+    Args:
+        enabled (bool): True to account requests
+        threshold_mb (float, optional): Log requests above this many MiB
+        top_sites (int, optional): Allocation sites reported per logged request
+    """
+    global _enabled, _threshold_bytes, _top_sites, _started_tracing
+    _enabled = bool(enabled)
+    if threshold_mb is not None:
+        _threshold_bytes = int(threshold_mb * 1024 * 1024)
+    if top_sites is not None:
+        _top_sites = top_sites
+    with _lock:
+        # Only stop tracing this module started, e.g. not a profiler's
+        if not _enabled and _active == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+def current_account():
+    """
+    Return the account of the request running in this context
+
+    Returns:
+        MemoryAccount: The account, None outside accounted requests
+    """
+    return _current.get()
+
+
+def note_canvas(label, width, height, channels=4):
+    """
+    Add an intermediate image to the current request's canvas estimate
+
+    Args:
+        label (str): What the image is, e.g. "background"
+        width (int): Width in pixels
+        height (int): Height in pixels
+        channels (int): Bytes per pixel
+    """
+    if not _enabled:
+        return
+    account = _current.get()
+    if account is not None:
+        account.note_canvas(label, width, height, channels)
+
+
+def start_account(label="manuscript"):
+    """
+    Open the account of one request
+
+    The peak is the traced allocation high-water mark above the request's
+    start. tracemalloc keeps one process-wide peak, so requests that overlap
+    share it: each of them reports the peak of the whole overlap, an upper
+    bound of its own. Stages only add to the account while it is bound to
+    their context (bind_account()).
+
+    Args:
+        label (str): Request label used in the log
+
+    Returns:
+        MemoryAccount: The open account, None while accounting is off
+    """
+    if not _enabled:
+        return None
+    global _active, _started_tracing
+    account = MemoryAccount(label)
+    with _lock:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(DEFAULT_TRACE_FRAMES)
+            _started_tracing = True
+        if _active == 0:
+            tracemalloc.reset_peak()
+        _active += 1
+        account._baseline = tracemalloc.get_traced_memory()[0]
+    account._start = time.perf_counter()
+    return account
+
+
+def finish_account(account):
+    """
+    Close an account, update the process totals and log it
+
+    Args:
+        account (MemoryAccount): Account from start_account(), None is ignored
+    """
+    if account is None:
+        return
+    global _active
+    account.seconds = time.perf_counter() - account._start
+    account._checkpoint()
+    with _lock:
+        account.peak_bytes = max(0, tracemalloc.get_traced_memory()[1] - account._baseline)
+        _active -= 1
+    _finish(account)
+
+
+@contextlib.contextmanager
+def bind_account(account):
+    """
+    Make `account` the current account of this context, e.g. in an executor thread
+
+    Args:
+        account (MemoryAccount): Account to add to, None binds nothing
+    """
+    if account is None:
+        yield None
+        return
+    token = _current.set(account)
+    try:
+        yield account
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def account_request(label="manuscript"):
+    """
+    Account the memory of one request, e.g. `with account_request("convert"): ...`
+
+    Inside an accounted request this joins the enclosing account.
+
+    Args:
+        label (str): Request label used in the log
+
+    Yields:
+        MemoryAccount: The request's account, None while accounting is off
+    """
+    enclosing = _current.get()
+    if enclosing is not None:
+        yield enclosing
+        return
+    account = start_account(label)
+    try:
+        with bind_account(account):
+            yield account
+    finally:
+        finish_account(account)
+
+
+def _finish(account):
+    """Update the process totals and log the account"""
+    over = max(account.peak_bytes, account.canvas_bytes) > _threshold_bytes
+    if over and account._snapshot is not None:
+        statistics = account._snapshot.filter_traces(_IGNORED_SITES).statistics('lineno')
+        account.top_sites = [(str(stat.traceback[0]), stat.size, stat.count) for stat in statistics[:_top_sites]]
+    account._snapshot = None
+
+    with _lock:
+        _stats['requests'] += 1
+        _stats['over_threshold'] += over
+        _stats['max_peak_bytes'] = max(_stats['max_peak_bytes'], account.peak_bytes)
+        _stats['max_canvas_bytes'] = max(_stats['max_canvas_bytes'], account.canvas_bytes)
+        _stats['max_output_bytes'] = max(_stats['max_output_bytes'], account.output_bytes)
+
+    message = (f"{account.label}: peak {_mib(account.peak_bytes)} traced, "
+               f"{_mib(account.canvas_bytes)} canvases ({len(account.canvases)} images, "
+               f"largest {_mib(account.largest_canvas)}), {_mib(account.output_bytes)} out, "
+               f"{account.seconds * 1000:.0f} ms")
+    if not over:
+        logger.debug(message)
+        return
+    lines = [f"Request over the {_mib(_threshold_bytes)} memory threshold: {message}"]
+    lines.extend(f"  {size / 1024:10.1f} KiB {count:8d} blocks  {site}" for site, size, count in account.top_sites)
+    logger.warning("\n".join(lines))
+
+
+def _mib(size):
+    return f"{size / (1024 * 1024):.1f} MiB"
+
+
+def memory_stats():
+    """
+    Return the process totals of the accounted requests
+
+    Returns:
+        dict: requests, over_threshold, max_peak_bytes, max_canvas_bytes and
+            max_output_bytes
+    """
+    with _lock:
+        return dict(_stats)
+
+
+def reset_memory_stats():
+    """Zero the process totals"""
+    with _lock:
+        for key in _stats:
+            _stats[key] = 0
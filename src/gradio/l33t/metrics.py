@@ -0,0 +1,391 @@
+"""
+H4X0R-OMEGA-H1ST0RY Render Metrics
+Stage timing spans, counters and histograms with Prometheus text exposition
+"""
+
+import bisect
+import os
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond stages to huge pages
+DEFAULT_TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                        10.0)
+BYTES_BUCKETS = (4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+PIXEL_BUCKETS = (320000, 800000, 1600000, 3200000, 8000000, 16000000)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names, values, extra=()):
+    """Return the {name="value",...} part of a sample line"""
+    pairs = [(name, value) for name, value in zip(names, values)] + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        """
+        Args:
+            name (str): Metric name
+            documentation (str): HELP text
+            labels (tuple): Label names
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, *label_values):
+        """
+        Add to the counter
+
+        Args:
+            amount (float): Non-negative increment
+            *label_values: One value per label name
+        """
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        """Return the current value of one label combination"""
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self):
+        """Yield (suffix, label string, value) exposition samples"""
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield "_total", _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """Cumulative bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_TIME_BUCKETS):
+        """
+        Args:
+            name (str): Metric name
+            documentation (str): HELP text
+            labels (tuple): Label names
+            buckets (tuple): Ascending upper bounds, +Inf is implied
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """
+        Record one observation
+
+        Args:
+            value (float): Observed value
+            *label_values: One value per label name
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *label_values):
+        """Return the number of observations of one label combination"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return series[2] if series else 0
+
+    def total(self, *label_values):
+        """Return the sum of the observations of one label combination"""
+        with self._lock:
+            series = self._series.get(label_values)
+            return series[1] if series else 0.0
+
+    def samples(self):
+        """Yield (suffix, label string, value) exposition samples"""
+        with self._lock:
+            items = sorted((key, (list(series[0]), series[1], series[2]))
+                           for key, series in self._series.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = ("le", _format_number(bound if bound == float('inf') else float(bound)))
+                yield "_bucket", _format_labels(self.labels, label_values, [le]), cumulative
+            yield "_sum", _format_labels(self.labels, label_values), total
+            yield "_count", _format_labels(self.labels, label_values), count
+
+
+class MetricsRegistry:
+    """
+    The manuscript metrics of one process
+
+    Attributes:
+        stage_seconds (Histogram): Wall time per pipeline stage
+        render_seconds (Histogram): Wall time of whole create_hacker_manuscript() calls
+        requests (Counter): Manuscript requests by outcome (rendered, cached, error)
+        errors (Counter): Failed renders by exception type
+        bytes_out (Counter): Image bytes returned
+        image_bytes (Histogram): Size of every returned image
+        canvas_pixels (Histogram): Pixels of every painted canvas
+        quality_tier (Counter): Requests served per quality tier
+    """
+
+    def __init__(self):
+        self.stage_seconds = Histogram("h4x0r_stage_seconds", "Wall time of one manuscript pipeline stage",
+                                       ("stage",))
+        self.render_seconds = Histogram("h4x0r_render_seconds", "Wall time of one manuscript request")
+        self.requests = Counter("h4x0r_manuscript_requests", "Manuscript requests by outcome", ("outcome",))
+        self.errors = Counter("h4x0r_manuscript_errors", "Failed manuscript renders by exception type",
+                              ("type",))
+        self.bytes_out = Counter("h4x0r_manuscript_bytes_out", "Image bytes returned to clients")
+        self.image_bytes = Histogram("h4x0r_manuscript_image_bytes", "Size of returned manuscript images",
+                                     buckets=BYTES_BUCKETS)
+        self.canvas_pixels = Histogram("h4x0r_canvas_pixels", "Pixels of painted manuscript canvases",
+                                       buckets=PIXEL_BUCKETS)
+        self.quality_tier = Counter("h4x0r_quality_tier_requests", "Requests served per quality tier",
+                                    ("tier",))
+        self.metrics = [self.stage_seconds, self.render_seconds, self.requests, self.errors,
+                        self.bytes_out, self.image_bytes, self.canvas_pixels, self.quality_tier]
+
+    def render(self):
+        """
+        Return every metric in the Prometheus text exposition format
+
+        Returns:
+            str: Exposition text
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{labels} {_format_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class _NullSpan:
+    """Shared do-nothing span handed out while metrics are off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __call__(self, stage):
+        return self
+
+    def observe(self):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times one stage and records it on exit"""
+
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _registry.stage_seconds.observe(time.perf_counter() - self.start, self.stage)
+        return False
+
+
+class _StageClock:
+    """Sums the time of repeated stages (e.g. per strip) and records each sum once"""
+
+    def __init__(self):
+        self.seconds = {}
+
+    def __call__(self, stage):
+        return _ClockSpan(self, stage)
+
+    def observe(self):
+        for stage, seconds in self.seconds.items():
+            _registry.stage_seconds.observe(seconds, stage)
+        self.seconds = {}
+
+
+class _ClockSpan:
+    """Adds the time of one stage run to its clock"""
+
+    __slots__ = ('clock', 'stage', 'start')
+
+    def __init__(self, clock, stage):
+        self.clock = clock
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = self.clock.seconds
+        seconds[self.stage] = seconds.get(self.stage, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+_registry = MetricsRegistry()
+_enabled = os.environ.get("H4X0R_METRICS", "0") == "1"
+
+
+def metrics_enabled():
+    """Return True when instrumentation is recording"""
+    return _enabled
+
+
+def enable_metrics(enabled=True):
+    """
+    Turn the instrumentation on or off for this process
+
+    Args:
+        enabled (bool): True to record, False for no-op spans
+    """
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def get_metrics():
+    """
+    Return the process-wide metrics registry
+
+    Returns:
+        MetricsRegistry: Shared registry
+    """
+    return _registry
+
+
+def reset_metrics():
+    """Replace the process-wide registry with an empty one"""
+    global _registry
+    _registry = MetricsRegistry()
+
+
+def span(stage):
+    """
+    Time one stage, e.g. `with span("parse"): ...`
+
+    Args:
+        stage (str): Stage label
+
+    Returns:
+        context manager: A timing span, a shared no-op while metrics are off
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(stage)
+
+
+def stage_clock():
+    """
+    Return a clock that sums repeated stages of one render
+
+    Use `with clock("draw"): ...` per band and `clock.observe()` once at
+    the end, so strip renders record one sample per stage, not per strip.
+
+    Returns:
+        callable: Stage clock, a shared no-op while metrics are off
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _StageClock()
+
+
+def record_request(outcome, seconds=None, image_bytes=None):
+    """
+    Count one manuscript request
+
+    Args:
+        outcome (str): "rendered", "cached" or "error"
+        seconds (float, optional): Wall time of the request
+        image_bytes (bytes, optional): Returned image
+    """
+    if not _enabled:
+        return
+    registry = _registry
+    registry.requests.inc(1, outcome)
+    if seconds is not None:
+        registry.render_seconds.observe(seconds)
+    if image_bytes is not None:
+        registry.bytes_out.inc(len(image_bytes))
+        registry.image_bytes.observe(len(image_bytes))
+
+
+def record_error(error):
+    """Count a failed render by exception type"""
+    if _enabled:
+        _registry.errors.inc(1, type(error).__name__)
+
+
+def record_tier(tier):
+    """Count a request served at a quality tier"""
+    if _enabled:
+        _registry.quality_tier.inc(1, tier)
+
+
+def record_canvas(width, height):
+    """Record the size of a painted canvas"""
+    if _enabled:
+        _registry.canvas_pixels.observe(width * height)
+
+
+def metrics_response():
+    """
+    Build the HTTP response of the metrics endpoint
+
+    Returns:
+        starlette.responses.Response: Prometheus text exposition
+    """
+    from starlette.responses import Response
+    return Response(get_metrics().render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def mount_metrics(blocks, path="/metrics", gradio_path="/"):
+    """
+    Serve a Gradio app with a Prometheus endpoint next to it
+
+    Args:
+        blocks (gr.Blocks): The Gradio interface
+        path (str): URL of the metrics endpoint
+        gradio_path (str): URL the Gradio app is mounted at
+
+    Returns:
+        fastapi.FastAPI: App to run with uvicorn
+    """
+    import gradio as gr
+    from fastapi import FastAPI
+
+    app = FastAPI()
+    app.add_api_route(path, metrics_response, methods=["GET"], include_in_schema=False)
+    return gr.mount_gradio_app(app, blocks, path=gradio_path)
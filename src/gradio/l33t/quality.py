@@ -0,0 +1,335 @@
+"""
+H4X0R-OMEGA-H1ST0RY Quality Tiers
+Adaptive render quality that trades background detail and encoder effort for latency
+"""
+
+import collections
+import contextlib
+import threading
+import time
+
+from .async_manuscript import create_hacker_manuscript_progressive
+from .manuscript import ManuscriptRequest, create_hacker_manuscript, create_hacker_manuscripts, render_manuscript
+from .matrix import COLUMN_STEP, GLOW_RADIUS
+from .metrics import record_tier
+
+
+class QualityTier:
+    """
+    One set of render quality choices
+
+    Attributes:
+        name (str): Tier name, reported with responses and in the metrics
+        column_step (int): Pixels between matrix columns, larger is sparser
+        glow_radius (float): Glow blur baked into the matrix glyphs, 0 disables it
+        encoder (str, optional): Encoder preset, None keeps the caller's
+    """
+
+    def __init__(self, name, column_step=COLUMN_STEP, glow_radius=GLOW_RADIUS, encoder=None):
+        self.name = name
+        self.column_step = column_step
+        self.glow_radius = glow_radius
+        self.encoder = encoder
+
+    @property
+    def matrix_style(self):
+        """Background (column step, glow radius) of the tier"""
+        return (self.column_step, self.glow_radius)
+
+    def __repr__(self):
+        return (f"QualityTier({self.name!r}, column_step={self.column_step}, "
+                f"glow_radius={self.glow_radius}, encoder={self.encoder!r})")
+
+
+# Best first: full detail, then half the columns with the lossy palette encoder,
+# then a sparse field without glow
+DEFAULT_TIERS = (
+    QualityTier('full'),
+    QualityTier('reduced', column_step=2 * COLUMN_STEP, encoder='palette-fast'),
+    QualityTier('plain', column_step=4 * COLUMN_STEP, glow_radius=0, encoder='palette-fast'),
+)
+
+# Requests in flight and p95 seconds that move to the second and third tier
+DEFAULT_DEPTH_LEVELS = (4, 8)
+DEFAULT_LATENCY_LEVELS = (2.0, 5.0)
+
+# Latency window and the quiet time before quality steps back up
+DEFAULT_WINDOW = 50
+DEFAULT_WINDOW_SECONDS = 60.0
+DEFAULT_RECOVERY_SECONDS = 10.0
+MIN_LATENCY_SAMPLES = 5
+
+
+class QualityController:
+    """
+    Picks the quality tier of every render from the current load
+
+    Load is the number of requests in flight through the controller (those
+    waiting for admission included, plus `extra_depth()` when given) and
+    the p95 render time of the recent cache misses. Each threshold of
+    `depth_levels` or `latency_levels` that is reached degrades one tier.
+    Quality drops at once and steps back up one tier at a time, after
+    `recovery_seconds` without a further drop, so the tier does not flap.
+
+    Example:
+        quality = QualityController()
+        html_content, image_bytes = quality.create_hacker_manuscript(text, groups, "L0PHT")
+    """
+
+    def __init__(self, tiers=DEFAULT_TIERS, depth_levels=DEFAULT_DEPTH_LEVELS,
+                 latency_levels=DEFAULT_LATENCY_LEVELS, window=DEFAULT_WINDOW,
+                 window_seconds=DEFAULT_WINDOW_SECONDS, recovery_seconds=DEFAULT_RECOVERY_SECONDS,
+                 extra_depth=None, clock=time.monotonic):
+        """
+        Args:
+            tiers (tuple): QualityTier instances, best first
+            depth_levels (tuple): Requests in flight that degrade one more tier each
+            latency_levels (tuple): p95 seconds that degrade one more tier each
+            window (int): Recent requests the p95 is computed over
+            window_seconds (float): Oldest latency sample still considered
+            recovery_seconds (float): Quiet time before quality steps back up
+            extra_depth (callable, optional): Returns requests queued outside
+                the controller, e.g. a batcher's pending count
+            clock (callable): Monotonic time source
+        """
+        if not tiers:
+            raise ValueError("At least one quality tier is required")
+        self.tiers = tuple(tiers)
+        self.depth_levels = tuple(depth_levels)
+        self.latency_levels = tuple(latency_levels)
+        self.window_seconds = window_seconds
+        self.recovery_seconds = recovery_seconds
+        self.extra_depth = extra_depth
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._samples = collections.deque(maxlen=max(1, window))
+        self._level = 0
+        self._changed_at = clock()
+        self.active = 0
+        self.served = collections.Counter()
+        self.changes = 0
+
+    @property
+    def tier(self):
+        """The tier new requests currently get"""
+        return self.tiers[self._level]
+
+    def p95(self):
+        """
+        Return the p95 render time of the recent requests
+
+        Returns:
+            float: Seconds, None with fewer than MIN_LATENCY_SAMPLES samples
+        """
+        with self._lock:
+            return self._p95(self.clock())
+
+    def level_for(self, depth, p95=None):
+        """
+        Return the tier index a load calls for, ignoring hysteresis
+
+        Args:
+            depth (int): Requests in flight
+            p95 (float, optional): Recent p95 latency in seconds
+
+        Returns:
+            int: Index into tiers
+        """
+        level = sum(depth >= threshold for threshold in self.depth_levels)
+        if p95 is not None:
+            level = max(level, sum(p95 >= threshold for threshold in self.latency_levels))
+        return min(level, len(self.tiers) - 1)
+
+    @contextlib.contextmanager
+    def track(self, requests=1):
+        """
+        Count requests in flight and pick their tier, e.g. `with quality.track() as tier: ...`
+
+        Latency is not sampled here, renders report their time to observe().
+
+        Args:
+            requests (int): Requests served together, e.g. the items of a batch
+
+        Yields:
+            QualityTier: Tier to render with
+        """
+        extra = self.extra_depth() if self.extra_depth is not None else 0
+        with self._lock:
+            self.active += requests
+            tier = self._select(self.active + extra)
+            self.served[tier.name] += requests
+        record_tier(tier.name)
+        try:
+            yield tier
+        finally:
+            with self._lock:
+                self.active -= requests
+
+    def observe(self, seconds):
+        """
+        Add the time of one render to the latency window
+
+        Cache hits, admission waits and the time a consumer spends on a
+        progressive preview are not render time and are never observed.
+
+        Args:
+            seconds (float): Time spent rendering
+        """
+        with self._lock:
+            self._samples.append((self.clock(), seconds))
+
+    def _timed(self, renderer):
+        """Wrap a renderer (render_manuscript() if None) so that its successful calls are observed"""
+        if renderer is None:
+            renderer = render_manuscript
+
+        def timed(*args, **kwargs):
+            start = self.clock()
+            result = renderer(*args, **kwargs)
+            self.observe(self.clock() - start)
+            return result
+        return timed
+
+    def _cached_full(self, markdown_text, hacker_groups, group_theme, seed, encoder):
+        """
+        Look a request up under its full-quality cache key while quality is degraded
+
+        Returns:
+            tuple: Annotated (html_content, image_bytes) on a hit, None on a miss or at full quality
+        """
+        full = self.tiers[0]
+        if self.tier is full:
+            return None
+        # The tier's own lookup follows a miss, count only that one
+        cached = ManuscriptRequest(markdown_text, hacker_groups, group_theme, seed, encoder=full.encoder or encoder,
+                                   matrix_style=full.matrix_style).prepare(count_miss=False)
+        if cached is None:
+            return None
+        with self._lock:
+            self.served[full.name] += 1
+        record_tier(full.name)
+        return self.annotate(cached[0], full), cached[1]
+
+    def annotate(self, html_content, tier):
+        """
+        Report the tier in the response HTML
+
+        Full quality adds an HTML comment, lower tiers also a visible note.
+
+        Returns:
+            str: HTML with the tier noted
+        """
+        if tier is self.tiers[0]:
+            return f"{html_content}\n<!-- quality tier: {tier.name} -->"
+        return (f"{html_content}\n<!-- quality tier: {tier.name} -->\n"
+                f"<p><em>H0L0 1M4G3 rendered at {tier.name} quality while the museum is busy</em></p>")
+
+    def create_hacker_manuscript(self, markdown_text, hacker_groups=None, group_theme=None, seed=None,
+                                 use_cache=True, encoder=None, renderer=None, admission=None):
+        """
+        manuscript.create_hacker_manuscript() at the tier the load calls for
+
+        Returns:
+            tuple: (html_content, image_bytes), the tier noted in the HTML
+        """
+        if use_cache:
+            cached = self._cached_full(markdown_text, hacker_groups, group_theme, seed, encoder)
+            if cached is not None:
+                return cached
+        with self.track() as tier:
+            html_content, image_bytes = create_hacker_manuscript(
+                markdown_text, hacker_groups, group_theme, seed, use_cache=use_cache,
+                encoder=tier.encoder or encoder, renderer=self._timed(renderer), admission=admission,
+                matrix_style=tier.matrix_style)
+        return self.annotate(html_content, tier), image_bytes
+
+    def create_hacker_manuscripts(self, markdown_texts, hacker_groups=None, group_themes=None, seed=None,
+                                  use_cache=True, encoder=None, renderer=None, admission=None, executor=None):
+        """
+        manuscript.create_hacker_manuscripts() with one tier for the whole batch
+
+        Items found under their full-quality cache key are served from it,
+        every other item counts as a request in flight while the batch renders.
+
+        Returns:
+            list: (html_content, image_bytes) per input, the tier noted in the HTML
+        """
+        markdown_texts = list(markdown_texts)
+        if group_themes is None:
+            group_themes = [None] * len(markdown_texts)
+        group_themes = list(group_themes)
+        results = [None] * len(markdown_texts)
+        if use_cache:
+            results = [self._cached_full(markdown_text, hacker_groups, group_theme, seed, encoder)
+                       for markdown_text, group_theme in zip(markdown_texts, group_themes)]
+        misses = [index for index, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        with self.track(len(misses)) as tier:
+            rendered = create_hacker_manuscripts(
+                [markdown_texts[index] for index in misses], hacker_groups,
+                [group_themes[index] for index in misses], seed, use_cache=use_cache,
+                encoder=tier.encoder or encoder, renderer=self._timed(renderer), admission=admission,
+                matrix_style=tier.matrix_style, executor=executor)
+        for index, (html_content, image_bytes) in zip(misses, rendered):
+            results[index] = (self.annotate(html_content, tier), image_bytes)
+        return results
+
+    async def create_hacker_manuscript_progressive(self, markdown_text, hacker_groups=None, group_theme=None,
+                                                   seed=None, use_cache=True, encoder=None, executor=None,
+                                                   admission=None):
+        """
+        async_manuscript.create_hacker_manuscript_progressive() at the tier the load calls for
+
+        Yields:
+            tuple: (html_content, image_bytes), the tier noted in the HTML
+        """
+        if use_cache:
+            cached = self._cached_full(markdown_text, hacker_groups, group_theme, seed, encoder)
+            if cached is not None:
+                yield cached
+                return
+        with self.track() as tier:
+            async for html_content, image_bytes in create_hacker_manuscript_progressive(
+                    markdown_text, hacker_groups, group_theme, seed, use_cache=use_cache,
+                    encoder=tier.encoder or encoder, executor=executor, admission=admission,
+                    matrix_style=tier.matrix_style, observe_render=self.observe):
+                yield self.annotate(html_content, tier), image_bytes
+
+    def stats(self):
+        """
+        Return controller state
+
+        Returns:
+            dict: tier, active, p95 (seconds or None), changes and requests served per tier
+        """
+        with self._lock:
+            return {
+                'tier': self.tiers[self._level].name,
+                'active': self.active,
+                'p95': self._p95(self.clock()),
+                'changes': self.changes,
+                'served': dict(self.served),
+            }
+
+    def _p95(self, now):
+        """p95 of the samples inside the window, caller holds the lock"""
+        recent = sorted(seconds for at, seconds in self._samples if now - at <= self.window_seconds)
+        if len(recent) < MIN_LATENCY_SAMPLES:
+            return None
+        return recent[min(len(recent) - 1, int(0.95 * len(recent)))]
+
+    def _select(self, depth):
+        """Move towards the tier the load calls for, caller holds the lock"""
+        now = self.clock()
+        target = self.level_for(depth, self._p95(now))
+        if target > self._level:
+            self._level = target
+            self._changed_at = now
+            self.changes += 1
+        elif target < self._level and now - self._changed_at >= self.recovery_seconds:
+            self._level -= 1
+            self._changed_at = now
+            self.changes += 1
+        return self.tiers[self._level]
@@ -0,0 +1,215 @@
+"""
+H4X0R-OMEGA-H1ST0RY Render Cache
+Content-addressed LRU cache for finished manuscript renders
+"""
+
+import collections
+import hashlib
+import json
+import threading
+import time
+
+# Default cache configuration
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 3600.0
+
+
+def make_render_key(markdown_text, group_theme=None, group=None, options=None):
+    """
+    Build the content address of a render request
+
+    Args:
+        markdown_text (str): Markdown text to convert
+        group_theme (str, optional): Hacker group theme
+        group (dict, optional): Data of the themed group, it ends up in the banner
+        options (dict, optional): Render options that change the output
+
+    Returns:
+        str: Hex digest identifying the render
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(markdown_text.encode('utf-8'))
+    digest.update(b'\0')
+    context = {
+        'group_theme': group_theme,
+        'group': group,
+        'options': options or {},
+    }
+    digest.update(json.dumps(context, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Byte-bounded LRU cache with a time-to-live
+
+    Values are (html, image_bytes) tuples. The least recently used entries
+    are evicted once the stored bytes exceed `max_bytes`, and entries older
+    than `ttl` seconds are dropped on lookup.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, enabled=True, clock=time.monotonic):
+        """
+        Args:
+            max_bytes (int): Upper bound on the cached HTML and image bytes
+            ttl (float, optional): Seconds an entry stays valid, None for no expiry
+            enabled (bool): When False lookups always miss and nothing is stored
+            clock (callable): Monotonic time source
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._clock = clock
+
+        self._entries = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def entry_size(value):
+        """Return the number of bytes a cached (html, image_bytes) value holds"""
+        html_content, image_bytes = value
+        return len(html_content.encode('utf-8')) + len(image_bytes)
+
+    def get(self, key, count_miss=True):
+        """
+        Look up a render
+
+        Args:
+            key (str): Key from make_render_key()
+            count_miss (bool): False leaves a miss out of the counters, for
+                lookups that another lookup follows
+
+        Returns:
+            tuple: Cached (html, image_bytes), or None on a miss
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if count_miss:
+                    self.misses += 1
+                return None
+            value, size, stored_at = entry
+            if self.ttl is not None and self._clock() - stored_at > self.ttl:
+                del self._entries[key]
+                self._bytes -= size
+                self.expirations += 1
+                if count_miss:
+                    self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Store a render, evicting least recently used entries over the byte bound
+
+        Args:
+            key (str): Key from make_render_key()
+            value (tuple): (html, image_bytes) to cache
+        """
+        if not self.enabled:
+            return
+        size = self.entry_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size, self._clock())
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every cached render"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        Return cache counters
+
+        Returns:
+            dict: hits, misses, evictions, expirations, entries and bytes
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+
+_default_cache = RenderCache()
+
+
+def get_render_cache():
+    """
+    Return the process-wide render cache
+
+    Returns:
+        RenderCache: Shared cache
+    """
+    return _default_cache
+
+
+def configure_render_cache(**options):
+    """
+    Replace the process-wide render cache with a newly configured one
+
+    Args:
+        **options: Keyword arguments for RenderCache
+
+    Returns:
+        RenderCache: The new shared cache
+    """
+    global _default_cache
+    _default_cache = RenderCache(**options)
+    return _default_cache
+
+
+def install_render_cache(cache):
+    """
+    Make an already built cache the process-wide render cache
+
+    Args:
+        cache: RenderCache or an object with the same interface, e.g. a SharedRenderCache
+
+    Returns:
+        The new shared cache
+    """
+    global _default_cache
+    _default_cache = cache
+    return _default_cache
+
+
+def clear_render_cache():
+    """Drop every render in the process-wide cache"""
+    _default_cache.clear()
+
+
+def get_render_cache_stats():
+    """
+    Return the counters of the process-wide render cache
+
+    Returns:
+        dict: hits, misses, evictions, expirations, entries and bytes
+    """
+    return _default_cache.stats()
@@ -0,0 +1,378 @@
+"""
+H4X0R-OMEGA-H1ST0RY Render Process Pool
+Runs manuscript renders in pre-warmed worker processes, outside the GIL
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+from .background_pool import DEFAULT_WARM_HEIGHTS, configure_background_pool, get_background_pool
+from .encoders import get_encoder
+from .leet import get_dictionary, list_dictionaries, register_dictionary
+from .manuscript import RenderRejected, create_hacker_manuscript, render_manuscript
+
+# Default pool configuration
+DEFAULT_MAX_PENDING = 16
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_START_TIMEOUT = 120.0
+DEFAULT_START_METHOD = 'spawn'
+
+# Back-off before a worker that failed its warm-up is started again,
+# doubled on every further failure in a row
+DEFAULT_RESPAWN_DELAY = 0.5
+MAX_RESPAWN_DELAY = 30.0
+
+# How often a waiting request re-checks whether the pool was stopped
+_WAIT_INTERVAL = 0.5
+
+
+class RenderPoolError(RuntimeError):
+    """Base class of render pool failures"""
+
+
+class RenderQueueFull(RenderPoolError, RenderRejected):
+    """Every worker is busy and the submission queue is full"""
+
+
+class RenderTimeout(RenderPoolError, RenderRejected):
+    """A render ran past its deadline and its worker was killed"""
+
+
+class RenderWorkerError(RenderPoolError):
+    """A worker died or raised while rendering"""
+
+
+def _worker_main(connection, dictionaries, background_options, warm_heights):
+    """
+    Worker process entry point
+
+    Registers the parent's l33t dictionaries, configures the background pool
+    like the parent's, warms fonts, glyph atlas, background pool and markdown
+    parser, reports ready and then serves render jobs until it receives None
+    or the pipe closes.
+    """
+    for name, replacements in dictionaries.items():
+        register_dictionary(name, replacements)
+
+    pool = configure_background_pool(**background_options)
+    for height in warm_heights:
+        pool.get(pool.width, height)
+    render_manuscript("# w4rm up", seed=0)
+
+    connection.send(('ready', os.getpid()))
+    while True:
+        try:
+            job = connection.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        markdown_text, hacker_groups, group_theme, seed, encoder, matrix_style = job
+        try:
+            connection.send(('ok', render_manuscript(markdown_text, hacker_groups, group_theme, seed, encoder,
+                                                     matrix_style=matrix_style)))
+        except Exception as e:
+            connection.send(('error', f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    """Parent-side handle of one worker process"""
+
+    def __init__(self, process, connection):
+        self.process = process
+        self.connection = connection
+        self.pid = None
+
+    def kill(self):
+        """Terminate the process and release the pipe"""
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(5)
+        self.connection.close()
+
+
+class RenderProcessPool:
+    """
+    Pool of worker processes that render manuscripts
+
+    Drawing is Python-bound, so threads serialize on the GIL; each worker
+    here is a separate interpreter. At most `workers` renders run at once
+    and at most `max_pending` more wait for a free worker, further requests
+    are rejected with RenderQueueFull. A render that exceeds its timeout
+    gets its worker killed and replaced, the caller sees RenderTimeout.
+    The timeout covers the wait for a free worker too, and a worker that
+    fails to warm up is started again after a growing back-off.
+
+    Workers are started with the "spawn" method by default, forking a
+    process that already runs Gradio's threads is unsafe. Every worker
+    loads fonts, the glyph atlas and the warm background buckets before it
+    accepts its first request.
+
+    Example:
+        pool = RenderProcessPool(workers=4).start()
+        html_content, image_bytes = pool.create_hacker_manuscript(text, groups, "L0PHT")
+    """
+
+    def __init__(self, workers=None, max_pending=DEFAULT_MAX_PENDING, timeout=DEFAULT_TIMEOUT,
+                 start_method=DEFAULT_START_METHOD, warm_heights=DEFAULT_WARM_HEIGHTS,
+                 start_timeout=DEFAULT_START_TIMEOUT, respawn_delay=DEFAULT_RESPAWN_DELAY):
+        """
+        Args:
+            workers (int, optional): Worker processes, the CPU count if None
+            max_pending (int): Requests allowed to wait for a free worker
+            timeout (float, optional): Default seconds per render, None for no limit
+            start_method (str): multiprocessing start method
+            warm_heights (iterable): Background heights each worker pre-renders
+            start_timeout (float): Seconds a worker may take to warm up
+            respawn_delay (float): First back-off before a worker that failed
+                its warm-up is started again
+        """
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.max_pending = max(0, max_pending)
+        self.timeout = timeout
+        self.warm_heights = tuple(warm_heights)
+        self.start_timeout = start_timeout
+        self.respawn_delay = respawn_delay
+
+        self._context = multiprocessing.get_context(start_method)
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._handles = set()
+        self._running = False
+        self._stopped = threading.Event()
+        self._warmup_failures = 0
+
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.restarts = 0
+
+    @property
+    def concurrency(self):
+        """Requests the pool accepts at once, running plus waiting"""
+        return self.workers + self.max_pending
+
+    def start(self, wait=True):
+        """
+        Spawn the workers
+
+        Args:
+            wait (bool): Block until every worker finished warming up
+
+        Returns:
+            RenderProcessPool: self
+        """
+        with self._lock:
+            if self._running:
+                return self
+            self._running = True
+            self._warmup_failures = 0
+        self._stopped.clear()
+        for _ in range(self.workers):
+            self._spawn()
+        if wait:
+            deadline = time.monotonic() + self.start_timeout
+            while self._idle.qsize() < self.workers and time.monotonic() < deadline:
+                time.sleep(0.05)
+        return self
+
+    def stop(self):
+        """Stop every worker, renders in flight are abandoned"""
+        with self._lock:
+            self._running = False
+            handles = list(self._handles)
+            self._handles.clear()
+        self._stopped.set()
+        for handle in handles:
+            try:
+                handle.connection.send(None)
+            except (OSError, ValueError):
+                pass
+            handle.process.join(1)
+            handle.kill()
+        while True:
+            try:
+                self._idle.get_nowait()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        """
+        Return pool counters
+
+        Returns:
+            dict: workers, idle, completed, rejected, timeouts, failures and restarts
+        """
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'idle': self._idle.qsize(),
+                'max_pending': self.max_pending,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timeouts': self.timeouts,
+                'failures': self.failures,
+                'restarts': self.restarts,
+            }
+
+    def render(self, markdown_text, hacker_groups=None, group_theme=None, seed=None, encoder=None,
+               timeout=None, matrix_style=None):
+        """
+        Render a manuscript in a worker process
+
+        Same arguments and result as manuscript.render_manuscript(), so the
+        pool can be passed as `renderer` to create_hacker_manuscript().
+
+        Args:
+            timeout (float, optional): Seconds for this render, the pool default if None
+            matrix_style (tuple, optional): Background (column step, glow radius)
+
+        Returns:
+            tuple: (html_content, image_bytes)
+
+        Raises:
+            RenderQueueFull: Too many requests are already waiting
+            RenderTimeout: The render took longer than the timeout
+            RenderWorkerError: The worker failed or the pool is stopped
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RenderQueueFull(f"Render queue is full ({self.concurrency} requests in flight)")
+        try:
+            # Custom encoder presets only exist in this process
+            job = (markdown_text, hacker_groups, group_theme, seed, get_encoder(encoder), matrix_style)
+            return self._run(job, self.timeout if timeout is None else timeout)
+        finally:
+            self._slots.release()
+
+    def create_hacker_manuscript(self, markdown_text, hacker_groups=None, group_theme=None, seed=None,
+                                 use_cache=True, encoder=None, admission=None):
+        """
+        Drop-in replacement for manuscript.create_hacker_manuscript() that
+        renders in the pool, with the render cache checked in this process
+
+        Returns:
+            tuple: (html_content, image_bytes) - styled HTML and encoded image
+        """
+        return create_hacker_manuscript(markdown_text, hacker_groups, group_theme, seed,
+                                        use_cache=use_cache, encoder=encoder, renderer=self.render,
+                                        admission=admission)
+
+    def _run(self, job, timeout):
+        """Send a job to the next idle worker and wait for its answer"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        handle = self._acquire_worker(deadline)
+        try:
+            handle.connection.send(job)
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not handle.connection.poll(remaining):
+                with self._lock:
+                    self.timeouts += 1
+                self._replace(handle)
+                handle = None
+                raise RenderTimeout(f"Render exceeded {timeout:g}s and was stopped")
+            status, payload = handle.connection.recv()
+        except (EOFError, OSError) as e:
+            with self._lock:
+                self.failures += 1
+            if handle is not None:
+                self._replace(handle)
+            handle = None
+            raise RenderWorkerError(f"Render worker died: {e}") from e
+        else:
+            if status != 'ok':
+                with self._lock:
+                    self.failures += 1
+                raise RenderWorkerError(payload)
+            with self._lock:
+                self.completed += 1
+            return payload
+        finally:
+            if handle is not None:
+                self._idle.put(handle)
+
+    def _acquire_worker(self, deadline=None):
+        """Wait for an idle worker until the request's deadline"""
+        while True:
+            if not self._running:
+                raise RenderWorkerError("Render pool is not running")
+            with self._lock:
+                failing = self._warmup_failures >= self.workers
+            if failing and self._idle.empty():
+                raise RenderWorkerError(f"Render workers fail to start ({self._warmup_failures} warm-ups "
+                                        f"failed in a row)")
+            wait = _WAIT_INTERVAL
+            if deadline is not None:
+                wait = min(wait, deadline - time.monotonic())
+                if wait <= 0:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise RenderTimeout("No render worker became free before the render deadline")
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                continue
+
+    def _snapshot_dictionaries(self):
+        """Return the l33t dictionaries workers must register"""
+        return {name: get_dictionary(name).replacements for name in list_dictionaries()
+                if name != 'default'}
+
+    def _spawn(self):
+        """Start one worker and hand it to the idle queue once it is warm"""
+        parent_end, child_end = self._context.Pipe()
+        # Render cache keys carry the parent's background options, workers must match them
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_end, self._snapshot_dictionaries(), get_background_pool().options(), self.warm_heights),
+            name="manuscript-render-worker",
+            daemon=True,
+        )
+        process.start()
+        child_end.close()
+        handle = _Worker(process, parent_end)
+        with self._lock:
+            self._handles.add(handle)
+        threading.Thread(target=self._await_ready, args=(handle,), daemon=True).start()
+
+    def _await_ready(self, handle):
+        """Move a worker into the idle queue after its warm-up, start another one if it fails"""
+        try:
+            if handle.connection.poll(self.start_timeout):
+                status, handle.pid = handle.connection.recv()
+                if status == 'ready' and self._running:
+                    with self._lock:
+                        self._warmup_failures = 0
+                    self._idle.put(handle)
+                    return
+        except (EOFError, OSError):
+            pass
+        with self._lock:
+            self._handles.discard(handle)
+            self.failures += 1
+            self._warmup_failures += 1
+            failures = self._warmup_failures
+        handle.kill()
+        # Back off, a worker that cannot warm up would otherwise spin
+        delay = min(MAX_RESPAWN_DELAY, self.respawn_delay * 2 ** (failures - 1))
+        if self._stopped.wait(delay) or not self._running:
+            return
+        with self._lock:
+            self.restarts += 1
+        self._spawn()
+
+    def _replace(self, handle):
+        """Kill a worker and start a fresh one in its place"""
+        with self._lock:
+            self._handles.discard(handle)
+            self.restarts += 1
+            running = self._running
+        handle.kill()
+        if running:
+            self._spawn()
@@ -0,0 +1,272 @@
+"""
+H4X0R-OMEGA-H1ST0RY Multi-Worker Serving
+Runs several app processes behind one local port with a client-sticky TCP front
+"""
+
+import asyncio
+import contextlib
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import time
+import zlib
+
+from .shared_cache import default_shared_cache_dir
+
+logger = logging.getLogger(__name__)
+
+# Seconds between worker health checks, and the longest restart back-off
+CHECK_INTERVAL = 1.0
+MAX_RESTART_DELAY = 30.0
+COPY_CHUNK = 64 * 1024
+
+
+def free_port(host='127.0.0.1'):
+    """
+    Return a TCP port that is currently free on a host
+
+    Returns:
+        int: Port number
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+
+async def _pipe(reader, writer):
+    """Copy one direction of a proxied connection until EOF"""
+    try:
+        while True:
+            data = await reader.read(COPY_CHUNK)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        with contextlib.suppress(Exception):
+            writer.close()
+
+
+class StickyProxy:
+    """
+    TCP front that sends every client address to the same backend
+
+    Gradio keeps queue and session state in the process that served the
+    page, so all the connections of one browser have to reach the same
+    worker. The proxy hashes the client address to pick a backend and
+    falls over to the next one while that backend is down. It copies raw
+    bytes, so HTTP, server-sent events and websockets all pass through.
+    Clients behind one address (a NAT or another proxy) share a worker.
+    """
+
+    def __init__(self, backends, host='127.0.0.1', port=7860):
+        """
+        Args:
+            backends (list): (host, port) of every worker
+            host (str): Address to listen on
+            port (int): Port to listen on, 0 picks a free one
+        """
+        if not backends:
+            raise ValueError("At least one backend is required")
+        self.backends = list(backends)
+        self.host = host
+        self.port = port
+        self.connections = 0
+        self.failovers = 0
+        self.refused = 0
+        self._server = None
+
+    def backend_order(self, client_host):
+        """
+        Return the backends in the order a client tries them
+
+        Args:
+            client_host (str): Client address
+
+        Returns:
+            list: (host, port) pairs, the client's own backend first
+        """
+        start = zlib.crc32(client_host.encode('utf-8')) % len(self.backends)
+        return self.backends[start:] + self.backends[:start]
+
+    async def start(self):
+        """
+        Start listening
+
+        Returns:
+            StickyProxy: self, with `port` set to the bound port
+        """
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        """Stop listening, open connections finish on their own"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, client_reader, client_writer):
+        peer = client_writer.get_extra_info('peername')
+        client_host = peer[0] if peer else ''
+        self.connections += 1
+        for attempt, (host, port) in enumerate(self.backend_order(client_host)):
+            try:
+                backend_reader, backend_writer = await asyncio.open_connection(host, port)
+            except OSError:
+                continue
+            if attempt:
+                self.failovers += 1
+            await asyncio.gather(_pipe(client_reader, backend_writer), _pipe(backend_reader, client_writer))
+            return
+        self.refused += 1
+        client_writer.close()
+
+
+class WorkerSupervisor:
+    """
+    Starts, watches and restarts the app processes behind a StickyProxy
+
+    Every worker runs `command` with its own private port in
+    GRADIO_SERVER_PORT and H4X0R_PORT, H4X0R_WORKERS=1 and the shared render
+    cache directory in H4X0R_SHARED_CACHE, so the workers reuse each
+    other's finished renders. A worker that exits is restarted with an
+    exponential back-off.
+
+    Example:
+        WorkerSupervisor([sys.executable, "src/main.py"], workers=4).run()
+    """
+
+    def __init__(self, command, workers, host='127.0.0.1', port=7860, cache_dir=None, env=None):
+        """
+        Args:
+            command (list): Command line of one worker
+            workers (int): Number of worker processes
+            host (str): Address the proxy listens on
+            port (int): Port the proxy listens on
+            cache_dir (str, optional): Shared render cache directory, a fresh
+                one (removed on exit) if None
+            env (dict, optional): Base environment of the workers, os.environ if None
+        """
+        if workers < 1:
+            raise ValueError("At least one worker is required")
+        self.command = list(command)
+        self.workers = workers
+        self.host = host
+        self.port = port
+        self.env = dict(os.environ if env is None else env)
+        self._owns_cache_dir = cache_dir is None
+        self.cache_dir = default_shared_cache_dir() if cache_dir is None else cache_dir
+        self.ports = [free_port() for _ in range(workers)]
+        self.processes = [None] * workers
+        self.restarts = 0
+        self._delays = [1.0] * workers
+        self._started = [0.0] * workers
+
+    def worker_env(self, index):
+        """
+        Return the environment of one worker
+
+        Args:
+            index (int): Worker index
+
+        Returns:
+            dict: Environment variables
+        """
+        env = dict(self.env)
+        env.update({
+            'H4X0R_WORKERS': '1',
+            'H4X0R_WORKER_INDEX': str(index),
+            'H4X0R_HOST': '127.0.0.1',
+            'H4X0R_PORT': str(self.ports[index]),
+            'GRADIO_SERVER_NAME': '127.0.0.1',
+            'GRADIO_SERVER_PORT': str(self.ports[index]),
+            'H4X0R_SHARED_CACHE': self.cache_dir,
+        })
+        return env
+
+    def run(self):
+        """Serve until interrupted, then stop the workers"""
+        try:
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def stop(self):
+        """Terminate the workers and remove a cache directory this supervisor created"""
+        for process in self.processes:
+            if process is not None and process.poll() is None:
+                process.terminate()
+        for process in self.processes:
+            if process is not None:
+                try:
+                    process.wait(10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+        if self._owns_cache_dir:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def _spawn(self, index):
+        self._started[index] = time.monotonic()
+        self.processes[index] = subprocess.Popen(self.command, env=self.worker_env(index))
+        logger.info("Started worker %d (pid %d) on port %d", index, self.processes[index].pid, self.ports[index])
+
+    async def _serve(self):
+        loop = asyncio.get_running_loop()
+        stopped = asyncio.Event()
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signal.SIGTERM, stopped.set)
+
+        for index in range(self.workers):
+            self._spawn(index)
+        proxy = await StickyProxy([('127.0.0.1', port) for port in self.ports], self.host, self.port).start()
+        logger.info("Serving %d workers on http://%s:%d", self.workers, self.host, proxy.port)
+
+        restart_at = [None] * self.workers
+        try:
+            while not stopped.is_set():
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(stopped.wait(), CHECK_INTERVAL)
+                now = loop.time()
+                for index, process in enumerate(self.processes):
+                    if process.poll() is None:
+                        continue
+                    if restart_at[index] is None:
+                        if time.monotonic() - self._started[index] > MAX_RESTART_DELAY:
+                            # It ran fine for a while, do not hold earlier crashes against it
+                            self._delays[index] = 1.0
+                        logger.warning("Worker %d exited with %s, restarting in %.0fs",
+                                       index, process.returncode, self._delays[index])
+                        restart_at[index] = now + self._delays[index]
+                        self._delays[index] = min(MAX_RESTART_DELAY, self._delays[index] * 2)
+                    elif now >= restart_at[index]:
+                        restart_at[index] = None
+                        self.restarts += 1
+                        self._spawn(index)
+        finally:
+            await proxy.close()
+
+
+def serve_workers(workers, host='127.0.0.1', port=7860, cache_dir=None, command=None):
+    """
+    Run `workers` copies of the current program behind one port
+
+    Args:
+        workers (int): Number of worker processes
+        host (str): Address to listen on
+        port (int): Port to listen on
+        cache_dir (str, optional): Shared render cache directory
+        command (list, optional): Worker command line, the current one if None
+    """
+    if command is None:
+        command = [sys.executable] + sys.orig_argv[1:]
+    WorkerSupervisor(command, workers, host, port, cache_dir).run()
@@ -0,0 +1,320 @@
+"""
+H4X0R-OMEGA-H1ST0RY Shared Render Cache
+Memory-mapped, content-addressed render store shared by the worker processes of one host
+"""
+
+import contextlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not POSIX
+    fcntl = None
+
+from .render_cache import DEFAULT_MAX_BYTES, DEFAULT_TTL, RenderCache
+
+# Entry file: magic, stored-at wall time, HTML length, image length, then
+# the UTF-8 HTML and the image bytes
+_HEADER = struct.Struct('<4sdII')
+# The lock file holds the running size of the stored HTML and image bytes
+_TOTAL = struct.Struct('<q')
+_MAGIC = b'H4XR'
+_SUFFIX = '.render'
+_LOCK_NAME = '.lock'
+_TMP_PREFIX = '.tmp-'
+
+# Temporary files of a worker that died while writing are removed after this long
+STALE_TMP_SECONDS = 60.0
+
+
+def default_shared_cache_dir():
+    """
+    Return a fresh directory for a shared cache, in /dev/shm when the host has it
+
+    Returns:
+        str: Path of the new directory
+    """
+    parent = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+    return tempfile.mkdtemp(prefix='h4x0r-renders-', dir=parent)
+
+
+class SharedRenderCache:
+    """
+    Byte-bounded LRU render cache that several processes share through a directory
+
+    Every render is one file named by its key from make_render_key(), so
+    workers that render the same manuscript store it once. Files are
+    written under a temporary name and renamed into place, readers never
+    see a partial entry. Lookups memory-map the file and return the image
+    as a read-only memoryview over the mapping, so every worker reads the
+    same page-cache pages without copying them; `bytes(image)` copies.
+
+    Renames into place, expirations and evictions happen under an
+    exclusive flock, which also guards a running size of the store kept in
+    the lock file. The directory is only scanned when that size goes over
+    `max_bytes`: eviction then removes the least recently used files (by
+    modification time, refreshed on every hit) until the store fits, and
+    resets the running size to the scanned one. An evicted file is only
+    unlinked, so a render already mapped by another process stays readable
+    until that process drops it.
+
+    Same interface as RenderCache, install it with install_render_cache().
+    The hit and miss counters are per process.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, enabled=True, clock=time.time):
+        """
+        Args:
+            path (str): Directory of the store, created if missing. Use a
+                tmpfs such as /dev/shm to keep it in memory
+            max_bytes (int): Upper bound on the stored HTML and image bytes
+            ttl (float, optional): Seconds an entry stays valid, None for no expiry
+            enabled (bool): When False lookups always miss and nothing is stored
+            clock (callable): Wall-clock time source, shared by all processes
+        """
+        if fcntl is None:
+            raise RuntimeError("SharedRenderCache needs a POSIX system")
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = enabled
+        self._clock = clock
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_path = os.path.join(self.path, _LOCK_NAME)
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    entry_size = staticmethod(RenderCache.entry_size)
+
+    def get(self, key, count_miss=True):
+        """
+        Look up a render
+
+        Args:
+            key (str): Key from make_render_key()
+            count_miss (bool): False leaves a miss out of the counters, for
+                lookups that another lookup follows
+
+        Returns:
+            tuple: Cached (html, image) with the image a memoryview over the
+                shared mapping, or None on a miss
+        """
+        if not self.enabled:
+            return None
+        value = self._read(key)
+        with self._lock:
+            if value is None:
+                if count_miss:
+                    self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """
+        Store a render, evicting least recently used entries over the byte bound
+
+        Args:
+            key (str): Key from make_render_key()
+            value (tuple): (html, image_bytes) to cache
+        """
+        if not self.enabled:
+            return
+        html_content, image_bytes = value
+        html_bytes = html_content.encode('utf-8')
+        size = len(html_bytes) + len(image_bytes)
+        if size > self.max_bytes:
+            return
+        path = self._entry_path(key)
+        if self._touch(path):
+            # Content-addressed: another worker already stored this render
+            return
+
+        fd, tmp_path = tempfile.mkstemp(prefix=_TMP_PREFIX, dir=self.path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(_HEADER.pack(_MAGIC, self._clock(), len(html_bytes), len(image_bytes)))
+                f.write(html_bytes)
+                f.write(image_bytes)
+            with self._exclusive() as lock:
+                if self._touch(path):
+                    # Stored by another worker while this one was writing
+                    os.unlink(tmp_path)
+                    return
+                total = self._total(lock)
+                os.replace(tmp_path, path)
+                total += size
+                if total > self.max_bytes:
+                    total = self._evict()
+                self._set_total(lock, total)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(tmp_path)
+            raise
+
+    def clear(self):
+        """Drop every stored render"""
+        with self._exclusive() as lock:
+            for entry in self._entries():
+                with contextlib.suppress(FileNotFoundError):
+                    os.unlink(entry.path)
+            self._set_total(lock, 0)
+
+    def stats(self):
+        """
+        Return cache counters
+
+        Returns:
+            dict: hits, misses, evictions and expirations of this process,
+                entries and bytes of the shared store
+        """
+        entries = 0
+        size = 0
+        for entry in self._entries():
+            with contextlib.suppress(FileNotFoundError):
+                size += entry.stat().st_size - _HEADER.size
+                entries += 1
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'entries': entries,
+                'bytes': size,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key + _SUFFIX)
+
+    def _read(self, key):
+        """Map one entry, None when it is missing, damaged or expired"""
+        path = self._entry_path(key)
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except FileNotFoundError:
+            return None
+        try:
+            stat = os.fstat(fd)
+            size = stat.st_size
+            if size < _HEADER.size:
+                return None
+            mapping = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+
+        magic, stored_at, html_length, image_length = _HEADER.unpack_from(mapping)
+        if magic != _MAGIC or _HEADER.size + html_length + image_length != size:
+            mapping.close()
+            return None
+        if self.ttl is not None and self._clock() - stored_at > self.ttl:
+            mapping.close()
+            self._expire(path, stat.st_ino)
+            return None
+        self._touch(path)
+
+        html_end = _HEADER.size + html_length
+        html_content = mapping[_HEADER.size:html_end].decode('utf-8')
+        # The memoryview keeps the mapping open for as long as the caller holds the image
+        image = memoryview(mapping)[html_end:html_end + image_length]
+        return html_content, image
+
+    def _touch(self, path):
+        """Mark an entry as recently used, False when it does not exist"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _entries(self):
+        with os.scandir(self.path) as it:
+            return [entry for entry in it if entry.name.endswith(_SUFFIX)]
+
+    def _expire(self, path, inode):
+        """Unlink an expired entry, unless another worker replaced it since it was read"""
+        with self._exclusive() as lock:
+            try:
+                fd = os.open(path, os.O_RDONLY)
+            except FileNotFoundError:
+                return
+            try:
+                stat = os.fstat(fd)
+                header = os.pread(fd, _HEADER.size, 0)
+            finally:
+                os.close(fd)
+            if stat.st_ino != inode or len(header) < _HEADER.size:
+                return
+            if self._clock() - _HEADER.unpack(header)[1] <= self.ttl:
+                return
+            os.unlink(path)
+            self._set_total(lock, self._total(lock) - (stat.st_size - _HEADER.size))
+        with self._lock:
+            self.expirations += 1
+
+    def _total(self, lock):
+        """Running size from the lock file, scanned if it has none yet; caller holds the flock"""
+        data = os.pread(lock, _TOTAL.size, 0)
+        if len(data) < _TOTAL.size:
+            return sum(size for _, size, _ in self._scan())
+        return _TOTAL.unpack(data)[0]
+
+    def _set_total(self, lock, total):
+        """Store the running size in the lock file, caller holds the flock"""
+        os.pwrite(lock, _TOTAL.pack(max(0, total)), 0)
+
+    def _scan(self):
+        """Return (mtime, size, path) of every entry and remove stale temporary files"""
+        now = time.time()
+        entries = []
+        with os.scandir(self.path) as it:
+            for entry in it:
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    if entry.name.endswith(_SUFFIX):
+                        entries.append((stat.st_mtime, stat.st_size - _HEADER.size, entry.path))
+                    elif entry.name.startswith(_TMP_PREFIX) and now - stat.st_mtime > STALE_TMP_SECONDS:
+                        os.unlink(entry.path)
+        return entries
+
+    def _evict(self):
+        """
+        Unlink least recently used entries until the store fits max_bytes, caller holds the flock
+
+        Returns:
+            int: Stored bytes after eviction, from the scan
+        """
+        entries = self._scan()
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        evicted = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(path)
+                evicted += 1
+            total -= size
+        with self._lock:
+            self.evictions += evicted
+        return total
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """Hold an exclusive flock on the store's lock file across processes, yields its descriptor"""
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)
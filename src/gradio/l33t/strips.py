@@ -0,0 +1,131 @@
+"""
+H4X0R-OMEGA-H1ST0RY Strip Encoder
+Streams a tall image into a PNG one horizontal band at a time
+"""
+
+import struct
+import zlib
+
+import numpy as np
+
+from .memory import note_canvas
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# PNG color types for the image modes the writer accepts
+_COLOR_TYPES = {'L': 0, 'RGB': 2, 'RGBA': 6}
+
+# Compressed bytes buffered before an IDAT chunk is emitted
+_IDAT_SIZE = 256 * 1024
+
+# PNG scanline filter used for every row
+_FILTER_UP = 2
+
+
+def _chunk(tag, data):
+    """Build one length-prefixed, CRC-terminated PNG chunk"""
+    crc = zlib.crc32(data, zlib.crc32(tag))
+    return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', crc & 0xffffffff)
+
+
+def up_filter(rows, previous_row):
+    """
+    Apply the PNG "Up" filter to a block of scanlines
+
+    Each byte is stored as the difference to the byte above it. The matrix
+    backgrounds are mostly black with sparse glyphs, where Up compresses as
+    well as Pillow's adaptive filtering at a fraction of the cost, and it
+    vectorizes over a whole band.
+
+    Args:
+        rows (numpy.ndarray): uint8 pixels of shape (rows, width * channels)
+        previous_row (numpy.ndarray): Last scanline of the previous band (zeros at the top)
+
+    Returns:
+        numpy.ndarray: uint8 filtered bytes with the filter-type byte prepended to every row
+    """
+    filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+    filtered[:, 0] = _FILTER_UP
+    np.subtract(rows[:1], previous_row[None, :], out=filtered[:1, 1:])
+    np.subtract(rows[1:], rows[:-1], out=filtered[1:, 1:])
+    return filtered
+
+
+class PNGStripWriter:
+    """
+    Incremental PNG encoder fed with horizontal bands
+
+    Only the current band, one scanline of history and the zlib window are
+    kept in memory, so peak memory does not grow with the image height.
+
+    Example:
+        writer = PNGStripWriter(stream, 800, 20000)
+        for band in bands:
+            writer.write(band)
+        writer.close()
+    """
+
+    def __init__(self, stream, width, height, mode='RGBA', compress_level=6):
+        """
+        Args:
+            stream (file-like): Binary stream receiving the PNG
+            width (int): Image width
+            height (int): Total image height
+            mode (str): Pillow mode of the bands ("L", "RGB" or "RGBA")
+            compress_level (int): zlib compression level 0-9
+        """
+        if mode not in _COLOR_TYPES:
+            raise ValueError(f"Unsupported strip mode: {mode}")
+        self.stream = stream
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.channels = len(mode)
+        self.rows_written = 0
+
+        self._compressor = zlib.compressobj(compress_level)
+        self._pending = []
+        self._pending_size = 0
+        self._previous_row = np.zeros(width * self.channels, dtype=np.uint8)
+
+        header = struct.pack('>IIBBBBB', width, height, 8, _COLOR_TYPES[mode], 0, 0, 0)
+        stream.write(PNG_SIGNATURE)
+        stream.write(_chunk(b'IHDR', header))
+
+    def write(self, band):
+        """
+        Append the next band of rows
+
+        Args:
+            band (PIL.Image): Band of the same width and mode as the image
+        """
+        if band.width != self.width or band.mode != self.mode:
+            raise ValueError("Band size or mode does not match the PNG header")
+        if self.rows_written + band.height > self.height:
+            raise ValueError("Band runs past the declared image height")
+
+        # The pixel copy, the filtered rows and their bytes
+        note_canvas("strip filter", self.width, band.height, 3 * self.channels)
+        rows = np.asarray(band, dtype=np.uint8).reshape(band.height, self.width * self.channels)
+        filtered = up_filter(rows, self._previous_row)
+        self._previous_row = rows[-1].copy()
+        self.rows_written += band.height
+
+        self._emit(self._compressor.compress(filtered.tobytes()))
+
+    def close(self):
+        """Flush the compressor and write the closing chunks"""
+        if self.rows_written != self.height:
+            raise ValueError(f"PNG expects {self.height} rows, got {self.rows_written}")
+        self._emit(self._compressor.flush(), force=True)
+        self.stream.write(_chunk(b'IEND', b''))
+
+    def _emit(self, data, force=False):
+        """Buffer compressed data and write it out as IDAT chunks"""
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        if self._pending_size >= _IDAT_SIZE or (force and self._pending_size):
+            self.stream.write(_chunk(b'IDAT', b''.join(self._pending)))
+            self._pending = []
+            self._pending_size = 0
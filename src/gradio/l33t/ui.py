@@ -5,7 +5,10 @@ Provides the holographic interface elements and interactions
 
 import gradio as gr
 import os
+from .async_manuscript import create_hacker_manuscript_progressive
 from .manuscript import create_hacker_manuscript
+from .memory import memory_stats
+from .render_cache import clear_render_cache, get_render_cache_stats
 
 def load_holo_styles():
     """
@@ -21,12 +24,14 @@ def load_holo_styles():
             css = f.read()
     return css
 
-def create_tabs(data_sources):
+def create_tabs(data_sources, catalog=None):
     """
     Create tab components for the UI
     
     Args:
         data_sources (dict): Data for populating tabs
+        catalog (MuseumCatalog, optional): Indexed catalog the data tabs are
+            queried from instead of data_sources
         
     Returns:
         list: List of Gradio tab components
@@ -43,6 +48,11 @@ def create_tabs(data_sources):
         image_output = gr.Image(label="Manuscript Image")
         tabs.append((tab_image, image_output))
     
+    # Data tabs come from the catalog when there is one
+    if catalog is not None:
+        tabs.extend(create_catalog_tabs(catalog))
+        return tabs
+    
     # Add other tabs if data is available
     if 'br_data' in data_sources and 'incidents' in data_sources['br_data']:
         with gr.Tab("🧩 BR H4X D4T4", elem_classes=["holo-tab"]) as tab_br:
@@ -87,6 +97,56 @@ def create_tabs(data_sources):
     
     return tabs
 
+def create_catalog_tabs(catalog):
+    """
+    Create the data tabs from a museum catalog
+    
+    Args:
+        catalog (MuseumCatalog): Catalog to query
+        
+    Returns:
+        list: List of (tab, DataFrame) pairs
+    """
+    tabs = []
+    
+    with gr.Tab("🧩 BR H4X D4T4", elem_classes=["holo-tab"]) as tab_br:
+        br_incidents = gr.DataFrame(
+            value=[
+                [incident["year_label"], incident["name"], incident["description"]]
+                for incident in catalog.incidents(group="BR")
+            ],
+            headers=["Year", "Operation", "Description"],
+            label="Brazilian Hacker Incidents"
+        )
+        tabs.append((tab_br, br_incidents))
+    
+    with gr.Tab("🕰️ L0PHT H15T0RY", elem_classes=["holo-tab"]) as tab_lopht:
+        lopht_achievements = gr.DataFrame(
+            value=[
+                [achievement["year_label"], achievement["name"], achievement["description"]]
+                for achievement in catalog.achievements(group="L0PHT")
+            ],
+            headers=["Year", "Achievement", "Description"],
+            label="L0pht Heavy Industries Milestones"
+        )
+        tabs.append((tab_lopht, lopht_achievements))
+    
+    with gr.Tab("🏛️ NFT MU53UM", elem_classes=["holo-tab"]) as tab_nft:
+        nft_collections = gr.DataFrame(
+            value=[
+                [collection["name"],
+                 collection["items"] if collection["items"] is not None else "N/A",
+                 collection["nft_contract"] or "N/A",
+                 collection["preservation_rating"] or "B"]
+                for collection in catalog.collections()
+            ],
+            headers=["Collection", "Items", "NFT Contract", "Preservation Rating"],
+            label="Quantum-Preserved NFT Collections (Target Year: 2420)"
+        )
+        tabs.append((tab_nft, nft_collections))
+    
+    return tabs
+
 def create_micro_module_buttons(template_functions):
     """
     Create buttons for the micro-modules
@@ -135,7 +195,9 @@ def create_micro_module_buttons(template_functions):
     
     return buttons
 
-def create_holographic_interface(hacker_groups, data_sources, template_functions, echo_function=None):
+def create_holographic_interface(hacker_groups, data_sources, template_functions, echo_function=None,
+                                 render_pool=None, batcher=None, sessions=None, live=None, admission=None,
+                                 quality=None, catalog=None):
     """
     Create the complete holographic interface
     
@@ -144,6 +206,27 @@ def create_holographic_interface(hacker_groups, data_sources, template_functions
         data_sources (dict): Data for tabs and displays
         template_functions (dict): Functions to generate template text
         echo_function (function, optional): Function for the echo L0pht members feature
+        render_pool (RenderProcessPool, optional): Renders manuscripts in worker
+            processes instead of the request thread
+        batcher (ManuscriptBatcher, optional): Serves the convert button as a
+            batched event, it also bounds the queue
+        sessions (SessionStore, optional): Keeps each visitor's last render and
+            repaints only the lines that changed on the next convert
+        live (LiveRenderer, optional): Re-renders while the visitor types,
+            after an idle delay
+        admission (AdmissionController, optional): Admits, queues or rejects
+            renders by their estimated cost, on every render path: pool, batcher,
+            sessions, live preview and the default async path
+        quality (QualityController, optional): Lowers the render quality of
+            convert requests under load
+        catalog (MuseumCatalog, optional): Indexed museum catalog the data
+            tabs are queried from
+        
+    Besides the UI events, three API-only endpoints are registered:
+    "/convert" takes the text, the group and use_cache (False bypasses the
+    render cache), "/clear_render_cache" drops the render cache and
+    returns its counters, "/memory_stats" returns the memory accounting
+    totals (all zero unless H4X0R_MEMORY=1).
         
     Returns:
         gr.Blocks: The complete Gradio interface
@@ -202,7 +285,7 @@ def create_holographic_interface(hacker_groups, data_sources, template_functions
         
         # Tabs for output and data displays
         with gr.Row(elem_classes=["holographic"]):
-            tabs = create_tabs(data_sources)
+            tabs = create_tabs(data_sources, catalog)
         
         # Connect callbacks
         
@@ -227,11 +310,118 @@ def create_holographic_interface(hacker_groups, data_sources, template_functions
         )
         
         # Convert button callback
-        convert_btn.click(
-            lambda text, group: create_hacker_manuscript(text, hacker_groups, group),
-            inputs=[markdown_input, group_selector],
-            outputs=[tabs[0][1], tabs[1][1]]  # HTML output and Image output
+        if batcher is not None:
+            # Gradio hands over queued requests in lists, the batcher merges
+            # the calls that arrive within its delay window; its renders go
+            # through the same admission and quality tiers as the other paths
+            if admission is not None:
+                batcher.admission = admission
+            if quality is not None:
+                batcher.quality = quality
+            convert_btn.click(
+                batcher.render_batch,
+                inputs=[markdown_input, group_selector],
+                outputs=[tabs[0][1], tabs[1][1]],
+                batch=True,
+                max_batch_size=batcher.max_batch_size,
+                concurrency_limit=batcher.max_batch_size
+            )
+        elif render_pool is not None:
+            # The pool bounds its own queue, let Gradio hand it that many requests
+            def convert_in_pool(text, group):
+                if quality is not None:
+                    return quality.create_hacker_manuscript(text, hacker_groups, group,
+                                                            renderer=render_pool.render, admission=admission)
+                return render_pool.create_hacker_manuscript(text, hacker_groups, group, admission=admission)
+            
+            convert_btn.click(
+                convert_in_pool,
+                inputs=[markdown_input, group_selector],
+                outputs=[tabs[0][1], tabs[1][1]],
+                concurrency_limit=render_pool.concurrency
+            )
+        elif sessions is not None:
+            # One render state per browser session, edits repaint only changed lines
+            if admission is not None:
+                sessions.admission = admission
+            if quality is not None:
+                sessions.quality = quality
+            
+            def convert_incremental(text, group, request: gr.Request):
+                return sessions.render(request.session_hash, text, hacker_groups, group)
+            
+            convert_btn.click(
+                convert_incremental,
+                inputs=[markdown_input, group_selector],
+                outputs=[tabs[0][1], tabs[1][1]]
+            )
+        else:
+            # Async generator: the render runs in an executor while the event
+            # loop keeps serving other events, long manuscripts show a
+            # preview first
+            render = create_hacker_manuscript_progressive
+            if quality is not None:
+                render = quality.create_hacker_manuscript_progressive
+            
+            async def convert_manuscript(text, group):
+                async for result in render(text, hacker_groups, group, admission=admission):
+                    yield result
+            
+            convert_btn.click(
+                convert_manuscript,
+                inputs=[markdown_input, group_selector],
+                outputs=[tabs[0][1], tabs[1][1]]  # HTML output and Image output
+            )
+        
+        # Live preview: every edit is sent, the renderer drops all but the newest
+        if live is not None:
+            # Live renders share the convert button's work budget
+            if admission is not None:
+                live.admission = admission
+            
+            async def live_preview(text, group, request: gr.Request):
+                result = await live.render(request.session_hash, text, group)
+                if result is None:
+                    return gr.update(), gr.update()
+                return result
+            
+            markdown_input.change(
+                live_preview,
+                inputs=[markdown_input, group_selector],
+                outputs=[tabs[0][1], tabs[1][1]],
+                trigger_mode="multiple",
+                show_progress="hidden",
+                concurrency_limit=None
+            )
+        
+        # API-only endpoints, their components are never shown
+        api_use_cache = gr.Checkbox(value=True, visible=False)
+        api_cache_stats = gr.JSON(visible=False)
+        api_convert_btn = gr.Button(visible=False)
+        api_clear_btn = gr.Button(visible=False)
+        api_memory_stats = gr.JSON(visible=False)
+        api_memory_btn = gr.Button(visible=False)
+        
+        def convert_api(text, group, use_cache=True):
+            renderer = render_pool.render if render_pool is not None else None
+            if quality is not None:
+                return quality.create_hacker_manuscript(text, hacker_groups, group, use_cache=use_cache,
+                                                        renderer=renderer, admission=admission)
+            return create_hacker_manuscript(text, hacker_groups, group, use_cache=use_cache,
+                                            renderer=renderer, admission=admission)
+        
+        def clear_cache_api():
+            clear_render_cache()
+            return get_render_cache_stats()
+        
+        api_convert_btn.click(
+            convert_api,
+            inputs=[markdown_input, group_selector, api_use_cache],
+            outputs=[tabs[0][1], tabs[1][1]],
+            api_name="convert"
         )
+        api_clear_btn.click(clear_cache_api, outputs=[api_cache_stats], api_name="clear_render_cache")
+        api_memory_btn.click(memory_stats, outputs=[api_memory_stats], api_name="memory_stats")
         
         # Template button callbacks
         for key, button in buttons.items():
@@ -248,4 +438,7 @@ def create_holographic_interface(hacker_groups, data_sources, template_functions
                 outputs=[echo_output]
             )
     
+    if batcher is not None:
+        demo.queue(max_size=batcher.max_queue_size)
+    
     return demo 
\ No newline at end of file
@@ -6,15 +6,29 @@ A holographic touch-based UI for the OMEGA HACKER HISTORICAL MUSEUM
 import os
 import sys
 from gradio.l33t.ui import create_holographic_interface
+from gradio.l33t.background_pool import start_background_pool
+from gradio.l33t.leet import register_dictionary
+from gradio.l33t.render_pool import RenderProcessPool
+from gradio.l33t.batching import ManuscriptBatcher
+from gradio.l33t.incremental import SessionStore
+from gradio.l33t.live import LiveRenderer
+from gradio.l33t.admission import AdmissionController
+from gradio.l33t.quality import QualityController
+from gradio.l33t.metrics import enable_metrics, mount_metrics
+from gradio.l33t.render_cache import install_render_cache
+from gradio.l33t.shared_cache import SharedRenderCache
+from gradio.l33t.serving import serve_workers
 
 # Import necessary modules
 try:
     # Add the root directory to the path so imports work correctly
     sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
     
-    from brazilian_module import get_br_hacker_data, get_br_template
-    from lopht_module import get_lopht_data, get_lopht_template, get_lopht_advisory_template
-    from webarchive_nft_module import get_webarchive_nft_data, get_webarchive_nft_template, echo_lopht_members
+    from brazilian_module import get_br_template, get_br_leet_replacements
+    from lopht_module import get_lopht_template, get_lopht_advisory_template
+    from webarchive_nft_module import get_webarchive_nft_template, echo_lopht_members
+    from museum_registry import get_museum_registry
+    from museum_catalog import MuseumCatalog, load_museum_data
 except ImportError as e:
     print(f"Error importing modules: {e}")
     sys.exit(1)
@@ -26,66 +40,18 @@ def load_hacker_groups():
     Returns:
         dict: Combined information about all hacker groups
     """
-    # Base hacker groups
-    HACKER_GROUPS = {
-        "MOD": {
-            "name": "Masters of Deception",
-            "emoji": "📞",
-            "description": "Phone phreaking specialists who rivaled Legion of Doom",
-            "members": ["Phiber Optik", "Acid Phreak", "Scorpion", "Corrupt"],
-            "era": "Early 1990s"
-        },
-        "CDC": {
-            "name": "Cult of the Dead Cow",
-            "emoji": "🐄",
-            "description": "Coined 'hacktivism' and created Back Orifice",
-            "members": ["Mudge", "Dildog", "Deth Veggie", "Omega"],
-            "era": "1980s-1990s"
-        },
-        "LOD": {
-            "name": "Legion of Doom",
-            "emoji": "⚡",
-            "description": "Legendary group known for technical journals",
-            "members": ["Erik Bloodaxe", "The Mentor", "Lex Luthor"],
-            "era": "1980s-early 1990s"
-        }
-    }
-    
-    # Add Brazilian hacker groups
-    br_data = get_br_hacker_data()
-    for key, group in br_data["groups"].items():
-        HACKER_GROUPS[key] = {
-            "name": group["name"],
-            "emoji": group["emoji"],
-            "description": group["description"],
-            "members": ["Unknown"],  # Default members if not specified
-            "era": group["era"]
-        }
-    
-    # Add L0pht with detailed information
-    lopht_data = get_lopht_data()
-    HACKER_GROUPS["L0PHT"] = {
-        "name": lopht_data["name"],
-        "emoji": lopht_data["emoji"],
-        "description": "Created L0phtCrack and testified to Congress in 1998",
-        "members": [member.split(" (")[0] for member in lopht_data["founders"][:5]],  # First 5 members
-        "era": lopht_data["years_active"]
-    }
-    
-    return HACKER_GROUPS
+    # Brazilian manuscripts use the PT-BR l33t rules
+    register_dictionary("pt-br", get_br_leet_replacements())
+    return get_museum_registry().hacker_groups()
 
 def load_data_sources():
     """
     Load all data sources for the application
     
     Returns:
-        dict: Dictionary of data sources
+        dict: Dictionary of data sources, read-only
     """
-    return {
-        'br_data': get_br_hacker_data(),
-        'lopht_data': get_lopht_data(),
-        'webarchive_data': get_webarchive_nft_data()
-    }
+    return get_museum_registry().data_sources()
 
 def load_template_functions():
     """
@@ -166,16 +132,120 @@ def create_app():
     data_sources = load_data_sources()
     template_functions = load_template_functions()
     
+    # Optional render cache shared with the other workers on this host,
+    # e.g. H4X0R_SHARED_CACHE=/dev/shm/h4x0r-renders
+    shared_cache = os.environ.get("H4X0R_SHARED_CACHE")
+    if shared_cache:
+        install_render_cache(SharedRenderCache(
+            shared_cache,
+            max_bytes=int(float(os.environ.get("H4X0R_SHARED_CACHE_MB", "256")) * 1024 * 1024),
+        ))
+    
+    # Start pre-rendering matrix backgrounds
+    start_background_pool()
+    
+    # Optional process-pool rendering, e.g. H4X0R_RENDER_WORKERS=4
+    render_pool = None
+    render_workers = int(os.environ.get("H4X0R_RENDER_WORKERS", "0"))
+    if render_workers > 0:
+        render_pool = RenderProcessPool(
+            workers=render_workers,
+            max_pending=int(os.environ.get("H4X0R_RENDER_QUEUE", "16")),
+            timeout=float(os.environ.get("H4X0R_RENDER_TIMEOUT", "30")),
+        ).start()
+    
+    # Optional batched convert endpoint, e.g. H4X0R_BATCH_SIZE=8
+    batcher = None
+    batch_size = int(os.environ.get("H4X0R_BATCH_SIZE", "0"))
+    if batch_size > 0:
+        batcher = ManuscriptBatcher(
+            hacker_groups,
+            max_batch_size=batch_size,
+            max_batch_delay=float(os.environ.get("H4X0R_BATCH_DELAY", "0.05")),
+            max_queue_size=int(os.environ.get("H4X0R_QUEUE_SIZE", "64")),
+            renderer=render_pool.render if render_pool is not None else None,
+        ).start()
+    
+    # Optional per-session incremental rendering, e.g. H4X0R_INCREMENTAL=1,
+    # the sessions share H4X0R_SESSIONS_MB of memory
+    sessions = None
+    if os.environ.get("H4X0R_INCREMENTAL", "0") == "1":
+        max_sessions = os.environ.get("H4X0R_SESSIONS")
+        sessions = SessionStore(
+            max_bytes=int(float(os.environ.get("H4X0R_SESSIONS_MB", "512")) * 1024 * 1024),
+            max_sessions=int(max_sessions) if max_sessions else None,
+        )
+    
+    # Optional live preview while typing, e.g. H4X0R_LIVE_DELAY=0.4
+    live = None
+    live_delay = float(os.environ.get("H4X0R_LIVE_DELAY", "0"))
+    if live_delay > 0:
+        live = LiveRenderer(
+            hacker_groups,
+            delay=live_delay,
+            max_active=int(os.environ.get("H4X0R_LIVE_RENDERS", "2")),
+        )
+    
+    # Optional cost-based admission of every render, e.g. H4X0R_RENDER_BUDGET_MS=4000
+    admission = None
+    render_budget = float(os.environ.get("H4X0R_RENDER_BUDGET_MS", "0"))
+    if render_budget > 0:
+        admission = AdmissionController(
+            budget=render_budget,
+            max_queue=int(os.environ.get("H4X0R_ADMISSION_QUEUE", "32")),
+            max_wait=float(os.environ.get("H4X0R_ADMISSION_WAIT", "10")),
+        )
+    
+    # Optional quality tiers under load, e.g. H4X0R_QUALITY_TIERS=1
+    quality = None
+    if os.environ.get("H4X0R_QUALITY_TIERS", "0") == "1":
+        depth_levels = os.environ.get("H4X0R_QUALITY_DEPTH", "4,8")
+        latency_levels = os.environ.get("H4X0R_QUALITY_P95", "2,5")
+        quality = QualityController(
+            depth_levels=tuple(int(level) for level in depth_levels.split(",")),
+            latency_levels=tuple(float(level) for level in latency_levels.split(",")),
+            extra_depth=(lambda: batcher.stats()['pending']) if batcher is not None else None,
+        )
+    
+    # Optional SQLite museum catalog for the data tabs, e.g. H4X0R_CATALOG=museum.db,
+    # filled from the data modules when it is new
+    catalog = None
+    catalog_path = os.environ.get("H4X0R_CATALOG")
+    if catalog_path:
+        catalog = load_museum_data(MuseumCatalog(catalog_path), if_empty=True)
+    
     # Create the interface
     return create_holographic_interface(
         hacker_groups=hacker_groups,
         data_sources=data_sources,
         template_functions=template_functions,
-        echo_function=echo_lopht_members
+        echo_function=echo_lopht_members,
+        render_pool=render_pool,
+        batcher=batcher,
+        sessions=sessions,
+        live=live,
+        admission=admission,
+        quality=quality,
+        catalog=catalog
     )
 
 # Entry point
 def main():
+    # Optional worker processes behind one port, e.g. H4X0R_WORKERS=4
+    workers = int(os.environ.get("H4X0R_WORKERS", "1"))
+    if workers > 1:
+        serve_workers(workers, host=os.environ.get("H4X0R_HOST", "127.0.0.1"),
+                      port=int(os.environ.get("H4X0R_PORT", "7860")),
+                      cache_dir=os.environ.get("H4X0R_SHARED_CACHE"))
+        return
+    # Optional Prometheus endpoint next to the UI, e.g. H4X0R_METRICS=1
+    if os.environ.get("H4X0R_METRICS", "0") == "1":
+        import uvicorn
+        enable_metrics()
+        app = mount_metrics(create_app(), path=os.environ.get("H4X0R_METRICS_PATH", "/metrics"))
+        uvicorn.run(app, host=os.environ.get("H4X0R_HOST", "127.0.0.1"),
+                    port=int(os.environ.get("H4X0R_PORT", "7860")))
+        return
     app = create_app()
     app.launch()
 
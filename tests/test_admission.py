@@ -0,0 +1,105 @@
+"""
+Tests for the cost-based admission controller
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.gradio.l33t.admission import AdmissionController, estimate_cost
+from src.gradio.l33t.async_manuscript import create_hacker_manuscript_async
+from src.gradio.l33t.manuscript import RenderRejected, create_hacker_manuscript
+
+
+def _fixed_cost(markdown_text, encoder=None):
+    return {'cost': float(len(markdown_text))}
+
+
+def test_cost_grows_with_lines_and_quality():
+    short = estimate_cost("# t1ny\n\nOne line")
+    long = estimate_cost("# h4ck\n\n" + "A line of text\n\n" * 300)
+    assert long['rows'] > short['rows']
+    assert long['cost'] > short['cost']
+    assert estimate_cost("x\n" * 300, "small")['cost'] > estimate_cost("x\n" * 300, "fast")['cost']
+
+
+def test_painted_page_is_capped():
+    huge = estimate_cost("A line of text\n" * 100000)
+    assert huge['lines'] == 100001
+    assert huge['height'] == 20000
+
+
+def test_too_large_request_gets_a_notice():
+    admission = AdmissionController(budget=10, estimator=_fixed_cost)
+    html, image_bytes = create_hacker_manuscript("# far too long", {}, use_cache=False, admission=admission)
+    assert html.startswith("<h1>Manuscript not rendered")
+    assert "allowed per request" in html
+    assert image_bytes
+    assert admission.stats()['rejected_too_large'] == 1
+
+
+def test_queued_requests_are_admitted_in_order():
+    admission = AdmissionController(budget=10, max_wait=5)
+    admission.acquire(8)
+    order = []
+
+    def wait(cost):
+        admission.acquire(cost)
+        order.append(cost)
+
+    threads = [threading.Thread(target=wait, args=(cost,)) for cost in (5, 6)]
+    for waiting, thread in enumerate(threads, 1):
+        thread.start()
+        while admission.stats()['waiting'] < waiting:
+            threading.Event().wait(0.01)
+    assert order == []
+    admission.release(8)
+    threads[0].join(5)
+    assert order == [5]
+    assert admission.stats()['waiting'] == 1
+    admission.release(5)
+    threads[1].join(5)
+    assert order == [5, 6]
+    assert admission.stats()['in_flight'] == 6
+
+
+def test_full_queue_and_timeouts_reject():
+    admission = AdmissionController(budget=10, max_queue=1, max_wait=0.05)
+    admission.acquire(10)
+    with pytest.raises(RenderRejected, match="waited"):
+        admission.acquire(5)
+    admission._enqueue(5, lambda: None)
+    with pytest.raises(RenderRejected, match="busy"):
+        admission.acquire(5)
+    stats = admission.stats()
+    assert stats['timed_out'] == 1
+    assert stats['rejected_busy'] == 1
+
+
+def test_cancelled_async_waiter_leaves_the_queue():
+    admission = AdmissionController(budget=10, max_wait=5)
+
+    async def scenario():
+        admission.acquire(10)
+        waiter = asyncio.ensure_future(admission.acquire_async(5))
+        await asyncio.sleep(0.01)
+        assert admission.stats()['waiting'] == 1
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        admission.release(10)
+
+    asyncio.run(scenario())
+    assert admission.stats()['waiting'] == 0
+    assert admission.stats()['in_flight'] == 0
+
+
+def test_async_render_holds_budget_until_done():
+    admission = AdmissionController(budget=10000)
+    html, _ = asyncio.run(create_hacker_manuscript_async("# 4dm1t", {}, use_cache=False, admission=admission))
+    assert html == "<h1>4dm1t</h1>"
+    stats = admission.stats()
+    assert stats['admitted'] == 1
+    assert stats['in_flight'] == 0
+    assert stats['peak_in_flight'] > 0
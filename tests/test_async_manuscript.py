@@ -0,0 +1,113 @@
+"""
+Tests for the async manuscript generator
+"""
+
+import asyncio
+import io
+import threading
+
+from PIL import Image
+
+from src.gradio.l33t import manuscript
+from src.gradio.l33t.admission import AdmissionController
+from src.gradio.l33t.async_manuscript import (
+    create_hacker_manuscript_async,
+    create_hacker_manuscript_progressive,
+)
+
+
+def test_async_result_matches_sync():
+    text = "# 4sync\n\nSame bytes as the sync path"
+    result = asyncio.run(create_hacker_manuscript_async(text, seed=3, use_cache=False))
+    assert result == manuscript.create_hacker_manuscript(text, seed=3, use_cache=False)
+
+
+def test_first_page_render_matches_paginated_render():
+    text = "\n".join(f"line {i}" for i in range(100))
+    _, pages = manuscript.render_manuscript_pages(text, max_page_height=1000, seed=5)
+    prepared = manuscript.prepare_manuscript(text, max_page_height=1000, seed=5)
+
+    assert len(pages) > 1
+    assert manuscript.render_page(prepared, 1) == pages[0]
+    assert f"page 1 of {len(pages)}" in manuscript.manuscript_html(prepared)
+
+
+def test_cancellation_stops_the_executor_stage(monkeypatch):
+    started = threading.Event()
+    stopped = []
+    finished = threading.Event()
+    original = manuscript.render_manuscript_png
+
+    def slow_render(layout, **kwargs):
+        started.set()
+        cancel = kwargs['cancel']
+        cancel.wait(5)
+        stopped.append(cancel.is_set())
+        try:
+            return original(layout, **kwargs)
+        except manuscript.RenderCancelled:
+            stopped.append('cancelled')
+            raise
+        finally:
+            finished.set()
+
+    monkeypatch.setattr(manuscript, 'render_manuscript_png', slow_render)
+
+    async def run():
+        task = asyncio.ensure_future(create_hacker_manuscript_async("# c4nc3l", use_cache=False))
+        while not started.is_set():
+            await asyncio.sleep(0.01)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    assert asyncio.run(run())
+    assert finished.wait(5)
+    assert stopped == [True, 'cancelled']
+
+
+def _collect(generator):
+    async def run():
+        return [result async for result in generator]
+    return asyncio.run(run())
+
+
+def test_progressive_yields_preview_then_the_final_render():
+    text = "\n".join(f"pr0gr355 {i}" for i in range(60))
+    results = _collect(create_hacker_manuscript_progressive(text, seed=9, use_cache=False))
+
+    assert len(results) == 2
+    (preview_html, preview), final = results
+    assert preview_html == final[0]
+    assert Image.open(io.BytesIO(preview)).size == (manuscript.CANVAS_WIDTH // 2, manuscript.PREVIEW_HEIGHT // 2)
+    assert final == manuscript.create_hacker_manuscript(text, seed=9, use_cache=False)
+
+
+def test_progressive_short_manuscript_yields_once():
+    results = _collect(create_hacker_manuscript_progressive("# sh0rt", use_cache=False))
+    assert len(results) == 1
+
+
+def test_slow_consumer_of_the_preview_holds_no_budget():
+    admission = AdmissionController(budget=1e9, estimator=lambda text, encoder: {'cost': 100.0})
+    text = "\n".join(f"b4dg3t {i}" for i in range(60))
+
+    async def run():
+        results = create_hacker_manuscript_progressive(text, use_cache=False, admission=admission)
+        await results.__anext__()
+        # The visitor's connection stalls here, the final render still finishes
+        for _ in range(500):
+            if admission.stats()['in_flight'] == 0:
+                break
+            await asyncio.sleep(0.01)
+        in_flight = admission.stats()['in_flight']
+        final = await results.__anext__()
+        await results.aclose()
+        return in_flight, final
+
+    in_flight, final = asyncio.run(run())
+    assert in_flight == 0
+    assert final == manuscript.create_hacker_manuscript(text, use_cache=False)
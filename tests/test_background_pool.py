@@ -0,0 +1,74 @@
+"""
+Tests for the pre-rendered matrix background pool
+"""
+
+import time
+
+from src.gradio.l33t.background_pool import BackgroundPool
+
+
+def test_pool_crops_to_requested_height_and_counts_hits():
+    pool = BackgroundPool(width=200, bucket_height=400, max_height=800, variants=1, warm_heights=())
+
+    first = pool.get(200, 500)
+    second = pool.get(200, 700)
+
+    assert first.size == (200, 500)
+    assert second.size == (200, 700)
+    assert pool.stats()['misses'] == 1
+    assert pool.stats()['hits'] == 1
+    # Both requests are served from the same slot
+    assert first.tobytes() == second.crop((0, 0, 200, 500)).tobytes()
+
+
+def test_pool_tiles_heights_above_the_largest_bucket():
+    pool = BackgroundPool(width=100, bucket_height=400, max_height=400, variants=1, warm_heights=())
+
+    image = pool.get(100, 1000)
+
+    assert image.size == (100, 1000)
+    assert image.crop((0, 0, 100, 400)).tobytes() == image.crop((0, 400, 100, 800)).tobytes()
+
+
+def test_pool_evicts_over_memory_ceiling():
+    slot_bytes = 100 * 400 * 4
+    pool = BackgroundPool(width=100, bucket_height=400, max_height=1200, variants=1,
+                          max_bytes=slot_bytes * 2, warm_heights=())
+
+    pool.get(100, 400)
+    pool.get(100, 800)
+
+    stats = pool.stats()
+    assert stats['bytes'] <= slot_bytes * 2
+    assert stats['evictions'] == 1
+
+
+def test_worker_fills_warm_buckets():
+    pool = BackgroundPool(width=100, bucket_height=400, max_height=800, variants=2, warm_heights=(400, 800))
+    pool.start()
+    try:
+        deadline = time.time() + 10
+        while pool.stats()['entries'] < 4 and time.time() < deadline:
+            time.sleep(0.01)
+        assert pool.stats()['entries'] == 4
+
+        pool.get(100, 300)
+        assert pool.stats()['hits'] == 1
+    finally:
+        pool.stop(timeout=5)
+
+
+def test_worker_only_refills_buckets_that_miss_slots_and_fit():
+    slot_bytes = 100 * 400 * 4
+    pool = BackgroundPool(width=100, bucket_height=400, max_height=800, variants=1,
+                          max_bytes=slot_bytes, warm_heights=())
+    pool.start()
+    try:
+        for _ in range(10):
+            pool.get(100, 400)
+            pool.get(100, 800)
+        time.sleep(0.2)
+    finally:
+        pool.stop(timeout=5)
+    stats = pool.stats()
+    assert (stats['hits'], stats['misses'], stats['fills']) == (9, 11, 0)
@@ -0,0 +1,85 @@
+"""
+Tests for the pipeline benchmark baselines
+"""
+
+import json
+
+import pytest
+
+from benchmarks.baseline import compare_reports, history_rows, main, parse_stage_tolerances
+from benchmarks.pipeline import SCHEMA_VERSION, STAGES
+
+
+def _report(cases, heap=10.0):
+    """Synthetic report, cases maps a case name to its stage latencies (10 ms unless given)"""
+    results = []
+    for name, stages in cases.items():
+        latencies = {stage: stages.get(stage, 10.0) for stage in STAGES}
+        results.append({
+            'name': name,
+            'stages': {stage: {'p50_ms': ms, 'p95_ms': ms, 'p99_ms': ms, 'mean_ms': ms}
+                       for stage, ms in latencies.items()},
+            'throughput_docs_per_s': 1000.0 / latencies['total'],
+            'peak_heap_mb': heap,
+        })
+    return {'schema': SCHEMA_VERSION, 'created': "2026-01-01T00:00:00", 'environment': {}, 'results': results}
+
+
+def _regressed(rows):
+    return {(case, stage) for case, stage, _, _, _, regressed in rows if regressed}
+
+
+def test_slower_stages_and_heap_regress():
+    rows = compare_reports(_report({'plain-1': {}}), _report({'plain-1': {'total': 20.0}}, heap=13.0))
+    assert _regressed(rows) == {('plain-1', 'total'), ('plain-1', 'heap')}
+
+
+def test_noise_under_min_delta_does_not_regress():
+    rows = compare_reports(_report({'plain-1': {'parse': 0.2}}), _report({'plain-1': {'parse': 0.5}}))
+    assert _regressed(rows) == set()
+    rows = compare_reports(_report({'plain-1': {'parse': 0.2}}), _report({'plain-1': {'parse': 0.5}}),
+                           min_delta_ms=0.1)
+    assert _regressed(rows) == {('plain-1', 'parse')}
+
+
+def test_stage_tolerances_override_the_default():
+    baseline = _report({'mixed-100': {}})
+    report = _report({'mixed-100': {'draw': 13.0}})
+    assert _regressed(compare_reports(baseline, report)) == {('mixed-100', 'draw')}
+    assert parse_stage_tolerances(["paint=0.5"]) == {'draw': 0.5}
+    assert _regressed(compare_reports(baseline, report, stage_tolerances={'draw': 0.5})) == set()
+
+
+def test_cases_missing_from_the_run_regress():
+    rows = compare_reports(_report({'plain-1': {}, 'plain-1000': {}}), _report({'plain-1': {}}))
+    assert _regressed(rows) == {('plain-1000', 'missing')}
+
+
+def test_compare_with_a_report_records_it_in_the_history(tmp_path, capsys):
+    baseline, report, history = tmp_path / "base.json", tmp_path / "run.json", tmp_path / "history.jsonl"
+    baseline.write_text(json.dumps(_report({'plain-1': {}})))
+    report.write_text(json.dumps(_report({'plain-1': {'total': 30.0}})))
+
+    assert main(["--baseline", str(baseline), "compare", "--report", str(report),
+                 "--history", str(history), "--label", "v2"]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
+    assert [row[2:5] for row in history_rows(str(history))] == [("v2", "plain-1", 30.0)]
+
+
+def test_baseline_is_accepted_after_the_subcommand(tmp_path, capsys):
+    baseline, report = tmp_path / "base.json", tmp_path / "run.json"
+    report.write_text(json.dumps(_report({'plain-1': {}})))
+
+    assert main(["save", "--baseline", str(baseline), "--report", str(report), "--no-history"]) == 0
+    assert main(["compare", "--report", str(report), "--no-history", "--baseline", str(baseline)]) == 0
+    assert "No regressions" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("argv", [["compare", "--stage-tolerance", "pixels=0.5"],
+                                  ["compare", "--stage-tolerance", "draw=lots"],
+                                  ["history", "--stage", "pixels"]])
+def test_unknown_stages_are_usage_errors(argv, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(argv)
+    assert exit_info.value.code == 2
+    assert "usage:" in capsys.readouterr().err
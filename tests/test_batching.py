@@ -0,0 +1,93 @@
+"""
+Tests for the batched convert endpoint
+"""
+
+import threading
+
+import pytest
+
+from src.gradio.l33t.admission import AdmissionController
+from src.gradio.l33t.batching import BatchQueueFull, ManuscriptBatcher
+from src.gradio.l33t.manuscript import create_hacker_manuscript
+
+
+def test_batch_results_match_single_renders_in_order():
+    batcher = ManuscriptBatcher(max_batch_size=4, max_batch_delay=0.01).start()
+    try:
+        texts = ["# 0n3", "# tw0", "# 0n3"]
+        html_list, image_list = batcher.render_batch(texts, [None] * 3)
+    finally:
+        batcher.stop()
+
+    expected = [create_hacker_manuscript(text) for text in texts]
+    assert html_list == [html for html, _ in expected]
+    assert image_list == [image for _, image in expected]
+
+
+def test_concurrent_calls_within_the_delay_share_a_batch():
+    batcher = ManuscriptBatcher(max_batch_size=8, max_batch_delay=0.5).start()
+    try:
+        threads = [threading.Thread(target=batcher.render_batch, args=([f"# b4tch {i}"], [None]))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = batcher.stats()
+    finally:
+        batcher.stop()
+
+    assert stats['rendered'] == 4
+    assert stats['batches'] < 4
+
+
+def test_full_queue_rejects_requests():
+    release = threading.Event()
+
+    def blocking_renderer(*args):
+        release.wait(5)
+        return "<p>ok</p>", b""
+
+    batcher = ManuscriptBatcher(max_batch_size=1, max_batch_delay=0, max_queue_size=1,
+                                renderer=blocking_renderer).start()
+    try:
+        running = batcher.submit("# f1r5t")
+        while batcher.stats()['pending']:
+            release.wait(0.01)
+        waiting = batcher.submit("# s3c0nd")
+        with pytest.raises(BatchQueueFull):
+            batcher.submit("# th1rd")
+        release.set()
+        assert running.result(5)[0] == waiting.result(5)[0] == "<p>ok</p>"
+    finally:
+        release.set()
+        batcher.stop()
+    assert batcher.stats()['rejected'] == 1
+
+
+def test_distinct_items_of_a_batch_render_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+
+    def parallel_renderer(markdown_text, *args, **kwargs):
+        # Only passes once all three distinct items are rendering at once
+        barrier.wait()
+        return markdown_text, b""
+
+    batcher = ManuscriptBatcher(max_batch_size=4, max_batch_delay=0.2, renderer=parallel_renderer).start()
+    try:
+        html_list, _ = batcher.render_batch(["# p1", "# p2", "# p3", "# p1"], [None] * 4)
+    finally:
+        batcher.stop()
+    assert html_list == ["# p1", "# p2", "# p3", "# p1"]
+
+
+def test_batched_items_pass_admission():
+    admission = AdmissionController(budget=10, max_cost=1, estimator=lambda text, encoder: {'cost': len(text)})
+    batcher = ManuscriptBatcher(max_batch_size=2, max_batch_delay=0.01, admission=admission).start()
+    try:
+        html_list, _ = batcher.render_batch(["#", "# w4y t00 l0ng"], [None, None])
+    finally:
+        batcher.stop()
+    assert not html_list[0].startswith("<h1>Manuscript not rendered")
+    assert html_list[1].startswith("<h1>Manuscript not rendered")
+    assert admission.stats()['rejected_too_large'] == 1
@@ -0,0 +1,55 @@
+"""
+Tests for the manuscript image encoders
+"""
+
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.gradio.l33t.encoders import ImageEncoder, get_encoder, list_encoders
+from src.gradio.l33t.manuscript import create_hacker_manuscript
+
+
+def _green_image():
+    rng = np.random.default_rng(3)
+    pixels = np.zeros((120, 160, 4), dtype=np.uint8)
+    pixels[..., 1] = rng.integers(0, 256, (120, 160))
+    pixels[..., 3] = rng.integers(128, 256, (120, 160))
+    return Image.fromarray(pixels, 'RGBA')
+
+
+def test_presets_are_registered():
+    assert {'fast', 'balanced', 'small', 'palette'} <= set(list_encoders())
+    with pytest.raises(KeyError):
+        get_encoder("gif")
+
+
+@pytest.mark.parametrize("name", ["fast", "balanced", "small", "lossless", "palette-fast", "palette",
+                                  "palette-small", "webp", "webp-lossless"])
+def test_presets_decode_to_the_same_size(name):
+    image = _green_image()
+    output = io.BytesIO()
+    get_encoder(name).encode(image, output)
+
+    decoded = Image.open(io.BytesIO(output.getvalue()))
+    assert decoded.size == image.size
+    assert decoded.format == get_encoder(name).format
+
+
+def test_lossless_presets_keep_pixels():
+    image = _green_image()
+    for encoder in (get_encoder(), get_encoder("fast"), get_encoder("small"),
+                    ImageEncoder(format='WEBP', lossless=True, method=0)):
+        output = io.BytesIO()
+        encoder.encode(image, output)
+        assert Image.open(io.BytesIO(output.getvalue())).convert('RGBA').tobytes() == image.tobytes()
+
+
+def test_encoder_is_part_of_the_cache_key():
+    _, palette = create_hacker_manuscript("# enc0d3r", seed=1, encoder="palette")
+    _, webp = create_hacker_manuscript("# enc0d3r", seed=1, encoder="webp")
+
+    assert Image.open(io.BytesIO(palette)).mode == 'P'
+    assert Image.open(io.BytesIO(webp)).format == 'WEBP'
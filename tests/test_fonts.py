@@ -0,0 +1,75 @@
+"""
+Tests for the font registry
+"""
+
+import os
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from src.gradio.l33t.fonts import FontRegistry
+
+DEJAVU = "/usr/share/fonts/truetype/dejavu"
+
+needs_dejavu = pytest.mark.skipif(
+    not all(os.path.exists(os.path.join(DEJAVU, name)) for name in ("DejaVuSansMono.ttf", "DejaVuSans.ttf")),
+    reason=f"DejaVu fonts not installed in {DEJAVU}")
+
+# In DejaVu Sans but not in DejaVu Sans Mono
+SANS_ONLY = "※"
+
+
+def _registry():
+    return FontRegistry(font_dirs=[DEJAVU], faces={
+        'mono': ("DejaVuSansMono.ttf",),
+        'sans': ("DejaVuSans.ttf",),
+        'cjk': ("NoSuchFont-Regular.ttc",),
+    }, chain=('mono', 'sans', 'cjk'))
+
+
+@needs_dejavu
+def test_fonts_are_loaded_once_per_face_and_size():
+    registry = _registry()
+    assert registry.get_font('mono', 14) is registry.get_font('mono', 14)
+    assert registry.get_font('mono', 20) is not registry.get_font('mono', 14)
+    assert registry.loads == 2
+    assert registry.get_font('cjk', 14) is None
+    assert registry.available_faces() == ['mono', 'sans']
+
+
+@needs_dejavu
+def test_characters_resolve_along_the_chain():
+    registry = _registry()
+    assert registry.resolve("a") == 'mono'
+    assert registry.resolve(SANS_ONLY) == 'sans'
+    # Nothing covers it: drawn with the primary face
+    assert registry.resolve("ブ") == 'mono'
+
+    primary = registry.primary_font(14)
+    runs = registry.split_runs(f"ab{SANS_ONLY}cd", primary)
+    assert [run for _, run in runs] == ["ab", SANS_ONLY, "cd"]
+    assert runs[1][0] is registry.get_font('sans', 14)
+
+
+@needs_dejavu
+def test_draw_text_uses_the_fallback_glyph():
+    registry = _registry()
+    primary = registry.primary_font(14)
+
+    def ink(draw_with):
+        image = Image.new('L', (60, 30), 0)
+        draw_with(ImageDraw.Draw(image))
+        return np.asarray(image)
+
+    fallback = ink(lambda draw: registry.draw_text(draw, (5, 5), SANS_ONLY, 255, primary))
+    tofu = ink(lambda draw: draw.text((5, 5), SANS_ONLY, fill=255, font=primary))
+    assert fallback.any()
+    assert not np.array_equal(fallback, tofu)
+
+
+def test_without_font_files_the_default_font_is_used(tmp_path):
+    registry = FontRegistry(font_dirs=[str(tmp_path)])
+    assert registry.available_faces() == []
+    assert isinstance(registry.primary_font(), (ImageFont.ImageFont, ImageFont.FreeTypeFont))
+    assert registry.resolve("a") is None
@@ -0,0 +1,139 @@
+"""
+Tests for the incremental per-session renderer
+"""
+
+import io
+import zlib
+
+import numpy as np
+from PIL import Image
+
+from src.gradio.l33t import incremental
+from src.gradio.l33t.admission import AdmissionController, estimate_cost
+from src.gradio.l33t.incremental import (
+    BandedPNGEncoder,
+    ManuscriptSession,
+    SessionStore,
+    _adler32_combine,
+)
+
+TEXT = "\n\n".join(f"Paragraph {i} about phreaking" for i in range(40))
+
+
+def _pixels(image_bytes):
+    return np.asarray(Image.open(io.BytesIO(image_bytes)).convert("RGBA"))
+
+
+def _repainted_from_scratch(monkeypatch, session, text, image_bytes):
+    """Render text again on a fresh canvas, the session keeps its line decorations"""
+    with monkeypatch.context() as patch:
+        # One more line overflows the page, the session drops its canvas
+        patch.setattr(incremental, "MAX_PAGE_HEIGHT", Image.open(io.BytesIO(image_bytes)).height)
+        session.render(text + "\n\nOverflow")
+    _, full = session.render(text)
+    assert session.stats()['last_repainted_lines'] == sum(1 for line in text.split("\n") if line)
+    return full
+
+
+def test_adler32_combine_matches_zlib():
+    first, second = b"blue box " * 50, b"2600 Hz" * 31
+    combined = _adler32_combine(zlib.adler32(first), zlib.adler32(second), len(second))
+    assert combined == zlib.adler32(first + second)
+
+
+def test_banded_png_round_trips_and_reuses_clean_bands():
+    rng = np.random.default_rng(1)
+    image = Image.fromarray(rng.integers(0, 256, (300, 50, 4), dtype=np.uint8), "RGBA")
+    encoder = BandedPNGEncoder(band_rows=64)
+    assert np.array_equal(_pixels(encoder.encode(image)), np.asarray(image))
+
+    image.paste((1, 2, 3, 4), (0, 130, 50, 140))
+    before = encoder.compressed_bands
+    assert np.array_equal(_pixels(encoder.encode(image, [(130, 140)])), np.asarray(image))
+    assert encoder.compressed_bands - before == 1
+
+
+def test_one_line_edit_repaints_one_line(monkeypatch):
+    session = ManuscriptSession(seed=7)
+    _, first = session.render(TEXT)
+    assert session.last_repainted_lines == 40
+
+    edited = TEXT.replace("Paragraph 20 about", "Paragraph 20 on")
+    _, second = session.render(edited)
+    assert session.last_repainted_lines == 1
+    assert session.last_dirty_rows == 25
+
+    # Identical to painting the edited text from scratch
+    full = _repainted_from_scratch(monkeypatch, session, edited, second)
+    assert np.array_equal(_pixels(second), _pixels(full))
+    assert not np.array_equal(_pixels(first), _pixels(second))
+
+
+def test_growing_document_matches_full_render(monkeypatch):
+    session = ManuscriptSession(seed=3)
+    session.render(TEXT)
+    longer = TEXT + "\n\nOne more line\n\nAnd another"
+    _, grown = session.render(longer)
+    assert session.last_repainted_lines == 2
+
+    full = _repainted_from_scratch(monkeypatch, session, longer, grown)
+    assert np.array_equal(_pixels(grown), _pixels(full))
+
+
+def test_session_store_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2, seed=1)
+    first = store.get("a")
+    store.get("b")
+    assert store.get("a") is first
+    store.get("c")
+    assert len(store) == 2
+    assert store.get("a") is first
+    assert store.get("b") is not None and len(store) == 2
+
+
+def test_inserted_line_shifts_the_lines_below_instead_of_repainting_them(monkeypatch):
+    session = ManuscriptSession(seed=5)
+    session.render(TEXT)
+    inserted = "A new first paragraph\n\n" + TEXT
+    _, shifted = session.render(inserted)
+    assert session.last_repainted_lines == 1
+    assert session.last_shifted_lines == 40
+
+    full = _repainted_from_scratch(monkeypatch, session, inserted, shifted)
+    assert np.array_equal(_pixels(shifted), _pixels(full))
+
+
+def test_session_store_is_bounded_by_bytes():
+    store = SessionStore(max_bytes=1, seed=1)
+    store.render("a", TEXT)
+    assert store.stats()['bytes'] > 1 and len(store) == 1
+    store.render("b", TEXT)
+    assert len(store) == 1 and store.stats()['evicted'] == 1
+    assert store.get("b").renders == 1
+
+
+def test_paginated_documents_pass_admission(monkeypatch):
+    monkeypatch.setattr(incremental, "MAX_PAGE_HEIGHT", 1000)
+    admission = AdmissionController(budget=10, max_cost=1, estimator=lambda text, encoder: {'cost': 2})
+    html, _ = ManuscriptSession(seed=2).render(TEXT, admission=admission)
+    assert html.startswith("<h1>Manuscript not rendered")
+    assert admission.stats()['rejected_too_large'] == 1
+
+
+def test_repaints_pass_admission_at_their_own_cost():
+    small = "x"
+    admission = AdmissionController(max_cost=estimate_cost("\n\n".join(["x"] * 20))['cost'])
+    session = ManuscriptSession(seed=4)
+    html, _ = session.render(small, admission=admission)
+    assert not html.startswith("<h1>Manuscript not rendered")
+
+    pasted = "\n".join(f"Pasted line {i}" for i in range(700))
+    html, _ = session.render(pasted, admission=admission)
+    assert html.startswith("<h1>Manuscript not rendered")
+    assert admission.stats()['rejected_too_large'] == 1
+
+    session.render("x\n\ny", admission=admission)
+    html, _ = session.render("x\n\nz", admission=admission)
+    assert not html.startswith("<h1>Manuscript not rendered")
+    assert session.last_repainted_lines == 1
+    assert admission.stats()['admitted'] == 3
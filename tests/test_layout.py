@@ -0,0 +1,94 @@
+"""
+Tests for the text layout engine
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+from src.gradio.l33t import manuscript
+from src.gradio.l33t.layout import (
+    CANVAS_WIDTH,
+    CONTENT_BOTTOM_MARGIN,
+    TEXT_MARGIN,
+    FontMetrics,
+    get_font_metrics,
+    place_lines,
+    split_line,
+    text_width,
+)
+
+LONG_LINE = " ".join(f"phreaker{i}" for i in range(80))
+
+
+def test_wrap_fits_width_and_keeps_words():
+    metrics = get_font_metrics(manuscript._load_font())
+    segments = metrics.wrap(LONG_LINE, text_width())
+    assert len(segments) > 1
+    assert all(metrics.measure(segment) <= text_width() for segment in segments)
+    assert " ".join(segments) == LONG_LINE
+
+
+def test_overlong_word_is_split_by_character():
+    metrics = FontMetrics(manuscript._load_font())
+    word = "x" * 500
+    segments = metrics.wrap(word, 200)
+    assert "".join(segments) == word
+    assert all(metrics.measure(segment) <= 200 for segment in segments)
+
+
+def test_wraps_are_cached_per_font():
+    metrics = FontMetrics(manuscript._load_font())
+    first = metrics.wrap(LONG_LINE, 300)
+    assert metrics.wrap(LONG_LINE, 300) is first
+    assert metrics.stats()['hits'] == 1 and metrics.stats()['misses'] == 1
+
+
+def test_layout_height_is_exact():
+    font = manuscript._load_font()
+    placed, _ = place_lines(["short", "", LONG_LINE] * 10, font)
+    layout = manuscript.layout_manuscript(["short", "", LONG_LINE] * 10, font=font)
+    assert layout['height'] == placed[-1][0] + manuscript.LINE_HEIGHT + CONTENT_BOTTOM_MARGIN
+    assert len(layout['lines']) == len(placed)
+
+
+def test_wrapped_text_stays_on_canvas():
+    _, image_bytes = manuscript.create_hacker_manuscript(f"# Wrap\n\n{LONG_LINE}", seed=2, use_cache=False,
+                                                              encoder="lossless")
+    pixels = np.asarray(Image.open(io.BytesIO(image_bytes)).convert("RGB"))
+    # Pure green text pixels never reach into the right margin
+    text = (pixels[:, :, 1] == 255) & (pixels[:, :, 0] == 0)
+    assert not text[:, CANVAS_WIDTH - TEXT_MARGIN + 2:].any()
+
+
+def test_pages_respect_height_cap_with_wrapped_lines():
+    lines = [LONG_LINE] * 40
+    pages = manuscript.paginate_lines(lines, max_page_height=1500, font=manuscript._load_font())
+    assert len(pages) > 1
+    assert sum(len(page) for page in pages) == len(lines)
+    for page in pages:
+        layout = manuscript.layout_manuscript(page, font=manuscript._load_font())
+        assert layout['height'] <= 1500
+
+
+def test_line_taller_than_a_page_is_split_across_pages():
+    font = manuscript._load_font()
+    paragraph = " ".join(f"w4r3z{i}" for i in range(3000))
+    pages = manuscript.paginate_lines(["before", paragraph, "after"], max_page_height=1500, font=font)
+    assert len(pages) > 2
+    for page in pages:
+        assert manuscript.layout_manuscript(page, font=font)['height'] <= 1500
+    lines = [line for page in pages for line in page]
+    assert lines[0] == "before" and lines[-1] == "after"
+    assert " ".join(lines[1:-1]) == paragraph
+
+
+def test_split_line_keeps_hard_broken_words_whole():
+    font = manuscript._load_font()
+    word = "x" * 400
+    pieces = split_line(word, 2, font, prefixes=tuple(manuscript.LINE_PREFIXES))
+    assert "".join(pieces) == word
+    metrics = get_font_metrics(font)
+    assert all(len(metrics.wrap(prefix + piece, text_width())) <= 2
+               for piece in pieces for prefix in manuscript.LINE_PREFIXES)
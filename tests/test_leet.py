@@ -0,0 +1,50 @@
+"""
+Tests for the single-pass l33t engine
+"""
+
+import random
+
+import pytest
+
+from src.gradio.l33t.leet import (
+    get_dictionary,
+    hackerize,
+    hackerize_batch,
+    register_dictionary,
+)
+
+
+def test_full_probability_replaces_every_occurrence_once():
+    assert hackerize("attack the stack", probability=1) == "4774x 7h3 574x"
+
+
+def test_multi_character_rules_win_and_are_not_rescanned():
+    rules = register_dictionary("test-multi", {'o': '0', 'ção': 'so'})
+    assert hackerize("ação do", rules, probability=1) == "aso d0"
+
+
+def test_sampled_replacement_is_per_occurrence_and_seeded():
+    text = "a" * 10000
+    first = hackerize(text, probability=0.7, rng=random.Random(5))
+    second = hackerize(text, probability=0.7, rng=random.Random(5))
+
+    assert first == second
+    assert 0.65 < first.count('4') / len(text) < 0.75
+
+
+def test_sampled_replacement_keeps_unmatched_text_intact():
+    text = "Unicode: ñáéíóú 🔐 back\nstack"
+    result = hackerize(text, probability=0.5, rng=random.Random(1))
+    assert len(result) <= len(text)
+    assert "🔐" in result and "ñ" in result
+
+
+def test_batch_matches_items_and_order():
+    texts = ["attack", "", "hack the planet", "socket"]
+    assert hackerize_batch(texts, probability=1) == [hackerize(text, probability=1) for text in texts]
+    assert len(hackerize_batch(texts, rng=random.Random(2))) == len(texts)
+
+
+def test_unknown_dictionary_raises():
+    with pytest.raises(KeyError):
+        get_dictionary("klingon")
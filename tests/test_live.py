@@ -0,0 +1,96 @@
+"""
+Tests for the debounced live preview
+"""
+
+import asyncio
+import threading
+import time
+
+from src.gradio.l33t import live
+from src.gradio.l33t.admission import AdmissionController
+from src.gradio.l33t.live import LiveRenderer
+from src.gradio.l33t.manuscript import RenderCancelled
+
+
+def _slow_renderer(monkeypatch, started):
+    """Replace the render with one that runs until it is cancelled or released"""
+    release = threading.Event()
+
+    def slow_render(markdown_text, hacker_groups, group_theme, seed=None, encoder=None, cancel=None):
+        started.append(markdown_text)
+        while not release.is_set():
+            if cancel.is_set():
+                raise RenderCancelled("cancelled")
+            time.sleep(0.005)
+        return markdown_text, b"png"
+
+    monkeypatch.setattr(live, "render_manuscript", slow_render)
+    return release
+
+
+def test_burst_of_edits_renders_only_the_last():
+    renderer = LiveRenderer(delay=0.05)
+
+    async def typing():
+        tasks = []
+        for i in range(5):
+            tasks.append(asyncio.ensure_future(renderer.render("s", f"# live burst {i}")))
+            await asyncio.sleep(0.01)
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(typing())
+    assert results[:4] == [None] * 4
+    assert results[4] is not None and "4" in results[4][0]
+    stats = renderer.stats()
+    assert stats['debounced'] == 4
+    assert stats['started'] == 1 and stats['completed'] == 1
+
+
+def test_new_edit_cancels_running_render(monkeypatch):
+    started = []
+    release = _slow_renderer(monkeypatch, started)
+    renderer = LiveRenderer(delay=0.0)
+
+    async def edit_while_rendering():
+        first = asyncio.ensure_future(renderer.render("s", "first edit"))
+        while not started:
+            await asyncio.sleep(0.005)
+        second = asyncio.ensure_future(renderer.render("s", "second edit"))
+        while len(started) < 2:
+            await asyncio.sleep(0.005)
+        release.set()
+        return await first, await second
+
+    first, second = asyncio.run(edit_while_rendering())
+    assert first is None
+    assert second == ("second edit", b"png")
+    stats = renderer.stats()
+    assert stats['cancelled'] == 1
+    assert stats['peak_session_active'] == 1
+    assert stats['active'] == 0
+
+
+def test_sessions_do_not_cancel_each_other(monkeypatch):
+    started = []
+    release = _slow_renderer(monkeypatch, started)
+    renderer = LiveRenderer(delay=0.0)
+
+    async def two_visitors():
+        first = asyncio.ensure_future(renderer.render("a", "visitor a"))
+        second = asyncio.ensure_future(renderer.render("b", "visitor b"))
+        while len(started) < 2:
+            await asyncio.sleep(0.005)
+        release.set()
+        return await first, await second
+
+    assert asyncio.run(two_visitors()) == (("visitor a", b"png"), ("visitor b", b"png"))
+    assert renderer.stats()['cancelled'] == 0
+
+
+def test_live_renders_pass_admission():
+    admission = AdmissionController(budget=10, max_cost=1, estimator=lambda text, encoder: {'cost': 2})
+    renderer = LiveRenderer(delay=0.0, admission=admission)
+    html, _ = asyncio.run(renderer.render("s", "# t00 b1g f0r l1v3"))
+    assert html.startswith("<h1>Manuscript not rendered")
+    assert renderer.stats()['rejected'] == 1 and renderer.stats()['started'] == 0
+    assert admission.stats()['rejected_too_large'] == 1
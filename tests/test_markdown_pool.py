@@ -0,0 +1,47 @@
+"""
+Tests for the pooled markdown parser and tree text extraction
+"""
+
+import threading
+
+import markdown
+
+from src.gradio.l33t.markdown_pool import MarkdownPool, convert_markdown
+
+
+def test_html_matches_markdown_module():
+    text = "# Title\n\nSome *emphasis* and `code`.\n\n- one\n- two\n"
+    html_content, _ = convert_markdown(text)
+    assert html_content == markdown.markdown(text)
+
+
+def test_plain_text_decodes_entities_and_raw_html():
+    text = "Tom & Jerry &copy; `a < b`\n\n<div>raw <b>html</b> &amp; more</div>\n"
+    _, plain_text = convert_markdown(text)
+    assert plain_text.split('\n') == ["Tom & Jerry © a < b", "raw html & more"]
+
+
+def test_autolinks_become_their_address():
+    _, plain_text = convert_markdown("Mail <me@x.com> now, see <https://x.com/?a=1&b=2>\n\n`&amp;`")
+    assert plain_text.split('\n') == ["Mail me@x.com now, see https://x.com/?a=1&b=2", "&amp;"]
+
+
+def test_blocks_become_lines_with_list_markers():
+    text = "# Head\n\n- a\n- b\n\nPara\n\n1. x\n2. y\n\n---\n\nEnd"
+    _, plain_text = convert_markdown(text)
+    assert plain_text.split('\n') == ["Head", "- a", "- b", "Para", "1. x", "2. y", "", "End"]
+
+
+def test_pool_reuses_one_parser_per_thread():
+    pool = MarkdownPool()
+    for _ in range(5):
+        assert pool.convert("[link](http://x) text")[1] == "link text"
+    assert pool.created == 1
+
+    def worker():
+        pool.convert("*thread*")
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+    assert pool.created == 2
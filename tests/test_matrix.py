@@ -0,0 +1,55 @@
+"""
+Tests for the glyph-atlas matrix background engine
+"""
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter
+
+from src.gradio.l33t.fonts import MATRIX_FONT_SIZE, fallback_font, get_font_registry
+from src.gradio.l33t.matrix import (
+    MATRIX_CHARACTERS,
+    composite_matrix_field,
+    get_glyph_atlas,
+    plan_matrix_field,
+    render_matrix_field,
+)
+
+
+def test_render_matrix_field_size_and_mode():
+    image = render_matrix_field(800, 400)
+    assert image.mode == 'RGBA'
+    assert image.size == (800, 400)
+
+
+def test_render_matrix_field_is_reproducible_for_a_generator_seed():
+    first = render_matrix_field(200, 400, np_rng=np.random.default_rng(7))
+    second = render_matrix_field(200, 400, np_rng=np.random.default_rng(7))
+    assert first.tobytes() == second.tobytes()
+
+
+def test_atlas_matches_per_glyph_pillow_rendering():
+    width, height = 400, 2000
+    atlas = get_glyph_atlas()
+    plan = plan_matrix_field(width, height, np.random.default_rng(3), len(MATRIX_CHARACTERS))
+
+    # Only the first lap: overlapping wrap-around rows are order dependent
+    first_lap = plan['lap'] == 0
+    plan = {key: value[first_lap] for key, value in plan.items()}
+
+    pad = 32
+    green = np.zeros((height + 2 * pad, width + 2 * pad), dtype=np.uint8)
+    alpha = np.full_like(green, 255)
+    composite_matrix_field(green, alpha, pad, plan, atlas)
+
+    reference = Image.new('RGBA', (width, height), color=(0, 0, 0, 255))
+    draw = ImageDraw.Draw(reference)
+    font = get_font_registry().primary_font(MATRIX_FONT_SIZE)
+    for x, y, opacity, shade, char in zip(plan['x'], plan['y'], plan['opacity'], plan['green'], plan['char']):
+        glyph = MATRIX_CHARACTERS[char]
+        draw.text((int(x), int(y)), glyph, fill=(0, int(shade), 0, int(opacity)), font=fallback_font(font, glyph))
+    reference = np.asarray(reference.filter(ImageFilter.GaussianBlur(radius=1)), dtype=np.int32)
+
+    # Ignore the outermost pixels, where Pillow's blur extends the edges
+    inner = (slice(pad + 4, pad + height - 4), slice(pad + 4, pad + width - 4))
+    assert np.abs(reference[4:-4, 4:-4, 1] - green[inner].astype(np.int32)).max() <= 3
+    assert np.abs(reference[4:-4, 4:-4, 3] - alpha[inner].astype(np.int32)).max() <= 3
@@ -0,0 +1,71 @@
+"""
+Tests for the per-request memory accounting
+"""
+
+import asyncio
+import logging
+
+import pytest
+
+from src.gradio.l33t import memory
+from src.gradio.l33t.async_manuscript import create_hacker_manuscript_async
+from src.gradio.l33t.manuscript import CANVAS_WIDTH, create_hacker_manuscript
+
+MARKDOWN = "# Memory\n\n" + "Some text to draw\n\n" * 20
+
+
+@pytest.fixture
+def accounting():
+    memory.reset_memory_stats()
+    memory.enable_memory_accounting(threshold_mb=memory.DEFAULT_THRESHOLD_MB)
+    yield
+    memory.enable_memory_accounting(False, threshold_mb=memory.DEFAULT_THRESHOLD_MB)
+    memory.reset_memory_stats()
+
+
+def test_render_notes_every_intermediate_image(accounting):
+    with memory.account_request("test") as account:
+        _, image_bytes = create_hacker_manuscript(MARKDOWN, {}, use_cache=False)
+    labels = {label for label, _, _, _ in account.canvases}
+    assert "background" in labels
+    assert account.canvas_bytes >= CANVAS_WIDTH * 400 * 4
+    assert account.output_bytes == len(image_bytes)
+    assert account.peak_bytes > 0
+    assert memory.memory_stats()['requests'] == 1
+
+
+def test_requests_over_the_threshold_log_top_sites(accounting, caplog):
+    memory.enable_memory_accounting(threshold_mb=0.01, top_sites=3)
+    with caplog.at_level(logging.WARNING, logger=memory.__name__):
+        with memory.account_request("big") as account:
+            blocks = [bytearray(64 * 1024) for _ in range(8)]
+            memory.note_canvas("test", 100, 100)
+            del blocks
+    assert 0 < len(account.top_sites) <= 3
+    assert any(site.startswith(__file__) for site, _, _ in account.top_sites)
+    assert "memory threshold" in caplog.text
+    assert memory.memory_stats()['over_threshold'] == 1
+
+
+def test_requests_over_by_canvases_alone_log_top_sites(accounting):
+    memory.enable_memory_accounting(threshold_mb=1)
+    with memory.account_request("canvases") as account:
+        memory.note_canvas("test", 1000, 1000)
+    assert account.peak_bytes < 1024 * 1024 < account.canvas_bytes
+    assert account.top_sites
+    assert memory.memory_stats()['over_threshold'] == 1
+
+
+def test_async_stages_add_to_the_request_account(accounting, caplog):
+    with caplog.at_level(logging.DEBUG, logger=memory.__name__):
+        asyncio.run(create_hacker_manuscript_async(MARKDOWN, {}, use_cache=False))
+    assert memory.memory_stats()['requests'] == 1
+    assert memory.memory_stats()['max_canvas_bytes'] >= CANVAS_WIDTH * 400 * 4
+    assert memory.memory_stats()['max_output_bytes'] > 0
+
+
+def test_disabled_accounting_is_a_no_op():
+    with memory.account_request("off") as account:
+        memory.note_canvas("test", 10, 10)
+    assert account is None
+    assert memory.current_account() is None
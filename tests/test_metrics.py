@@ -0,0 +1,85 @@
+"""
+Tests for the render metrics
+"""
+
+import asyncio
+
+import pytest
+
+from src.gradio.l33t import manuscript, metrics
+from src.gradio.l33t.live import LiveRenderer
+
+GROUPS = {"L0PHT": {"name": "L0pht Heavy Industries", "emoji": "🔐", "era": "Late 1990s",
+                   "members": ["Mudge", "Space Rogue"]}}
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset_metrics()
+    metrics.enable_metrics()
+    yield metrics.get_metrics()
+    metrics.enable_metrics(False)
+    metrics.reset_metrics()
+
+
+def test_render_records_every_stage(enabled):
+    manuscript.create_hacker_manuscript("# Metrics\n\nSome text", GROUPS, "L0PHT", use_cache=False)
+    for stage in ("parse", "hackerize", "paginate", "layout", "background", "draw", "encode"):
+        assert enabled.stage_seconds.count(stage) == 1
+    assert enabled.requests.value("rendered") == 1
+    assert enabled.canvas_pixels.count() == 1
+    assert enabled.bytes_out.value() > 0
+
+
+def test_strip_render_records_one_sample_per_stage(enabled):
+    layout = manuscript.layout_manuscript(["line"] * 10, None)
+    manuscript.render_manuscript_png(layout, render_mode="strips", strip_height=64)
+    assert enabled.stage_seconds.count("draw") == 1
+    assert enabled.stage_seconds.count("encode") == 1
+
+
+def test_errors_are_counted_by_type(enabled):
+    def broken(*args):
+        raise ValueError("boom")
+
+    html, image_bytes = manuscript.create_hacker_manuscript("# x", GROUPS, renderer=broken, use_cache=False)
+    assert html.startswith("<h1>Error")
+    assert image_bytes
+    assert enabled.errors.value("ValueError") == 1
+    assert enabled.requests.value("error") == 1
+
+
+def test_exposition_format(enabled):
+    with metrics.span("parse"):
+        pass
+    metrics.record_request("cached", 0.01, b"png")
+    text = enabled.render()
+    assert "# TYPE h4x0r_stage_seconds histogram" in text
+    assert 'h4x0r_stage_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert 'h4x0r_stage_seconds_count{stage="parse"} 1' in text
+    assert 'h4x0r_manuscript_requests_total{outcome="cached"} 1' in text
+    assert "h4x0r_manuscript_bytes_out_total 3" in text
+
+
+def test_disabled_metrics_record_nothing():
+    metrics.reset_metrics()
+    assert metrics.span("parse") is metrics.stage_clock()
+    manuscript.create_hacker_manuscript("# Quiet", GROUPS, use_cache=False)
+    assert metrics.get_metrics().stage_seconds.count("parse") == 0
+    assert metrics.get_metrics().requests.value("rendered") == 0
+
+
+def test_metrics_response(enabled):
+    metrics.record_error(KeyError("x"))
+    response = metrics.metrics_response()
+    assert response.media_type == metrics.PROMETHEUS_CONTENT_TYPE
+    assert b'h4x0r_manuscript_errors_total{type="KeyError"} 1' in response.body
+
+
+def test_live_renders_are_recorded_like_convert_requests(enabled):
+    renderer = LiveRenderer(GROUPS, delay=0.0)
+    result = asyncio.run(renderer.render("s", "# Live metrics", "L0PHT"))
+    assert result is not None
+    assert enabled.requests.value("rendered") == 1
+    assert asyncio.run(renderer.render("s", "# Live metrics", "L0PHT")) == result
+    assert enabled.requests.value("cached") == 1
@@ -0,0 +1,104 @@
+"""
+Tests for the SQLite museum catalog
+"""
+
+import random
+import threading
+
+import pytest
+
+from museum_catalog import MuseumCatalog, load_museum_data, parse_years, rating_score
+from museum_registry import Achievement, HackerGroup, MuseumRegistry
+
+
+@pytest.fixture
+def catalog():
+    catalog = load_museum_data(MuseumCatalog())
+    yield catalog
+    catalog.close()
+
+
+def test_years_and_ratings_parse():
+    assert parse_years("1992-2000") == (1992, 2000)
+    assert parse_years("Early 1990s") == (1990, 1999)
+    assert parse_years("2000s-2010s") == (2000, 2019)
+    assert parse_years(1998) == (1998, 1998)
+    assert parse_years("unknown") == (None, None)
+    assert rating_score("A+") > rating_score("A") > rating_score("A-") > rating_score("B+")
+    assert rating_score("Z") is None
+
+
+def test_loader_imports_every_module_record(catalog):
+    registry = MuseumRegistry.load()
+    assert catalog.stats() == {
+        'groups': len(registry.groups),
+        'incidents': len(registry.incidents),
+        'achievements': len(registry.achievements),
+        'collections': len(registry.collections),
+    }
+    assert catalog.group("LOD")["members"] == ["Erik Bloodaxe", "The Mentor", "Lex Luthor"]
+    assert catalog.collection("Historical H4X0R Tools")["includes"] == ["L0phtCrack", "POCSAG Decoder",
+                                                                       "Black ICE"]
+
+
+def test_queries_filter_by_year_group_era_and_rating(catalog):
+    assert [incident["year"] for incident in catalog.incidents(group="BR", year_from=2013, year_to=2016)] == [
+        2013, 2016]
+    assert [incident["year"] for incident in catalog.incidents(era="2010s", limit=2)] == [2011, 2013]
+    achievements = catalog.achievements(group="L0PHT")
+    assert [achievement["year_label"] for achievement in achievements] == ["1992-2000", "1992", "1998"]
+    assert achievements[2]["quote"] == "We could shut down the entire Internet in 30 minutes"
+    assert {group["key"] for group in catalog.groups(active_in=2011)} >= {"BR.Gov", "LulzSec BR"}
+    assert "MOD" in {group["key"] for group in catalog.groups(era="1990s")}
+    assert "LulzSec BR" not in {group["key"] for group in catalog.groups(era="1980s")}
+    assert {collection["preservation_rating"] for collection in catalog.collections(rating="A+")} == {"A+"}
+    assert len(catalog.collections(min_rating="A")) == 4
+    assert catalog.collections(min_rating="A+")[0]["preservation_rating"] == "A+"
+
+
+def test_file_catalog_is_loaded_once(tmp_path):
+    path = str(tmp_path / "museum.db")
+    catalogs = [MuseumCatalog(path) for _ in range(4)]
+    threads = [threading.Thread(target=load_museum_data, args=(catalog,), kwargs={'if_empty': True})
+               for catalog in catalogs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    reopened = MuseumCatalog(path)
+    assert reopened.stats() == load_museum_data(MuseumCatalog()).stats()
+    for catalog in catalogs + [reopened]:
+        catalog.close()
+
+
+def test_failed_transactions_roll_back(catalog):
+    before = catalog.stats()
+    with pytest.raises(RuntimeError):
+        with catalog.transaction():
+            catalog.clear()
+            catalog.add_events('achievement', [Achievement(2000, "Half done", "", "L0PHT")])
+            raise RuntimeError("import failed")
+    assert catalog.stats() == before
+
+
+def test_era_queries_match_a_full_scan():
+    catalog = MuseumCatalog()
+    rng = random.Random(4)
+    groups = []
+    for index in range(300):
+        start = rng.randrange(1970, 2020)
+        groups.append(HackerGroup(f"G{index}", f"Group {index}", "💾", "", f"{start}-{start + rng.randrange(0, 12)}"))
+    catalog.add_groups(groups)
+    # Replacing a group moves it in the year index too
+    catalog.add_groups([HackerGroup("G0", "Group 0", "💾", "", "1950")])
+
+    everything = catalog.groups(limit=1000)
+    for era, active_in in (("1990s", None), ("2020s", None), (None, 1950), (None, 2025), ("1990s", 1995)):
+        start, end = parse_years(era) if era else (active_in, active_in)
+        if active_in is not None:
+            start, end = max(start, active_in), min(end, active_in)
+        expected = [group["key"] for group in everything
+                    if group["era_start"] <= end and group["era_end"] >= start]
+        assert [group["key"] for group in catalog.groups(era, active_in, limit=1000)] == expected
+        assert [group["key"] for group in catalog.groups(era, active_in, limit=5)] == expected[:5]
+    catalog.close()
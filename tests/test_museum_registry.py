@@ -0,0 +1,55 @@
+"""
+Tests for the museum data registry
+"""
+
+import dataclasses
+import pickle
+
+import pytest
+
+from brazilian_module import get_br_hacker_data
+from lopht_module import get_lopht_data
+from museum_registry import BASE_GROUPS, MuseumRegistry, get_museum_registry
+
+
+def test_registry_is_loaded_once():
+    assert get_museum_registry() is get_museum_registry()
+
+
+def test_groups_and_collections_are_indexed():
+    registry = MuseumRegistry.load()
+    assert list(registry.groups) == list(BASE_GROUPS) + list(get_br_hacker_data()["groups"]) + ["L0PHT"]
+    lopht = registry.group("L0PHT")
+    assert lopht.era == get_lopht_data()["years_active"]
+    assert lopht.members[0] == "Brian Oblivion"
+    assert registry.group("BR.Gov").leet == "pt-br"
+    assert registry.group("N0NE") is None
+    assert registry.collection("Historical H4X0R Tools").includes == ("L0phtCrack", "POCSAG Decoder", "Black ICE")
+    assert registry.collection("Hacker Manifesto Originals").preservation_rating == "A"
+    assert len(registry.incidents) == len(get_br_hacker_data()["incidents"])
+    assert registry.achievements[0].quote == "We could shut down the entire Internet in 30 minutes"
+
+
+def test_records_are_read_only():
+    registry = MuseumRegistry.load()
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        registry.group("MOD").name = "M0D"
+    with pytest.raises(TypeError):
+        registry.groups["MOD"] = None
+    with pytest.raises(TypeError):
+        registry.sources["lopht_data"]["name"] = "L0pht"
+    assert not hasattr(registry.group("MOD"), "__dict__")
+
+
+def test_renderer_views_are_plain_copies():
+    registry = MuseumRegistry.load()
+    groups = registry.hacker_groups()
+    assert groups["MOD"] == BASE_GROUPS["MOD"]
+    assert groups["LulzSec BR"]["leet"] == "pt-br"
+    assert pickle.loads(pickle.dumps(groups)) == groups
+    groups["MOD"]["members"].append("Someone")
+    assert "Someone" not in registry.group("MOD").members
+
+    sources = registry.data_sources()
+    assert sources["br_data"]["incidents"][0]["year"] == 2011
+    assert sources["webarchive_data"]["collections"][1].get("url", "N/A") == "N/A"
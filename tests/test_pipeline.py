@@ -0,0 +1,75 @@
+"""
+Tests for the manuscript pipeline as a whole
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from src.gradio.l33t.manuscript import create_hacker_manuscript, derive_seed
+from src.gradio.l33t.render_cache import RenderCache, configure_render_cache
+
+GROUPS = {
+    "L0PHT": {
+        "name": "L0pht Heavy Industries",
+        "emoji": "🔐",
+        "description": "Created L0phtCrack and testified to Congress",
+        "members": ["Mudge", "Space Rogue", "Weld Pond", "Kingpin"],
+        "era": "Late 1990s"
+    }
+}
+
+SAMPLE = "# L0pht Test\n\nTesting with the L0pht theme\n\n- attack\n- stack"
+
+
+def test_identical_requests_give_identical_images():
+    first = create_hacker_manuscript(SAMPLE, GROUPS, "L0PHT")
+    second = create_hacker_manuscript(SAMPLE, GROUPS, "L0PHT")
+    assert first == second
+
+
+def test_seed_depends_on_content_and_group():
+    assert derive_seed(SAMPLE, "L0PHT") == derive_seed(SAMPLE, "L0PHT")
+    assert derive_seed(SAMPLE, "L0PHT") != derive_seed(SAMPLE, None)
+    assert derive_seed(SAMPLE, "L0PHT") != derive_seed(SAMPLE + "!", "L0PHT")
+
+
+def test_explicit_seed_overrides_the_derived_one():
+    assert create_hacker_manuscript(SAMPLE, seed=1) == create_hacker_manuscript(SAMPLE, seed=1)
+    assert create_hacker_manuscript(SAMPLE, seed=1)[1] != create_hacker_manuscript(SAMPLE, seed=2)[1]
+
+
+def test_parallel_renders_match_serial_renders():
+    texts = [f"# Doc {i}\n\n" + "hack the planet\n" * (i + 1) for i in range(8)]
+    serial = [create_hacker_manuscript(text) for text in texts]
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        parallel = list(executor.map(create_hacker_manuscript, texts))
+
+    assert parallel == serial
+
+
+def test_render_cache_serves_repeated_requests():
+    cache = configure_render_cache()
+
+    first = create_hacker_manuscript(SAMPLE, GROUPS, "L0PHT")
+    second = create_hacker_manuscript(SAMPLE, GROUPS, "L0PHT")
+    create_hacker_manuscript(SAMPLE, GROUPS, "L0PHT", use_cache=False)
+
+    assert first == second
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+    assert cache.stats()['entries'] == 1
+
+
+def test_render_cache_evicts_by_bytes_and_expires_by_ttl():
+    now = [0.0]
+    cache = RenderCache(max_bytes=100, ttl=10, clock=lambda: now[0])
+
+    cache.put("a", ("<p>a</p>", b"x" * 40))
+    cache.put("b", ("<p>b</p>", b"x" * 40))
+    cache.put("c", ("<p>c</p>", b"x" * 40))
+    assert cache.get("a") is None
+    assert cache.stats()['evictions'] == 1
+
+    now[0] = 11.0
+    assert cache.get("c") is None
+    assert cache.stats()['expirations'] == 1
@@ -0,0 +1,129 @@
+"""
+Tests for the adaptive quality tiers
+"""
+
+import asyncio
+import time
+
+import numpy as np
+
+from src.gradio.l33t import metrics
+from src.gradio.l33t.matrix import COLUMN_STEP, plan_matrix_field
+from src.gradio.l33t.quality import DEFAULT_TIERS, QualityController
+from src.gradio.l33t.render_cache import get_render_cache_stats
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sparser_tiers_plan_fewer_glyphs():
+    full = plan_matrix_field(800, 400, np.random.default_rng(1), 10)
+    sparse = plan_matrix_field(800, 400, np.random.default_rng(1), 10, column_step=4 * COLUMN_STEP)
+    assert len(sparse['x']) < len(full['x'])
+
+
+def test_level_for_counts_reached_thresholds():
+    quality = QualityController(depth_levels=(4, 8), latency_levels=(2.0, 5.0))
+    assert quality.level_for(1) == 0
+    assert quality.level_for(4) == 1
+    assert quality.level_for(1, p95=6.0) == 2
+    assert quality.level_for(100, p95=100.0) == len(DEFAULT_TIERS) - 1
+
+
+def test_depth_degrades_at_once_and_recovers_step_by_step():
+    clock = FakeClock()
+    quality = QualityController(depth_levels=(2, 3), latency_levels=(), recovery_seconds=10, clock=clock)
+    with quality.track() as first, quality.track() as second, quality.track() as third:
+        assert [first.name, second.name, third.name] == ["full", "reduced", "plain"]
+    with quality.track() as tier:
+        assert tier.name == "plain"
+    clock.now = 11
+    with quality.track() as tier:
+        assert tier.name == "reduced"
+    clock.now = 22
+    with quality.track() as tier:
+        assert tier.name == "full"
+    assert quality.stats()['served'] == {"full": 2, "reduced": 2, "plain": 2}
+
+
+def test_slow_requests_degrade_by_p95():
+    clock = FakeClock()
+    quality = QualityController(depth_levels=(), latency_levels=(1.0,), clock=clock)
+    for _ in range(5):
+        with quality.track():
+            quality.observe(1.5)
+    assert quality.p95() == 1.5
+    with quality.track() as tier:
+        assert tier.name == "reduced"
+
+
+def test_only_render_time_is_sampled():
+    quality = QualityController(depth_levels=(), latency_levels=())
+    samples = []
+    quality.observe = samples.append
+    quality.create_hacker_manuscript("# s4mpl3", {}, seed=1)
+    quality.create_hacker_manuscript("# s4mpl3", {}, seed=1)
+    assert len(samples) == 1
+
+    async def slow_consumer():
+        async for _ in quality.create_hacker_manuscript_progressive("\n".join(["line"] * 80), {},
+                                                                     use_cache=False):
+            await asyncio.sleep(0.5)
+
+    start = time.perf_counter()
+    asyncio.run(slow_consumer())
+    assert len(samples) == 2
+    assert samples[-1] <= time.perf_counter() - start - 0.5
+
+
+def test_degraded_requests_use_the_full_quality_cache_first():
+    text = "# full or n0th1ng"
+    full_html, full_image = QualityController().create_hacker_manuscript(text, {}, seed=3)
+    busy = QualityController(depth_levels=(0,), latency_levels=())
+    busy.create_hacker_manuscript("# w4rm", {}, use_cache=False)
+    assert busy.tier.name == "reduced"
+
+    assert busy.create_hacker_manuscript(text, {}, seed=3) == (full_html, full_image)
+    results = busy.create_hacker_manuscripts([text, "# m1ss"], {}, seed=3)
+    assert results[0] == (full_html, full_image)
+    assert "<!-- quality tier: reduced -->" in results[1][0]
+
+
+def test_degraded_miss_counts_once():
+    busy = QualityController(depth_levels=(0,), latency_levels=())
+    busy.create_hacker_manuscript("# w4rm", {}, use_cache=False)
+    misses = get_render_cache_stats()['misses']
+    busy.create_hacker_manuscript("# n0t c4ch3d y3t", {}, seed=4)
+    assert get_render_cache_stats()['misses'] == misses + 1
+
+
+def test_responses_report_their_tier():
+    metrics.reset_metrics()
+    metrics.enable_metrics()
+    try:
+        quality = QualityController(depth_levels=(1,), latency_levels=())
+        html, image_bytes = quality.create_hacker_manuscript("# t13r", {}, use_cache=False)
+        assert "<!-- quality tier: reduced -->" in html
+        assert "reduced quality" in html
+        assert image_bytes.startswith(b"\x89PNG")
+        assert metrics.get_metrics().quality_tier.value("reduced") == 1
+    finally:
+        metrics.enable_metrics(False)
+        metrics.reset_metrics()
+
+
+def test_progressive_render_reports_the_full_tier():
+    quality = QualityController()
+
+    async def collect():
+        return [result async for result in quality.create_hacker_manuscript_progressive("# full", {},
+                                                                                        use_cache=False)]
+
+    results = asyncio.run(collect())
+    assert results[-1][0] == "<h1>full</h1>\n<!-- quality tier: full -->"
+    assert quality.stats()['active'] == 0
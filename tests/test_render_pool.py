@@ -0,0 +1,88 @@
+"""
+Tests for the manuscript render process pool
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.gradio.l33t.background_pool import configure_background_pool, get_background_pool
+from src.gradio.l33t.manuscript import render_manuscript
+from src.gradio.l33t.render_pool import RenderProcessPool, RenderQueueFull, RenderTimeout, RenderWorkerError
+
+SLOW_TEXT = "\n".join("x" * 60 for _ in range(400))
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = RenderProcessPool(workers=1, max_pending=0, timeout=60, warm_heights=()).start()
+    yield pool
+    pool.stop()
+
+
+def test_worker_renders_the_same_bytes(pool):
+    assert pool.render("# p00l\n\nt3xt", seed=7) == render_manuscript("# p00l\n\nt3xt", seed=7)
+
+
+def test_full_queue_rejects_requests(pool):
+    worker = threading.Thread(target=pool.render, args=(SLOW_TEXT,), kwargs={'seed': 1})
+    worker.start()
+    time.sleep(0.1)
+    with pytest.raises(RenderQueueFull):
+        pool.render("# n0 r00m")
+    # Visitors get the rejection notice, not the failure image
+    html_content, _ = pool.create_hacker_manuscript("# n0 r00m", use_cache=False)
+    worker.join()
+    assert "Manuscript not rendered" in html_content
+    assert pool.stats()['rejected'] == 2
+
+
+def test_timeout_kills_and_replaces_the_worker(pool):
+    with pytest.raises(RenderTimeout):
+        pool.render(SLOW_TEXT, seed=2, timeout=0.05)
+    assert pool.stats()['restarts'] == 1
+
+    html_content, _ = pool.create_hacker_manuscript("# b4ck", use_cache=False)
+    assert "b4ck" in html_content
+
+
+def test_failed_warm_up_is_retried_and_does_not_hang_requests():
+    # A warm height the background pool rejects makes every warm-up fail
+    pool = RenderProcessPool(workers=1, max_pending=0, timeout=60, warm_heights=("broken",),
+                             respawn_delay=0.05).start(wait=False)
+    try:
+        with pytest.raises(RenderWorkerError):
+            pool.render("# n0 w0rk3r")
+        deadline = time.monotonic() + 60
+        while pool.stats()['restarts'] < 1 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert pool.stats()['restarts'] >= 1
+    finally:
+        pool.stop()
+
+
+def test_waiting_for_a_worker_counts_against_the_timeout():
+    pool = RenderProcessPool(workers=1, max_pending=1, timeout=60, warm_heights=()).start()
+    worker = threading.Thread(target=pool.render, args=(SLOW_TEXT,), kwargs={'seed': 3})
+    try:
+        worker.start()
+        time.sleep(0.1)
+        start = time.monotonic()
+        with pytest.raises(RenderTimeout):
+            pool.render("# qu3u3d", timeout=0.2)
+        assert time.monotonic() - start < 1
+    finally:
+        worker.join()
+        pool.stop()
+
+
+def test_workers_use_the_parent_background_configuration():
+    previous = get_background_pool().options()
+    configure_background_pool(**dict(previous, seed=1234, variants=1, warm_heights=()))
+    pool = RenderProcessPool(workers=1, max_pending=0, timeout=60, warm_heights=()).start()
+    try:
+        assert pool.render("# s33d", seed=5) == render_manuscript("# s33d", seed=5)
+    finally:
+        pool.stop()
+        configure_background_pool(**previous)
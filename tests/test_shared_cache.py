@@ -0,0 +1,168 @@
+"""
+Tests for the shared render cache and the multi-worker front
+"""
+
+import asyncio
+import multiprocessing
+import os
+
+import pytest
+
+from src.gradio.l33t import render_cache
+from src.gradio.l33t.manuscript import create_hacker_manuscript
+from src.gradio.l33t.serving import StickyProxy
+from src.gradio.l33t.shared_cache import SharedRenderCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _store(path, key, value):
+    SharedRenderCache(path).put(key, value)
+
+
+def test_round_trip_maps_the_image(tmp_path):
+    cache = SharedRenderCache(tmp_path)
+    assert cache.get("k3y") is None
+    cache.put("k3y", ("<h1>h1</h1>", b"\x89PNG image"))
+    html, image = cache.get("k3y")
+    assert html == "<h1>h1</h1>"
+    assert isinstance(image, memoryview)
+    assert image.readonly
+    assert image == b"\x89PNG image"
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (1, 1, 1)
+    assert stats['bytes'] == len("<h1>h1</h1>") + len(b"\x89PNG image")
+
+
+def test_renders_of_another_process_are_visible(tmp_path):
+    process = multiprocessing.get_context("fork").Process(
+        target=_store, args=(str(tmp_path), "sh4red", ("<p>w0rk3r</p>", b"from a worker")))
+    process.start()
+    process.join(10)
+    assert process.exitcode == 0
+    assert SharedRenderCache(tmp_path).get("sh4red") == ("<p>w0rk3r</p>", b"from a worker")
+
+
+def test_least_recently_used_renders_are_evicted(tmp_path):
+    cache = SharedRenderCache(tmp_path, max_bytes=250)
+    for index, key in enumerate(("a", "b", "c")):
+        cache.put(key, ("", bytes(100)))
+        # Distinct modification times regardless of the file system's resolution
+        os.utime(tmp_path / f"{key}.render", (index, index))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    cache.put("d", ("", bytes(100)))
+    assert cache.get("c") is None
+    assert cache.get("b") is not None
+    assert cache.stats()['evictions'] == 2
+    assert cache.stats()['bytes'] <= 250
+
+
+def test_puts_under_the_bound_do_not_scan_the_store(tmp_path, monkeypatch):
+    cache = SharedRenderCache(tmp_path, max_bytes=250)
+    cache.put("a", ("", bytes(100)))
+    scans = []
+    scandir = os.scandir
+    monkeypatch.setattr(os, "scandir", lambda path: scans.append(path) or scandir(path))
+    cache.put("b", ("", bytes(100)))
+    assert scans == []
+    cache.put("c", ("", bytes(100)))
+    assert len(scans) == 1
+    monkeypatch.undo()
+    assert cache.stats()['bytes'] == 200
+
+
+def test_mapped_image_survives_eviction(tmp_path):
+    cache = SharedRenderCache(tmp_path)
+    cache.put("k3pt", ("", b"still readable"))
+    _, image = cache.get("k3pt")
+    SharedRenderCache(tmp_path).clear()
+    assert cache.get("k3pt") is None
+    assert bytes(image) == b"still readable"
+
+
+def test_expired_renders_are_dropped(tmp_path):
+    clock = FakeClock()
+    cache = SharedRenderCache(tmp_path, ttl=10, clock=clock)
+    cache.put("0ld", ("", b"x"))
+    clock.now += 11
+    assert cache.get("0ld") is None
+    assert cache.stats()['expirations'] == 1
+    assert cache.stats()['entries'] == 0
+
+
+def test_expiry_keeps_an_entry_rewritten_meanwhile(tmp_path):
+    SharedRenderCache(tmp_path, clock=lambda: 1000.0).put("r4ce", ("", b"old"))
+    writer = SharedRenderCache(tmp_path, clock=lambda: 1011.0)
+    calls = []
+
+    def racing_clock():
+        # Another worker expires and re-renders the entry while this one reads it
+        if not calls:
+            os.unlink(tmp_path / "r4ce.render")
+            writer.put("r4ce", ("", b"new"))
+        calls.append(None)
+        return 1011.0
+
+    assert SharedRenderCache(tmp_path, ttl=10, clock=racing_clock).get("r4ce") is None
+    assert writer.get("r4ce") == ("", b"new")
+
+
+def test_manuscripts_are_served_from_the_shared_cache(tmp_path):
+    previous = render_cache.get_render_cache()
+    render_cache.install_render_cache(SharedRenderCache(tmp_path))
+    try:
+        first = create_hacker_manuscript("# sh4r3d", {})
+        second = create_hacker_manuscript("# sh4r3d", {})
+        assert isinstance(second[1], memoryview)
+        assert second == first
+        assert render_cache.get_render_cache_stats()['hits'] == 1
+    finally:
+        render_cache.install_render_cache(previous)
+
+
+def test_proxy_keeps_clients_on_one_worker_and_fails_over():
+    async def scenario():
+        async def serve(name):
+            async def reply(reader, writer):
+                await reader.read(100)
+                writer.write(name)
+                await writer.drain()
+                writer.close()
+            return await asyncio.start_server(reply, '127.0.0.1', 0)
+
+        servers = [await serve(b"w0"), await serve(b"w1")]
+        ports = [server.sockets[0].getsockname()[1] for server in servers]
+        proxy = await StickyProxy([('127.0.0.1', port) for port in ports], port=0).start()
+
+        async def ask():
+            reader, writer = await asyncio.open_connection('127.0.0.1', proxy.port)
+            writer.write(b"ping")
+            await writer.drain()
+            answer = await reader.read()
+            writer.close()
+            return answer
+
+        first = await ask()
+        assert await ask() == first
+        owner = servers[[b"w0", b"w1"].index(first)]
+        owner.close()
+        await owner.wait_closed()
+        assert await ask() not in (first, b"")
+        assert proxy.failovers == 1
+        await proxy.close()
+        for server in servers:
+            server.close()
+
+    asyncio.run(scenario())
+
+
+def test_proxy_needs_backends():
+    with pytest.raises(ValueError):
+        StickyProxy([])
@@ -0,0 +1,69 @@
+"""
+Tests for strip-based manuscript rendering
+"""
+
+import io
+import random
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.gradio.l33t import manuscript
+from src.gradio.l33t.background_pool import configure_background_pool, get_background_pool
+from src.gradio.l33t.strips import PNGStripWriter
+
+
+def test_strip_writer_round_trips_pixels():
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (250, 64, 4), dtype=np.uint8), 'RGBA')
+
+    output = io.BytesIO()
+    writer = PNGStripWriter(output, 64, 250)
+    for top in range(0, 250, 100):
+        writer.write(image.crop((0, top, 64, min(250, top + 100))))
+    writer.close()
+
+    decoded = Image.open(io.BytesIO(output.getvalue()))
+    assert decoded.mode == 'RGBA'
+    assert decoded.tobytes() == image.tobytes()
+
+
+@pytest.fixture
+def single_variant_pool():
+    previous = get_background_pool().options()
+    configure_background_pool(variants=1, warm_heights=())
+    yield
+    configure_background_pool(**previous)
+
+
+def test_strip_mode_matches_single_canvas_rendering(single_variant_pool):
+    layout = manuscript.layout_manuscript([f"line {i}" for i in range(120)], banner="B4NN3R",
+                                          rng=random.Random(11))
+
+    single = manuscript.render_manuscript_png(layout, render_mode="single", encoder="lossless")
+    strips = manuscript.render_manuscript_png(layout, render_mode="strips", strip_height=128,
+                                              encoder="lossless")
+
+    assert Image.open(io.BytesIO(single)).tobytes() == Image.open(io.BytesIO(strips)).tobytes()
+
+
+def test_strip_mode_never_writes_a_lossy_or_webp_preset_silently(caplog):
+    layout = manuscript.layout_manuscript(["line"] * 10, rng=random.Random(2))
+    with pytest.raises(ValueError):
+        manuscript.render_manuscript_png(layout, render_mode="strips", encoder="palette")
+
+    layout['height'] = manuscript.STRIP_THRESHOLD + 1
+    with caplog.at_level("WARNING"):
+        image = manuscript.render_manuscript_png(layout, encoder="webp")
+    assert Image.open(io.BytesIO(image)).format == 'PNG'
+    assert "lossless PNG" in caplog.text
+
+
+def test_long_documents_are_paginated_under_the_height_cap():
+    text = "\n".join(f"line {i}" for i in range(200))
+
+    _, pages = manuscript.render_manuscript_pages(text, max_page_height=2000)
+
+    assert len(pages) > 1
+    for page in pages:
+        assert Image.open(io.BytesIO(page)).height <= 2000
@@ -0,0 +1,32 @@
+"""
+Tests for the API endpoints of the holographic interface
+"""
+
+from src.gradio.l33t import memory
+from src.gradio.l33t.render_cache import get_render_cache_stats
+from src.gradio.l33t.ui import create_holographic_interface
+
+
+def _endpoint(demo, api_name):
+    for dependency, block_function in zip(demo.config["dependencies"], demo.fns):
+        if dependency.get("api_name") == api_name:
+            return block_function.fn
+    raise KeyError(api_name)
+
+
+def test_api_can_bypass_and_clear_the_render_cache():
+    demo = create_holographic_interface({}, {}, {})
+    convert, clear = _endpoint(demo, "convert"), _endpoint(demo, "clear_render_cache")
+
+    clear()
+    first = convert("# 4p1", "None")
+    hits = get_render_cache_stats()['hits']
+    assert convert("# 4p1", "None", False) == first
+    stats = get_render_cache_stats()
+    assert (stats['entries'], stats['hits']) == (1, hits)
+    assert clear()['entries'] == 0
+
+
+def test_api_reports_memory_totals():
+    demo = create_holographic_interface({}, {}, {})
+    assert _endpoint(demo, "memory_stats")() == memory.memory_stats()